@@ -0,0 +1,105 @@
+# app/batch.py
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from typing import Dict, List, Sequence, Union
+
+from app.config import settings
+from app.judge import JudgeAgent
+from app.models import InputRequest, JudgeErrorResponse, JudgeResponse
+from app.packing import packable
+from app.resilience import OverloadedError
+from app.video import is_media_path
+
+logger = logging.getLogger(__name__)
+
+BatchOutcome = Union[JudgeResponse, BaseException]
+
+EVALUATION_FAILED_DETAIL = "LLM output invalid after retry or upstream call failed."
+OVERLOADED_DETAIL = "Upstream is saturated; request shed. Retry after the indicated delay."
+
+
+def error_for_exception(e: BaseException, request_id: str) -> JudgeErrorResponse:
+    # Same failure surface as /evaluate, for per-item errors in batch/bulk runs.
+    if isinstance(e, OverloadedError):
+        return JudgeErrorResponse(error="overloaded", detail=OVERLOADED_DETAIL, request_id=request_id)
+    if isinstance(e, RuntimeError):
+        return JudgeErrorResponse(error="evaluation_failed", detail=EVALUATION_FAILED_DETAIL, request_id=request_id)
+    logger.error("Unexpected server error: %s", repr(e))
+    return JudgeErrorResponse(error="unexpected_error", detail="Unexpected server error.", request_id=request_id)
+
+
+def dedupe_key(request: InputRequest) -> str:
+    # Same type + content + metadata -> same prompt -> one LLM call per batch.
+    return json.dumps(
+        [request.type, request.content, request.metadata.model_dump() if request.metadata else None],
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+
+
+async def evaluate_batch(
+    agent: JudgeAgent,
+    items: Sequence[InputRequest],
+    concurrency: int,
+) -> List[BatchOutcome]:
+    """
+    Fan items out through the agent with at most `concurrency` evaluations in flight.
+
+    Returns one outcome per input item, in input order: the JudgeResponse, or the
+    exception raised for that item (callers map exceptions to error responses).
+    Short items go in packs of PACKING_MAX_ITEMS per upstream call; a pack holds one slot.
+    """
+    unique: Dict[str, InputRequest] = {}
+    keys: List[str] = []
+    for item in items:
+        key = dedupe_key(item)
+        keys.append(key)
+        unique.setdefault(key, item)
+
+    unique_keys = list(unique)
+    by_key: Dict[str, BatchOutcome] = {}
+
+    # One vectorized pre-classifier pass; confident items never reach the LLM. Media paths are
+    # left to evaluate_video_async, which pre-classifies the transcript, not the file name.
+    media = {key for key in unique_keys if unique[key].type == "video" and is_media_path(unique[key].content)}
+    if settings.preclassifier_enabled:
+        candidate_keys = [key for key in unique_keys if key not in media]
+        candidates = [unique[key] for key in candidate_keys]
+        local = agent.preclassify(
+            [i.content for i in candidates],
+            [i.metadata.model_dump() if i.metadata else None for i in candidates],
+        )
+        by_key.update((key, resp) for key, resp in zip(candidate_keys, local) if resp is not None)
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_one(key: str) -> JudgeResponse:
+        async with semaphore:
+            return await agent.evaluate_request_async(unique[key], preclassified=key not in media)
+
+    async def run_pack(pack: List[InputRequest]) -> List[BatchOutcome]:
+        async with semaphore:
+            return await agent.evaluate_packed_async(pack, preclassified=True)
+
+    pending = [key for key in unique_keys if key not in by_key]
+    packed, single = [], []
+    for key in pending:
+        (packed if packable(unique[key]) else single).append(key)
+    size = max(1, settings.packing_max_items)
+    packs = [packed[i:i + size] for i in range(0, len(packed), size)]
+
+    outcomes, pack_outcomes = await asyncio.gather(
+        asyncio.gather(*(run_one(key) for key in single), return_exceptions=True),
+        asyncio.gather(*(run_pack([unique[key] for key in pack]) for pack in packs), return_exceptions=True),
+    )
+    by_key.update(zip(single, outcomes))
+    for pack, results in zip(packs, pack_outcomes):
+        by_key.update(zip(pack, results if isinstance(results, list) else [results] * len(pack)))
+
+    logger.info(
+        "batch.done items=%s unique=%s packed=%s concurrency=%s", len(items), len(unique), len(packed), concurrency
+    )
+    return [by_key[key] for key in keys]
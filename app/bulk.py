@@ -0,0 +1,231 @@
+# app/bulk.py
+"""
+Streaming bulk scorer.
+
+    python -m app.bulk requests.jsonl --output results.ndjson --concurrency 16
+
+Reads InputRequest records one JSON object per line and writes one NDJSON result
+per input line, in input order:
+
+    {"line": 3, "result": {...JudgeResponse...}}
+    {"line": 4, "error": {...JudgeErrorResponse...}}
+
+Memory stays constant: at most a fixed window of rows is in flight, and rows are
+written as soon as every earlier row is done. Progress is checkpointed next to
+the output, so re-running the same command after a crash or Ctrl-C resumes at
+the first unfinished row instead of re-paying for finished ones.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.batch import error_for_exception
+from app.config import settings
+from app.judge import JudgeAgent
+from app.models import InputRequest, JudgeErrorResponse, JudgeResponse
+from app.packing import Packer, packable
+
+logger = logging.getLogger(__name__)
+
+# Rows allowed in flight per worker; bounds memory and head-of-line blocking.
+WINDOW_PER_WORKER = 4
+
+
+@dataclass
+class Checkpoint:
+    input_path: str
+    next_line: int = 0      # first input line not yet written
+    output_bytes: int = 0   # output size after the last written row
+
+    @classmethod
+    def load(cls, path: str, input_path: str) -> "Checkpoint":
+        if not os.path.exists(path):
+            return cls(input_path=input_path)
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("input_path") != input_path:
+            raise SystemExit(f"Checkpoint {path} belongs to {data.get('input_path')!r}, not {input_path!r}.")
+        return cls(**data)
+
+    def save(self, path: str) -> None:
+        # Write-then-rename so a crash never leaves a torn checkpoint.
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.__dict__, f)
+        os.replace(tmp, path)
+
+
+@dataclass
+class BulkSummary:
+    processed: int = 0
+    errors: int = 0
+    skipped: int = 0
+    elapsed_seconds: float = 0.0
+    tokens: int = 0
+
+    @property
+    def items_per_sec(self) -> float:
+        return self.processed / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    @property
+    def tokens_per_sec(self) -> float:
+        return self.tokens / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+
+def parse_line(line: str) -> InputRequest:
+    return InputRequest.model_validate_json(line)
+
+
+def format_record(line_no: int, outcome) -> Tuple[str, bool]:
+    if isinstance(outcome, JudgeResponse):
+        return json.dumps({"line": line_no, "result": outcome.model_dump()}, ensure_ascii=False), False
+    if isinstance(outcome, JudgeErrorResponse):
+        error = outcome
+    else:
+        error = error_for_exception(outcome, f"line:{line_no}")
+    return json.dumps({"line": line_no, "error": error.model_dump()}, ensure_ascii=False), True
+
+
+async def run_bulk(
+    agent: JudgeAgent,
+    input_path: str,
+    output_path: str,
+    checkpoint_path: Optional[str] = None,
+    concurrency: int = settings.batch_concurrency,
+    report_every: float = 5.0,
+    checkpoint_every: float = 1.0,
+) -> BulkSummary:
+    checkpoint_path = checkpoint_path or f"{output_path}.ckpt"
+    checkpoint = Checkpoint.load(checkpoint_path, os.path.abspath(input_path))
+
+    # Drop any partial tail written after the last checkpoint (or stale output on a fresh run).
+    if os.path.exists(output_path):
+        with open(output_path, "r+b") as f:
+            f.truncate(checkpoint.output_bytes)
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    window: Deque[Tuple[int, asyncio.Future]] = deque()
+    max_window = max(1, concurrency) * WINDOW_PER_WORKER
+
+    summary = BulkSummary(skipped=checkpoint.next_line)
+    start = time.perf_counter()
+    tokens_at_start = agent.usage.total_tokens
+    last_report = last_checkpoint = start
+
+    # Short rows wait briefly to share an upstream call; a pack takes one semaphore slot.
+    packer = Packer(agent, semaphore)
+
+    async def evaluate(request: InputRequest) -> JudgeResponse:
+        if packable(request):
+            return await packer.evaluate(request)
+        async with semaphore:
+            return await agent.evaluate_request_async(request)
+
+    def report(final: bool = False) -> None:
+        summary.elapsed_seconds = time.perf_counter() - start
+        summary.tokens = agent.usage.total_tokens - tokens_at_start
+        logger.info(
+            "bulk.%s processed=%s errors=%s items_per_sec=%.2f tokens_per_sec=%.1f",
+            "done" if final else "progress",
+            summary.processed, summary.errors, summary.items_per_sec, summary.tokens_per_sec,
+        )
+
+    with open(input_path, "r", encoding="utf-8") as src, open(output_path, "ab") as out:
+
+        async def drain_one() -> None:
+            nonlocal last_report, last_checkpoint
+            line_no, fut = window[0]
+            try:
+                outcome = await fut
+            except Exception as e:
+                outcome = e
+            window.popleft()
+
+            record, is_error = format_record(line_no, outcome)
+            out.write((record + "\n").encode("utf-8"))
+            summary.processed += 1
+            summary.errors += int(is_error)
+            checkpoint.next_line = line_no + 1
+
+            now = time.perf_counter()
+            if now - last_checkpoint >= checkpoint_every:
+                out.flush()
+                checkpoint.output_bytes = out.tell()
+                checkpoint.save(checkpoint_path)
+                last_checkpoint = now
+            if now - last_report >= report_every:
+                report()
+                last_report = now
+
+        try:
+            for line_no, line in enumerate(src):
+                if line_no < checkpoint.next_line or not line.strip():
+                    continue
+
+                try:
+                    fut: asyncio.Future = asyncio.ensure_future(evaluate(parse_line(line)))
+                except ValidationError as ve:
+                    fut = asyncio.get_running_loop().create_future()
+                    fut.set_result(JudgeErrorResponse(
+                        error="invalid_input",
+                        detail=f"Line is not a valid InputRequest ({ve.error_count()} errors).",
+                        request_id=f"line:{line_no}",
+                    ))
+                window.append((line_no, fut))
+
+                while len(window) >= max_window:
+                    await drain_one()
+
+            while window:
+                await drain_one()
+        finally:
+            for _, fut in window:
+                fut.cancel()
+            out.flush()
+            checkpoint.output_bytes = out.tell()
+            checkpoint.save(checkpoint_path)
+            report(final=True)
+
+    return summary
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.bulk",
+        description="Stream a JSONL file of InputRequest records through JudgeAgent.",
+    )
+    parser.add_argument("input", nargs="?", default="requests.jsonl", help="JSONL file of InputRequest records")
+    parser.add_argument("--output", "-o", help="NDJSON results file (default: <input>.results.ndjson)")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <output>.ckpt)")
+    parser.add_argument("--concurrency", "-c", type=int, default=settings.batch_concurrency)
+    parser.add_argument("--report-every", type=float, default=5.0, help="seconds between throughput reports")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    output = args.output or f"{os.path.splitext(args.input)[0]}.results.ndjson"
+
+    async def run() -> None:
+        agent = JudgeAgent()
+        try:
+            await run_bulk(agent, args.input, output, args.checkpoint, args.concurrency, args.report_every)
+        finally:
+            await agent.aclose()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        logger.warning("bulk.interrupted output=%s (re-run the same command to resume)", output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+# app/cache.py
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.config import settings
+from app.models import JudgeResponse
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(system_prompt: str, user_prompt: str, model_name: str, temperature: float) -> str:
+    """
+    Content-addressed key: identical prompts against the same model/temperature
+    produce the same evaluation, so they can share a cached response.
+    """
+    h = hashlib.sha256()
+    for part in (system_prompt, user_prompt, model_name, repr(float(temperature))):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")  # field separator so ("ab", "c") != ("a", "bc")
+    return h.hexdigest()
+
+
+class SqliteCacheStore:
+    """
+    Optional on-disk tier. Stores validated responses as JSON so they survive restarts.
+    Calls run on the caller's thread (the event loop, on the async path), so after setup
+    they wait at most `busy_timeout_ms` for another worker's write lock and then raise:
+    ResponseCache treats that as a miss (get) or a skipped write (set).
+    """
+
+    def __init__(self, path: str, busy_timeout_ms: int = 50) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)  # default 5s: workers may start together
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")  # a lost cache write on power loss is harmless
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+            self._conn.commit()
+            self._conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def set(self, key: str, value: str, expires_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """
+    Two-tier response cache:
+    - memory: LRU with TTL and a max entry count; hits return the stored JudgeResponse as-is
+    - disk (optional): SQLite store; hits are promoted back into memory
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, disk: Optional[SqliteCacheStore] = None) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._disk = disk
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[JudgeResponse, float]]" = OrderedDict()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[JudgeResponse]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                response, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    return response
+                del self._entries[key]
+                self.expirations += 1
+
+        if self._disk is not None:
+            # Like set(), best-effort: a locked (past the busy timeout) or corrupt database, or a row
+            # written under an older schema, is a miss rather than a failed evaluation.
+            try:
+                stored = self._disk.get(key)
+                response = JudgeResponse.model_validate_json(stored[0]) if stored is not None else None
+            except (sqlite3.Error, ValidationError) as e:
+                logger.warning("cache.disk_read_failed error=%s", repr(e))
+                response = None
+            if response is not None:
+                with self._lock:
+                    self._put_memory(key, response, stored[1])
+                    self.disk_hits += 1
+                return response
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, response: JudgeResponse) -> None:
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._put_memory(key, response, expires_at)
+        if self._disk is not None:
+            try:
+                self._disk.set(key, response.model_dump_json(), expires_at)
+            except sqlite3.Error as e:
+                # Disk tier is best-effort; never fail an evaluation because of it.
+                logger.warning("cache.disk_write_failed error=%s", repr(e))
+
+    def _put_memory(self, key: str, response: JudgeResponse, expires_at: float) -> None:
+        self._entries[key] = (response, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            return {
+                "enabled": True,
+                "hits": hits,
+                "misses": self.misses,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "disk_path": self._disk.path if self._disk is not None else None,
+            }
+
+
+def build_response_cache() -> Optional[ResponseCache]:
+    if not settings.cache_enabled:
+        return None
+    path = settings.cache_sqlite_path
+    if not path and settings.shared_state_dir:
+        path = os.path.join(settings.shared_state_dir, "response_cache.sqlite3")  # shared by all workers
+    disk = SqliteCacheStore(path, settings.cache_sqlite_busy_timeout_ms) if path else None
+    return ResponseCache(
+        max_entries=settings.cache_max_entries,
+        ttl_seconds=settings.cache_ttl_seconds,
+        disk=disk,
+    )
@@ -0,0 +1,166 @@
+# app/chunking.py
+from __future__ import annotations
+
+import math
+import re
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Sequence
+
+from app.models import (
+    AudienceSegment,
+    DistributionAnalysis,
+    GenerationPrediction,
+    JudgeResponse,
+    Virality,
+)
+
+MAX_AUDIENCES = 6
+
+# Rough chars-per-token for English prose when tiktoken isn't installed.
+_CHARS_PER_TOKEN = 4
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+@lru_cache(maxsize=1)
+def _encoder():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    return tiktoken.get_encoding("o200k_base")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Token count for budgeting. Exact when tiktoken is available, otherwise a
+    conservative chars/4 estimate (good enough to stay under a context budget).
+    """
+    enc = _encoder()
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / _CHARS_PER_TOKEN)
+
+
+def _hard_split(text: str, max_tokens: int) -> List[str]:
+    """
+    Character slices of at most `max_tokens` each. Slices start at max_tokens * 4
+    chars and are shrunk (binary search) when the tokenizer counts more, as it
+    does for CJK or emoji at well under 4 chars per token.
+    """
+    max_chars = max_tokens * _CHARS_PER_TOKEN
+    pieces: List[str] = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + max_chars)
+        if estimate_tokens(text[start:end]) > max_tokens:
+            lo, hi = start + 1, end  # lo always fits (one char is at most a few tokens)
+            while lo < hi:
+                mid = (lo + hi + 1) // 2
+                if estimate_tokens(text[start:mid]) <= max_tokens:
+                    lo = mid
+                else:
+                    hi = mid - 1
+            end = lo
+        pieces.append(text[start:end])
+        start = end
+    return pieces
+
+
+def split_into_chunks(text: str, max_tokens: int) -> List[str]:
+    """
+    Greedy packing of sentences into chunks of at most `max_tokens`.
+    Sentences longer than the budget are hard-split by characters.
+    """
+    pieces: List[str] = []
+    for sentence in _SENTENCE_SPLIT.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if estimate_tokens(sentence) <= max_tokens:
+            pieces.append(sentence)
+        else:
+            pieces.extend(_hard_split(sentence, max_tokens))
+
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for piece in pieces:
+        tokens = estimate_tokens(piece)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens + 1  # joining space
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def sample_evenly(chunks: List[str], max_chunks: int) -> List[str]:
+    # Bounds cost on very long inputs while still covering start, middle and end.
+    if len(chunks) <= max_chunks:
+        return chunks
+    step = (len(chunks) - 1) / (max_chunks - 1) if max_chunks > 1 else 0
+    return [chunks[round(i * step)] for i in range(max_chunks)]
+
+
+def merge_responses(responses: Sequence[JudgeResponse], weights: Sequence[float], skipped: int = 0) -> JudgeResponse:
+    """
+    Combine per-chunk evaluations into one response (`skipped`: chunks dropped by
+    sample_evenly, reported in meta_explanation):
+    - generation: token-weighted P(AI) decides the label; confidence follows from it
+    - virality: token-weighted average score and confidence
+    - audiences: union by community, ranked by how many chunks (and how much text) named them, capped at 6
+    """
+    total = float(sum(weights)) or 1.0
+    norm = [w / total for w in weights]
+    n = len(responses)
+
+    p_ai = sum(
+        w * (r.generation_prediction.confidence if r.generation_prediction.label == "AI"
+             else 1.0 - r.generation_prediction.confidence)
+        for r, w in zip(responses, norm)
+    )
+    label = "AI" if p_ai >= 0.5 else "Human"
+
+    heaviest = max(range(n), key=lambda i: weights[i])
+    lead = responses[heaviest]
+
+    ranked: "OrderedDict[str, List]" = OrderedDict()
+    for r, w in zip(responses, norm):
+        for seg in r.distribution_analysis.likely_audiences:
+            key = seg.community.strip().lower()
+            entry = ranked.setdefault(key, [0, 0.0, seg])
+            entry[0] += 1
+            entry[1] += w
+    audiences: List[AudienceSegment] = [
+        entry[2] for entry in sorted(ranked.values(), key=lambda e: (-e[0], -e[1]))[:MAX_AUDIENCES]
+    ]
+
+    return JudgeResponse(
+        generation_prediction=GenerationPrediction(
+            label=label,
+            confidence=round(p_ai if label == "AI" else 1.0 - p_ai, 4),
+            reasoning=f"Token-weighted across {n} segments. Largest segment: {lead.generation_prediction.reasoning}",
+        ),
+        virality=Virality(
+            score=int(round(sum(w * r.virality.score for r, w in zip(responses, norm)))),
+            confidence=round(sum(w * r.virality.confidence for r, w in zip(responses, norm)), 4),
+            reasoning=f"Averaged across {n} segments. Largest segment: {lead.virality.reasoning}",
+        ),
+        distribution_analysis=DistributionAnalysis(
+            likely_audiences=audiences,
+            reasoning=f"Audiences ranked by how many of {n} segments named them. "
+                      f"Largest segment: {lead.distribution_analysis.reasoning}",
+        ),
+        meta_explanation=(
+            f"Long content was split into {n} segments under the input token budget, "
+            f"evaluated concurrently and merged. {lead.meta_explanation}"
+            if not skipped else
+            f"Long content was split into {n + skipped} segments under the input token budget; {n} of them, "
+            f"sampled evenly from start to end, were evaluated concurrently and merged ({skipped} not evaluated). "
+            f"{lead.meta_explanation}"
+        ),
+    )
@@ -3,9 +3,19 @@ from __future__ import annotations
 
 import os
 from dataclasses import dataclass
-from dotenv import load_dotenv
+from pathlib import Path
 
-load_dotenv()
+
+def _load_dotenv() -> None:
+    # Deployed environments inject variables directly; only pay for python-dotenv when a .env exists.
+    for path in (Path.cwd() / ".env", Path(__file__).resolve().parent.parent / ".env"):
+        if path.is_file():
+            from dotenv import load_dotenv
+            load_dotenv(path)
+            return
+
+
+_load_dotenv()
 
 
 @dataclass(frozen=True)
@@ -15,12 +25,113 @@ class Settings:
 
     # OpenAI
     openai_api_key: str = os.getenv("OPENAI_API_KEY", "").strip()
+    # Any OpenAI-compatible endpoint (e.g. the local stub used by benchmarks.load_test); empty = api.openai.com
+    openai_base_url: str = os.getenv("OPENAI_BASE_URL", "").strip()
     model_name: str = os.getenv("OPENAI_MODEL", "gpt-4o-mini").strip()
     temperature: float = float(os.getenv("OPENAI_TEMPERATURE", "0.2"))
     timeout_seconds: float = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "20"))
 
+    # LLM backend: "openai" (OpenAI API / OPENAI_BASE_URL), "local" (OpenAI-compatible server on
+    # this host: llama.cpp, vLLM CPU, Ollama) or "fake" (deterministic, no network)
+    llm_backend: str = os.getenv("LLM_BACKEND", "openai").strip().lower()
+    local_llm_base_url: str = os.getenv("LOCAL_LLM_BASE_URL", "http://127.0.0.1:8080/v1").strip()
+    local_llm_model: str = os.getenv("LOCAL_LLM_MODEL", "local").strip()  # default tier when MODEL_TIERS is unset
+    local_llm_api_key: str = os.getenv("LOCAL_LLM_API_KEY", "local").strip()
+    local_llm_timeout_seconds: float = float(os.getenv("LOCAL_LLM_TIMEOUT_SECONDS", "120"))  # CPU decoding is slow
+    local_llm_max_connections: int = int(os.getenv("LOCAL_LLM_MAX_CONNECTIONS", "4"))  # ~ the server's parallel slots
+    fake_llm_latency_ms: float = float(os.getenv("FAKE_LLM_LATENCY_MS", "0"))
+
+    # Upstream protection (async path): adaptive concurrency limit, circuit breaker, rate pacing
+    limiter_initial: int = int(os.getenv("LIMITER_INITIAL", "64"))
+    limiter_min: int = int(os.getenv("LIMITER_MIN", "4"))
+    limiter_max: int = int(os.getenv("LIMITER_MAX", "200"))
+    limiter_latency_tolerance: float = float(os.getenv("LIMITER_LATENCY_TOLERANCE", "2.0"))
+    breaker_failure_threshold: int = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+    breaker_reset_seconds: float = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+    rate_limit_rps: float = float(os.getenv("RATE_LIMIT_RPS", "0"))  # 0 = only pace on 429 Retry-After
+    rate_limit_burst: int = int(os.getenv("RATE_LIMIT_BURST", "50"))
+    rate_limit_max_wait_seconds: float = float(os.getenv("RATE_LIMIT_MAX_WAIT_SECONDS", "1.0"))
+
+    # Connection pooling for the OpenAI backend's clients
+    max_connections: int = int(os.getenv("OPENAI_MAX_CONNECTIONS", "200"))
+    max_keepalive_connections: int = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "50"))
+
     # Reliability
     max_retries: int = int(os.getenv("MAX_RETRIES", "1"))  # retry-once policy
+    # Ask for schema-constrained JSON; falls back to parse/repair if the model rejects it
+    structured_output: bool = os.getenv("OPENAI_STRUCTURED_OUTPUT", "true").strip().lower() == "true"
+
+    # Response cache (content-addressed; disk tier enabled when a path is set)
+    cache_enabled: bool = os.getenv("CACHE_ENABLED", "true").strip().lower() == "true"
+    cache_max_entries: int = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+    cache_ttl_seconds: float = float(os.getenv("CACHE_TTL_SECONDS", "86400"))
+    cache_sqlite_path: str = os.getenv("CACHE_SQLITE_PATH", "").strip()
+    # How long a disk-tier read/write waits for another worker's lock before counting as a miss
+    cache_sqlite_busy_timeout_ms: int = int(os.getenv("CACHE_SQLITE_BUSY_TIMEOUT_MS", "50"))
+    # Near-duplicate cache: reuse a response for content whose normalized SimHash is this similar (1 - bits/64)
+    semantic_cache_enabled: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "true").strip().lower() == "true"
+    semantic_cache_threshold: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+    semantic_cache_max_entries: int = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "50000"))
+    semantic_cache_min_tokens: int = int(os.getenv("SEMANTIC_CACHE_MIN_TOKENS", "8"))
+
+    # Input token budget: longer content is split into chunks evaluated concurrently
+    max_input_tokens: int = int(os.getenv("MAX_INPUT_TOKENS", "6000"))
+    max_chunks: int = int(os.getenv("MAX_CHUNKS", "8"))
+
+    # Cost-aware routing over a tiered pool, cheapest first: "model:in_usd_per_1m:out_usd_per_1m,..."
+    # Empty -> single tier on OPENAI_MODEL.
+    model_tiers: str = os.getenv("MODEL_TIERS", "").strip()
+    routing_long_content_tokens: int = int(os.getenv("ROUTING_LONG_CONTENT_TOKENS", "2000"))
+    routing_long_video_seconds: int = int(os.getenv("ROUTING_LONG_VIDEO_SECONDS", "600"))
+    routing_premium_platforms: str = os.getenv("ROUTING_PREMIUM_PLATFORMS", "").strip()
+    routing_confident_score: float = float(os.getenv("ROUTING_CONFIDENT_SCORE", "0.9"))
+    routing_escalation_confidence: float = float(os.getenv("ROUTING_ESCALATION_CONFIDENCE", "0.55"))
+
+    # Local stylometric pre-classifier: skip the LLM when P(AI) is this far from 0.5
+    preclassifier_enabled: bool = os.getenv("PRECLASSIFIER_ENABLED", "false").strip().lower() == "true"
+    preclassifier_threshold: float = float(os.getenv("PRECLASSIFIER_THRESHOLD", "0.95"))
+
+    # Video ingestion: media files under VIDEO_MEDIA_DIR (empty = transcripts only) are decoded,
+    # transcribed and OCR'd in a process pool; derived text is cached by content hash
+    video_media_dir: str = os.getenv("VIDEO_MEDIA_DIR", "").strip()
+    video_cache_dir: str = os.getenv("VIDEO_CACHE_DIR", "").strip()  # empty = memory only
+    video_workers: int = int(os.getenv("VIDEO_WORKERS", "2"))
+    video_max_frames: int = int(os.getenv("VIDEO_MAX_FRAMES", "8"))
+    video_ffmpeg_timeout_seconds: float = float(os.getenv("VIDEO_FFMPEG_TIMEOUT_SECONDS", "120"))
+    video_stt_model: str = os.getenv("VIDEO_STT_MODEL", "base").strip()
+
+    # Multi-worker serving (python -m app.serve): host-wide state shared by the worker processes.
+    # When set, RATE_LIMIT_RPS/BURST are a global budget and the response cache's disk tier lives here.
+    shared_state_dir: str = os.getenv("SHARED_STATE_DIR", "").strip()
+
+    # Batch evaluation
+    batch_concurrency: int = int(os.getenv("BATCH_CONCURRENCY", "16"))
+
+    # Multi-item packing (batch/bulk): up to PACKING_MAX_ITEMS short items share one upstream call (1 = off)
+    packing_max_items: int = int(os.getenv("PACKING_MAX_ITEMS", "8"))
+    packing_max_item_tokens: int = int(os.getenv("PACKING_MAX_ITEM_TOKENS", "200"))
+    packing_max_wait_ms: float = float(os.getenv("PACKING_MAX_WAIT_MS", "20"))
+
+    # Async jobs (POST /jobs): persistent SQLite queue drained by a worker pool
+    jobs_sqlite_path: str = os.getenv("JOBS_SQLITE_PATH", "jobs.sqlite3").strip()
+    jobs_workers: int = int(os.getenv("JOBS_WORKERS", "8"))
+    # Per client key: the peer address, so behind a proxy all jobs share one key (see JOBS_TRUST_CLIENT_ID_HEADER)
+    jobs_max_in_flight_per_client: int = int(os.getenv("JOBS_MAX_IN_FLIGHT_PER_CLIENT", "2"))
+    jobs_max_queued: int = int(os.getenv("JOBS_MAX_QUEUED", "10000"))
+    # Times a job is re-queued after the upstream shed it before it fails as overloaded
+    jobs_max_requeues: int = int(os.getenv("JOBS_MAX_REQUEUES", "20"))
+    jobs_retention_seconds: float = float(os.getenv("JOBS_RETENTION_SECONDS", "604800"))
+    # Comma-separated webhook hosts; empty = any host that resolves to public addresses only
+    jobs_webhook_allowed_hosts: str = os.getenv("JOBS_WEBHOOK_ALLOWED_HOSTS", "").strip()
+    # Key per-client fairness on X-Client-Id only when a trusted proxy sets it (callers could rotate it);
+    # otherwise on the peer address
+    jobs_trust_client_id_header: bool = os.getenv("JOBS_TRUST_CLIENT_ID_HEADER", "false").strip().lower() == "true"
+
+    # Tracing: spans per request, keyed by its request_id; slow traces are sampled into TRACE_FILE (OTLP/JSON lines)
+    tracing_enabled: bool = os.getenv("TRACING_ENABLED", "true").strip().lower() == "true"
+    trace_slow_ms: float = float(os.getenv("TRACE_SLOW_MS", "5000"))
+    trace_sample_rate: float = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+    trace_file: str = os.getenv("TRACE_FILE", "slow_traces.jsonl").strip()  # empty = don't write
 
     # Dev ergonomics (avoid quota blockers)
     offline_mode: bool = os.getenv("OPENAI_OFFLINE_MODE", "false").strip().lower() == "true"
@@ -31,5 +142,5 @@ settings = Settings()
 
 def require_api_key() -> None:
     # Only enforce when we actually intend to call OpenAI
-    if not settings.offline_mode and not settings.openai_api_key:
+    if not settings.offline_mode and settings.llm_backend == "openai" and not settings.openai_api_key:
         raise RuntimeError("OPENAI_API_KEY is not set. Add it to .env or your environment.")
@@ -0,0 +1,482 @@
+# app/jobs.py
+"""
+Async evaluation jobs (POST /jobs, GET /jobs/{id}).
+
+JobStore is a SQLite queue, so accepted jobs survive restarts. Lanes
+(high/normal/low) are drained in strict order, oldest first within a lane, and
+a client never has more than `max_in_flight_per_client` jobs running: its other
+jobs wait without holding up anyone else's. Jobs left running by a process that
+died are re-queued when a queue starts.
+
+JobQueue runs asyncio workers that claim jobs, evaluate them through
+JudgeAgent, store the result or error and POST the finished job to its webhook,
+if one was given. An overloaded upstream re-queues the job after Retry-After
+instead of failing it, up to `max_requeues` times.
+
+The client key is the peer address unless X-Client-Id is trusted: behind a load
+balancer or reverse proxy every job shares one key, so at most
+`max_in_flight_per_client` of the workers ever run. The queue logs a warning when
+it finds its work held up that way.
+
+Webhooks are caller-supplied URLs, so they only go to public addresses: a host
+must resolve to globally routable IPs only (no loopback, private, link-local such
+as 169.254.169.254, or reserved ranges), checked again at delivery. The delivery
+connects to the address that was checked (Host header and TLS name from the URL),
+so a name that re-resolves elsewhere in between (DNS rebinding) can't redirect it.
+Hosts on the allow-list (JOBS_WEBHOOK_ALLOWED_HOSTS) are trusted as-is; when it
+is set, no other host is accepted.
+"""
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+from urllib.parse import urlsplit
+
+from app import metrics, tracing
+from app.batch import error_for_exception
+from app.judge import JudgeAgent
+from app.models import JOB_PRIORITIES, InputRequest, JobRequest, JobResponse
+from app.resilience import OverloadedError
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_ATTEMPTS = 3
+
+# Identifies this process incarnation as a job owner ("pid:token"); the token tells a
+# restarted process apart from its predecessor when both got the same pid (pid 1 in containers).
+_OWNER = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class InvalidWebhookError(ValueError):
+    """webhook_url is not allowed (host off the allow-list, or a non-public address)."""
+
+
+def check_webhook_url(url: str, allowed_hosts: Sequence[str] = ()) -> str:
+    """Submit-time check, without DNS: returns the host or raises InvalidWebhookError."""
+    host = (urlsplit(url).hostname or "").lower()
+    if not host:
+        raise InvalidWebhookError("webhook_url has no host")
+    if allowed_hosts:
+        if host not in allowed_hosts:
+            raise InvalidWebhookError(f"webhook host {host!r} is not in JOBS_WEBHOOK_ALLOWED_HOSTS")
+        return host
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return host  # a name: its addresses are checked when the webhook is delivered
+    if not address.is_global:
+        raise InvalidWebhookError("webhook_url must point at a public address")
+    return host
+
+
+async def resolve_webhook_url(url: str, allowed_hosts: Sequence[str] = ()) -> Optional[str]:
+    """
+    Delivery-time check: every address the host resolves to must be public. Returns
+    the address to connect to, or None for allow-listed hosts (resolved as usual).
+    """
+    host = check_webhook_url(url, allowed_hosts)
+    if allowed_hosts:
+        return None
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise InvalidWebhookError(f"webhook host {host!r} does not resolve") from e
+    if not infos or any(not ipaddress.ip_address(info[4][0]).is_global for info in infos):
+        raise InvalidWebhookError(f"webhook host {host!r} resolves to a non-public address")
+    return infos[0][4][0]
+
+
+def _owner_alive(owner: str) -> bool:
+    pid = owner.partition(":")[0]
+    if owner == _OWNER:
+        return True
+    if int(pid) == os.getpid():
+        return False  # same pid, different incarnation
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobStore:
+    def __init__(self, path: str, retention_seconds: float = 7 * 86400) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        # Autocommit; claim() takes a write lock explicitly so processes sharing the file don't double-claim.
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA busy_timeout=5000")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " client TEXT NOT NULL,"
+                " lane INTEGER NOT NULL,"
+                " status TEXT NOT NULL,"
+                " request TEXT NOT NULL,"
+                " webhook_url TEXT,"
+                " result TEXT,"
+                " error TEXT,"
+                " owner TEXT,"
+                " not_before REAL NOT NULL DEFAULT 0,"
+                " requeues INTEGER NOT NULL DEFAULT 0,"
+                " created_at REAL NOT NULL,"
+                " started_at REAL,"
+                " finished_at REAL)"
+            )
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "requeues" not in columns:  # queue files from before the requeue cap
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN requeues INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, lane, created_at)")
+            self._conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (time.time() - retention_seconds,),
+            )
+
+    def enqueue(self, request: JobRequest, client: str) -> str:
+        job_id = uuid.uuid4().hex
+        body = InputRequest.model_validate(request.model_dump(include=set(InputRequest.model_fields)))
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, client, lane, status, request, webhook_url, created_at)"
+                " VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, client, JOB_PRIORITIES.index(request.priority), body.model_dump_json(),
+                 request.webhook_url, time.time()),
+            )
+        return job_id
+
+    def claim(self, max_in_flight_per_client: int) -> Optional[Dict[str, Any]]:
+        """Mark the next eligible job running and return it (None when nothing is eligible)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' AND not_before <= ? AND client NOT IN ("
+                    "  SELECT client FROM jobs WHERE status = 'running' GROUP BY client HAVING COUNT(*) >= ?)"
+                    " ORDER BY lane, created_at LIMIT 1",
+                    (now, max_in_flight_per_client),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', owner = ?, started_at = ? WHERE id = ?",
+                        (_OWNER, now, row["id"]),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return {**dict(row), "status": "running", "owner": _OWNER, "started_at": now}
+
+    def finish(self, job_id: str, result: Optional[str] = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, owner = NULL, finished_at = ? WHERE id = ?",
+                ("failed" if error is not None else "succeeded", result, error, time.time(), job_id),
+            )
+
+    def requeue(self, job_id: str, delay_seconds: float = 0.0, shed: bool = False) -> None:
+        """
+        Put a running job back in the queue (a finished one stays finished, e.g. when shutdown
+        cancels its worker after the result was stored). shed: the upstream turned the job away,
+        which counts toward its requeue cap.
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL, started_at = NULL, not_before = ?,"
+                " requeues = requeues + ? WHERE id = ? AND status = 'running'",
+                (time.time() + delay_seconds, int(shed), job_id),
+            )
+
+    def waiting_clients(self, limit: int = 2) -> List[str]:
+        """Clients with queued jobs that are due (at most `limit` of them)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT client FROM jobs WHERE status = 'queued' AND not_before <= ? LIMIT ?",
+                (time.time(), limit),
+            ).fetchall()
+        return [row["client"] for row in rows]
+
+    def recover(self) -> int:
+        """Re-queue jobs whose owning process is gone; returns how many."""
+        with self._lock:
+            rows = self._conn.execute("SELECT id, owner FROM jobs WHERE status = 'running'").fetchall()
+        orphans = [row["id"] for row in rows if not row["owner"] or not _owner_alive(row["owner"])]
+        for job_id in orphans:
+            self.requeue(job_id)
+        return len(orphans)
+
+    def get(self, job_id: str) -> Optional[JobResponse]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _to_response(row) if row is not None else None
+
+    def counts(self, active_only: bool = False) -> Dict[str, Any]:
+        where = " WHERE status IN ('queued', 'running')" if active_only else ""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT status, lane, COUNT(*) FROM jobs{where} GROUP BY status, lane").fetchall()
+        out: Dict[str, Any] = {"queued": {lane: 0 for lane in JOB_PRIORITIES}, "running": 0, "succeeded": 0, "failed": 0}
+        for status, lane, n in rows:
+            if status == "queued":
+                out["queued"][JOB_PRIORITIES[lane]] += n
+            else:
+                out[status] += n
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _to_response(row: sqlite3.Row) -> JobResponse:
+    return JobResponse.model_validate({
+        "job_id": row["id"],
+        "status": row["status"],
+        "priority": JOB_PRIORITIES[row["lane"]],
+        "created_at": row["created_at"],
+        "started_at": row["started_at"],
+        "finished_at": row["finished_at"],
+        "result": json.loads(row["result"]) if row["result"] else None,
+        "error": json.loads(row["error"]) if row["error"] else None,
+    })
+
+
+class JobQueue:
+    def __init__(
+        self,
+        store: JobStore,
+        agent: JudgeAgent,
+        workers: int = 8,
+        max_in_flight_per_client: int = 2,
+        max_queued: int = 10000,
+        max_requeues: int = 20,
+        poll_seconds: float = 1.0,
+        http_client: Any = None,
+        webhook_allowed_hosts: Sequence[str] = (),
+    ) -> None:
+        self.store = store
+        self.agent = agent
+        self.workers = workers
+        self.max_in_flight_per_client = max_in_flight_per_client
+        self.max_queued = max_queued
+        self.max_requeues = max_requeues
+        self.poll_seconds = poll_seconds
+        self.webhook_allowed_hosts = tuple(h.lower() for h in webhook_allowed_hosts)
+        self._http_client = http_client
+        self._owns_http_client = http_client is None
+        self._tasks: Set[asyncio.Task] = set()
+        self._webhooks: Set[asyncio.Task] = set()
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = False
+        self._warned_single_client = False
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        """Start the workers on the running event loop (idempotent)."""
+        if self._tasks:
+            return
+        recovered = self.store.recover()
+        if recovered:
+            logger.info("jobs.recovered count=%s", recovered)
+        self._wake = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._stopping = False
+        self._tasks = {asyncio.create_task(self._worker()) for _ in range(self.workers)}
+        self._refresh_gauges()
+
+    async def stop(self) -> None:
+        # The flag also ends a worker whose cancellation was swallowed (3.11 wait_for race).
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._webhooks, return_exceptions=True)
+        self._tasks.clear()
+        if self._owns_http_client and self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+    def submit(self, request: JobRequest, client: str) -> JobResponse:
+        """Blocking (SQLite): call it from a thread on the event loop, e.g. asyncio.to_thread."""
+        if request.webhook_url:
+            check_webhook_url(request.webhook_url, self.webhook_allowed_hosts)
+        counts = self.store.counts(active_only=True)
+        if sum(counts["queued"].values()) >= self.max_queued:
+            raise OverloadedError("queue_full", retry_after=self.poll_seconds * 10)
+        job_id = self.store.enqueue(request, client)
+        logger.info("jobs.enqueued job_id=%s client=%s priority=%s", job_id, client, request.priority)
+        self._notify_workers()
+        self._refresh_gauges()
+        return self.store.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.store.counts(), "workers": len(self._tasks)}
+
+    def _notify_workers(self) -> None:
+        # submit() runs in a worker thread; asyncio.Event is only safe to set on its loop.
+        if self._wake is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def _refresh_gauges(self) -> None:
+        counts = self.store.counts(active_only=True)
+        for lane, n in counts["queued"].items():
+            metrics.JOBS_QUEUED.set(n, lane=lane)
+        metrics.JOBS_RUNNING.set(counts["running"])
+
+    async def _worker(self) -> None:
+        while not self._stopping:
+            try:
+                await self._work_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Keep the worker alive (e.g. a locked database); the job is recovered or retried.
+                logger.exception("jobs.worker_error error=%s", repr(e))
+                await asyncio.sleep(self.poll_seconds)
+
+    async def _work_once(self) -> None:
+        # Store calls run in threads: under lock contention (several processes on one queue file)
+        # a call can wait out the busy timeout, which must not stall this worker's event loop.
+        self._wake.clear()
+        row = await self._write(
+            self.store.claim, self.max_in_flight_per_client, undo=lambda claimed: self.store.requeue(claimed["id"])
+        )
+        if row is None:
+            await self._check_single_client()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            return
+        lane = JOB_PRIORITIES[row["lane"]]
+        metrics.JOB_WAIT_SECONDS.observe(row["started_at"] - row["created_at"], lane=lane)
+        try:
+            await asyncio.to_thread(self._refresh_gauges)
+            await self._run(row)
+        except asyncio.CancelledError:
+            self.store.requeue(row["id"])  # shutting down: hand it to the next start
+            raise
+        finally:
+            self._notify_workers()  # a per-client slot may have opened
+        await asyncio.to_thread(self._refresh_gauges)
+
+    @staticmethod
+    async def _write(fn: Callable[..., Any], *args: Any, undo: Optional[Callable[[Any], None]] = None,
+                     **kwargs: Any) -> Any:
+        """
+        A store write in a thread. A caller cancelled meanwhile (shutdown) still waits for it, so the
+        write has landed before the cancellation cleanup runs; undo(result) reverts what nobody will
+        follow up on, e.g. a claim.
+        """
+        call = asyncio.ensure_future(asyncio.to_thread(fn, *args, **kwargs))
+        try:
+            return await asyncio.shield(call)
+        except asyncio.CancelledError:
+            await asyncio.wait([call])
+            if undo is not None and call.exception() is None and call.result() is not None:
+                undo(call.result())
+            raise
+
+    async def _check_single_client(self) -> None:
+        # Idle with due jobs waiting means each waiting client is at its in-flight cap; one client
+        # key for all of them is what a proxy in front of the app looks like without a trusted X-Client-Id.
+        if self._warned_single_client or self.workers <= self.max_in_flight_per_client:
+            return
+        waiting = await asyncio.to_thread(self.store.waiting_clients)
+        if len(waiting) == 1 and not self._warned_single_client:
+            self._warned_single_client = True
+            logger.warning(
+                "jobs.single_client_key client=%s max_in_flight_per_client=%s workers=%s: every waiting job shares"
+                " one client key, so most workers sit idle; behind a proxy set JOBS_TRUST_CLIENT_ID_HEADER=true"
+                " and have it send X-Client-Id",
+                waiting[0], self.max_in_flight_per_client, self.workers,
+            )
+
+    async def _run(self, row: Dict[str, Any]) -> None:
+        # The job id is the request id of everything the job does (logs, error body, trace).
+        with tracing.trace("job", request_id=row["id"], kind=tracing.KIND_CONSUMER,
+                           **{"job.lane": JOB_PRIORITIES[row["lane"]], "job.wait_ms": int(
+                               (row["started_at"] - row["created_at"]) * 1000)}):
+            await self._evaluate(row)
+
+    async def _evaluate(self, row: Dict[str, Any]) -> None:
+        job_id = row["id"]
+        try:
+            request = InputRequest.model_validate_json(row["request"])
+            result = await self.agent.evaluate_request_async(request)
+        except OverloadedError as e:
+            if row["requeues"] < self.max_requeues:
+                metrics.JOBS.inc(outcome="requeued")
+                logger.info("jobs.requeued job_id=%s reason=%s", job_id, e.reason)
+                await self._write(self.store.requeue, job_id, e.retry_after or 1.0, shed=True)
+                return
+            logger.warning("jobs.requeue_limit job_id=%s reason=%s requeues=%s", job_id, e.reason, row["requeues"])
+            await self._write(self.store.finish, job_id, error=error_for_exception(e, job_id).model_dump_json())
+            metrics.JOBS.inc(outcome="failed")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self._write(self.store.finish, job_id, error=error_for_exception(e, job_id).model_dump_json())
+            metrics.JOBS.inc(outcome="failed")
+        else:
+            await self._write(self.store.finish, job_id, result=result.model_dump_json())
+            metrics.JOBS.inc(outcome="succeeded")
+
+        job = await asyncio.to_thread(self.store.get, job_id)
+        logger.info("jobs.finished job_id=%s status=%s", job_id, job.status)
+        if row["webhook_url"]:
+            task = asyncio.create_task(self._deliver(row["webhook_url"], job))
+            self._webhooks.add(task)
+            task.add_done_callback(self._webhooks.discard)
+
+    async def _deliver(self, url: str, job: JobResponse) -> None:
+        import httpx
+
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(timeout=10.0)
+        try:
+            address = await resolve_webhook_url(url, self.webhook_allowed_hosts)
+        except InvalidWebhookError as e:
+            metrics.JOB_WEBHOOKS.inc(outcome="blocked")
+            logger.warning("jobs.webhook_blocked job_id=%s error=%s", job.job_id, e)
+            return
+        target, headers, extensions = httpx.URL(url), {}, {}
+        if address is not None:
+            # Pin the checked address: letting httpx resolve the name again would reopen the rebinding window.
+            headers["Host"] = target.netloc.decode("ascii")
+            if target.scheme == "https":
+                extensions["sni_hostname"] = target.host  # certificate still verified against the name
+            target = target.copy_with(host=address)
+        body = job.model_dump(mode="json")
+        for attempt in range(WEBHOOK_ATTEMPTS):
+            try:
+                response = await self._http_client.post(target, json=body, headers=headers, extensions=extensions)
+                if response.status_code < 500:
+                    outcome = "delivered" if response.is_success else "rejected"
+                    metrics.JOB_WEBHOOKS.inc(outcome=outcome)
+                    logger.info("jobs.webhook job_id=%s status=%s", job.job_id, response.status_code)
+                    return
+            except httpx.HTTPError as e:
+                logger.warning("jobs.webhook_error job_id=%s attempt=%s error=%s", job.job_id, attempt + 1, repr(e))
+            await asyncio.sleep(2 ** attempt)
+        metrics.JOB_WEBHOOKS.inc(outcome="failed")
@@ -1,157 +1,969 @@
 # app/judge.py
 from __future__ import annotations
 
+import asyncio
 import json
+import contextvars
 import time
-import uuid
 import logging
-from typing import Any, Dict, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple, Union
 
 from pydantic import ValidationError
 
+from app import metrics, tracing
+from app.backends import ClientBackend, LLMBackend, build_backend
+from app.cache import ResponseCache, build_response_cache, cache_key
+from app.chunking import estimate_tokens, merge_responses, sample_evenly, split_into_chunks
 from app.config import settings, require_api_key
-from app.models import JudgeResponse
-from app.prompts import build_system_prompt, build_user_prompt, build_repair_prompt
-from app.video import normalize_video
+from app.models import InputRequest, JudgeResponse
+from app.packing import PackItem, offline_packed_response, split_packed
+from app.parsing import JSONExtractionError, validate_json_output
+from app.repair import RepairPlan, plan_repair, repair_locally
+from app.resilience import UpstreamGuard, build_upstream_guard
+from app.routing import ModelRouter, build_router
+from app.semantic_cache import SemanticCache, build_semantic_cache
+from app.singleflight import SingleFlight
+from app.streaming import SECTIONS, SectionStream, validate_section
+from app.prompts import (
+    build_packed_response_format,
+    build_packed_user_prompt,
+    build_response_format,
+    build_system_prompt,
+    build_user_prompt,
+)
+from app.video import is_media_path, normalize_video
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
+
+# Deterministic mock response for local dev / quota blockers
+OFFLINE_RESPONSE = json.dumps({
+    "generation_prediction": {
+        "label": "Human",
+        "confidence": 0.62,
+        "reasoning": "Contains personal narrative cues and emotionally specific phrasing; less uniformly polished."
+    },
+    "virality": {
+        "score": 68,
+        "confidence": 0.6,
+        "reasoning": "Relatable theme with moderate emotional intensity; clear and shareable framing."
+    },
+    "distribution_analysis": {
+        "likely_audiences": [
+            {"community": "LinkedIn professionals", "why": "Career and learning narratives perform well."},
+            {"community": "Startup builders", "why": "Build/ship stories resonate with builders."}
+        ],
+        "reasoning": "Topic aligns with career growth and builder communities; metadata can refine this further."
+    },
+    "meta_explanation": "Offline development mode: deterministic mock output to validate pipeline and schema."
+})
+
+RESPONSE_FORMAT = build_response_format()
+PACKED_RESPONSE_FORMAT = build_packed_response_format()
+
+# Streamed completions also report usage in a final chunk.
+STREAM_KWARGS = {"stream": True, "stream_options": {"include_usage": True}}
+
+# (event, data) pairs produced by stream_text_async; rendered as SSE by the API.
+StreamEvent = Tuple[str, Dict[str, Any]]
+
+
+@dataclass
+class TokenUsage:
+    # Running totals from the provider's usage block (zero in offline mode)
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_prompt_tokens: int = 0  # prompt tokens served from the provider's prefix cache
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
 
 
 class JudgeAgent:
-    def __init__(self, client=None) -> None:
+    def __init__(
+        self,
+        client=None,
+        async_client=None,
+        cache: Optional[ResponseCache] = None,
+        router: Optional[ModelRouter] = None,
+        guard: Optional[UpstreamGuard] = None,
+        semantic_cache: Optional[SemanticCache] = None,
+        backend: Optional[LLMBackend] = None,
+    ) -> None:
         """
         Dependency injection:
-        - In prod: client=None -> require API key unless offline_mode.
-        - In tests: pass dummy client and monkeypatch _call_llm.
+        - In prod: backend built from LLM_BACKEND; the openai backend requires an API key unless offline_mode.
+        - In tests: pass dummy client (wrapped as a backend) and/or monkeypatch _call_llm.
+        - async_client is optional; without it the async path runs the sync client in a worker thread.
+        - cache defaults to one built from settings (None when CACHE_ENABLED=false).
+        - semantic_cache (near-duplicates, consulted after an exact miss) likewise, per SEMANTIC_CACHE_*.
+        - router defaults to the MODEL_TIERS pool (a single OPENAI_MODEL tier when unset).
+        - guard (limiter/breaker/pacing) wraps every upstream call, sync and async.
+        - backend (app.backends) replaces client/async_client: fake, local or a custom implementation.
         """
-        if client is not None:
-            self._client = client
+        self._cache = cache if cache is not None else build_response_cache()
+        self._semantic = semantic_cache if semantic_cache is not None else build_semantic_cache()
+        self._router = router if router is not None else build_router()
+        self._singleflight = SingleFlight()
+        self._guard = guard if guard is not None else build_upstream_guard()
+        self.usage = TokenUsage()
+        # Flipped off for the agent's lifetime if the model rejects the schema.
+        self._structured_output = settings.structured_output
+        self._preclassified = 0
+        self._short_circuited = 0
+        self._repairs = {"local": 0, "partial_llm": 0, "full_llm": 0}
+        self._repair_tokens_saved = 0
+        self._packing = {"packs": 0, "items": 0, "rerequested": 0, "prompt_tokens_saved": 0}
+        self._warm_lock = threading.Lock()
+        self._needs_clients = False
+
+        if backend is not None:
+            self._backend = backend
+        elif client is not None or async_client is not None:
+            self._backend = ClientBackend(client, async_client)
+        else:
+            require_api_key()
+            # Cheap to construct: HTTP backends build their SDK clients in warm() (app lifespan)
+            # or on the first upstream call, since importing the SDK dominates cold start.
+            self._backend = build_backend()
+        # In offline mode, we don't need a client at all.
+        self._needs_clients = not settings.offline_mode and not self._backend.ready
+
+    @property
+    def backend(self) -> LLMBackend:
+        return self._backend
+
+    @property
+    def ready(self) -> bool:
+        return not self._needs_clients
+
+    def warm(self) -> None:
+        if not self._needs_clients:
             return
+        with self._warm_lock:
+            if self._needs_clients:
+                start = time.perf_counter()
+                self._backend.warm()
+                self._needs_clients = False
+                logger.info("judge.warm backend=%s seconds=%.3f", self._backend.name, time.perf_counter() - start)
 
-        require_api_key()
+    async def _warm_async(self) -> None:
+        if self._needs_clients:
+            await asyncio.to_thread(self.warm)
 
-        # In offline mode, we don't need a client at all.
-        if settings.offline_mode:
-            self._client = None
-        else:
-            self._client = self._init_openai_client()
+    async def aclose(self) -> None:
+        await self._backend.aclose()
 
-    def _init_openai_client(self):
-        from openai import OpenAI
-        return OpenAI(api_key=settings.openai_api_key)
+    def evaluate_text(
+        self,
+        content: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        preclassified: bool = False,
+    ) -> JudgeResponse:
+        request_id = tracing.request_id()
+        if settings.preclassifier_enabled and not preclassified:
+            local = self.preclassify([content], [metadata])[0]
+            if local is not None:
+                return local
 
-    def evaluate_text(self, content: str, metadata: Optional[Dict[str, Any]] = None) -> JudgeResponse:
-        request_id = str(uuid.uuid4())
-        system_prompt = build_system_prompt()
-        user_prompt = build_user_prompt(content, metadata)
+        chunks, skipped = self._chunks_over_budget(content, request_id)
+        if chunks:
+            contexts = [contextvars.copy_context() for _ in chunks]  # keep the request's trace in each thread
+            with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+                results = list(pool.map(
+                    lambda i: contexts[i].run(
+                        self.evaluate_text, chunks[i], self._chunk_metadata(metadata, i, len(chunks)), True
+                    ),
+                    range(len(chunks)),
+                ))
+            return merge_responses(results, [estimate_tokens(c) for c in chunks], skipped)
 
-        logger.info("judge.evaluate_text start request_id=%s model=%s offline=%s",
-                    request_id, settings.model_name, settings.offline_mode)
+        with metrics.STAGE_SECONDS.time(stage="evaluate"), tracing.span("evaluate"):
+            tier = self._choose_tier(content, metadata)
+            model = self._router.tiers[tier].model
+            system_prompt, user_prompt = self._build_prompts(content, metadata, request_id, model)
+
+            key = cache_key(system_prompt, user_prompt, model, settings.temperature)
+            near_key = self._near_key(content, metadata, model)
+            cached = self._cache_lookup(key, request_id, near_key)
+            if cached is not None:
+                return cached
+
+            result = self._evaluate_uncached(system_prompt, user_prompt, request_id, tier)
+            self._cache_store(key, result, near_key)
+            return result
+
+    def _evaluate_uncached(
+        self, system_prompt: str, user_prompt: str, request_id: str, tier: int = 0
+    ) -> JudgeResponse:
+        model = self._router.tiers[tier].model
+        raw = self._call_llm(system_prompt, user_prompt, request_id=request_id, model=model)
+        parsed = self._parse_and_validate(raw, request_id=request_id)
+
+        # Escalate one tier at a time while the output is invalid or low-confidence
+        reason = self._router.escalation_reason(tier, parsed)
+        while reason is not None:
+            self._escalate(tier, reason, request_id)
+            tier += 1
+            model = self._router.tiers[tier].model
+            raw_next = self._call_llm(system_prompt, user_prompt, request_id=request_id, model=model)
+            parsed_next = self._parse_and_validate(raw_next, request_id=request_id)
+            if parsed_next is not None or parsed is None:
+                raw, parsed = raw_next, parsed_next
+            reason = self._router.escalation_reason(tier, parsed)
+
+        if parsed is not None:
+            return parsed
+
+        # Retry-once policy (schema/JSON failures)
+        if settings.max_retries >= 1:
+            logger.warning("judge.retry request_id=%s reason=validation_failed", request_id)
+            metrics.RETRIES.inc()
+            with metrics.STAGE_SECONDS.time(stage="retry"), tracing.span("repair"):
+                plan = self._plan_repair(raw, request_id)
+                raw2 = self._call_llm(
+                    system_prompt, plan.prompt, request_id=request_id, is_retry=True, model=model,
+                    response_format=plan.response_format,
+                )
+                parsed2 = self._parse_and_validate(plan.merge(raw2), request_id=request_id)
+            if parsed2 is not None:
+                return parsed2
+
+        raise RuntimeError(f"LLM output invalid after retry (request_id={request_id}).")
+
+    async def evaluate_text_async(
+        self,
+        content: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        preclassified: bool = False,
+    ) -> JudgeResponse:
+        request_id = tracing.request_id()
+        if settings.preclassifier_enabled and not preclassified:
+            local = self.preclassify([content], [metadata])[0]
+            if local is not None:
+                return local
 
-        raw = self._call_llm(system_prompt, user_prompt, request_id=request_id)
+        chunks, skipped = self._chunks_over_budget(content, request_id)
+        if chunks:
+            results = await asyncio.gather(*(
+                self.evaluate_text_async(chunk, self._chunk_metadata(metadata, i, len(chunks)), preclassified=True)
+                for i, chunk in enumerate(chunks)
+            ))
+            return merge_responses(results, [estimate_tokens(c) for c in chunks], skipped)
+
+        with metrics.STAGE_SECONDS.time(stage="evaluate"), tracing.span("evaluate"):
+            tier = self._choose_tier(content, metadata)
+            model = self._router.tiers[tier].model
+            system_prompt, user_prompt = self._build_prompts(content, metadata, request_id, model)
+
+            key = cache_key(system_prompt, user_prompt, model, settings.temperature)
+            near_key = self._near_key(content, metadata, model)
+            cached = self._cache_lookup(key, request_id, near_key)
+            if cached is not None:
+                return cached
+
+            # Identical concurrent requests share one upstream call (and its errors).
+            result = await self._singleflight.do(
+                key, lambda: self._evaluate_uncached_async(system_prompt, user_prompt, request_id, tier)
+            )
+            self._cache_store(key, result, near_key)
+            return result
+
+    async def _evaluate_uncached_async(
+        self, system_prompt: str, user_prompt: str, request_id: str, tier: int = 0, raw: Optional[str] = None
+    ) -> JudgeResponse:
+        # raw: first output already obtained (streaming); escalation/repair continue from it.
+        model = self._router.tiers[tier].model
+        if raw is None:
+            raw = await self._call_llm_async(system_prompt, user_prompt, request_id=request_id, model=model)
         parsed = self._parse_and_validate(raw, request_id=request_id)
+
+        # Escalate one tier at a time while the output is invalid or low-confidence
+        reason = self._router.escalation_reason(tier, parsed)
+        while reason is not None:
+            self._escalate(tier, reason, request_id)
+            tier += 1
+            model = self._router.tiers[tier].model
+            raw_next = await self._call_llm_async(system_prompt, user_prompt, request_id=request_id, model=model)
+            parsed_next = self._parse_and_validate(raw_next, request_id=request_id)
+            if parsed_next is not None or parsed is None:
+                raw, parsed = raw_next, parsed_next
+            reason = self._router.escalation_reason(tier, parsed)
+
         if parsed is not None:
             return parsed
 
         # Retry-once policy (schema/JSON failures)
         if settings.max_retries >= 1:
             logger.warning("judge.retry request_id=%s reason=validation_failed", request_id)
-            repair_user_prompt = build_repair_prompt(raw)
-            raw2 = self._call_llm(system_prompt, repair_user_prompt, request_id=request_id, is_retry=True)
-            parsed2 = self._parse_and_validate(raw2, request_id=request_id)
+            metrics.RETRIES.inc()
+            with metrics.STAGE_SECONDS.time(stage="retry"), tracing.span("repair"):
+                plan = self._plan_repair(raw, request_id)
+                raw2 = await self._call_llm_async(
+                    system_prompt, plan.prompt, request_id=request_id, is_retry=True, model=model,
+                    response_format=plan.response_format,
+                )
+                parsed2 = self._parse_and_validate(plan.merge(raw2), request_id=request_id)
             if parsed2 is not None:
                 return parsed2
 
         raise RuntimeError(f"LLM output invalid after retry (request_id={request_id}).")
 
-    def evaluate_video(self, content: str, metadata: Optional[Dict[str, Any]] = None) -> JudgeResponse:
-        norm = normalize_video(content, metadata)
+    def evaluate_video(
+        self,
+        content: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        preclassified: bool = False,
+    ) -> JudgeResponse:
+        transcript, md = self._normalize_video(content, metadata)
+        return self.evaluate_text(transcript, md, preclassified)
+
+    async def evaluate_video_async(
+        self,
+        content: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        preclassified: bool = False,
+    ) -> JudgeResponse:
+        transcript, md = await self._normalize_video_async(content, metadata)
+        return await self.evaluate_text_async(transcript, md, preclassified)
+
+    async def evaluate_request_async(self, request: InputRequest, preclassified: bool = False) -> JudgeResponse:
+        metadata = request.metadata.model_dump() if request.metadata else None
+        if request.type == "video":
+            return await self.evaluate_video_async(request.content, metadata, preclassified)
+        return await self.evaluate_text_async(request.content, metadata, preclassified)
+
+    async def evaluate_packed_async(
+        self, requests: Sequence[InputRequest], preclassified: bool = False
+    ) -> List[Union[JudgeResponse, BaseException]]:
+        """
+        Short requests evaluated several per upstream call (packs of up to PACKING_MAX_ITEMS,
+        one model tier each). Returns one outcome per request, in order: its JudgeResponse or
+        the exception raised for it. Cache hits never enter a pack, and packed results are
+        cached under the single-item key, so later /evaluate calls hit them.
+        """
+        request_id = tracing.request_id()
+        outcomes: List[Optional[Union[JudgeResponse, BaseException]]] = [None] * len(requests)
+        prepared: List[Optional[Tuple[str, Optional[Dict[str, Any]]]]] = []
+        for i, request in enumerate(requests):
+            metadata = request.metadata.model_dump() if request.metadata else None
+            try:
+                if request.type == "video":
+                    prepared.append(await self._normalize_video_async(request.content, metadata))
+                else:
+                    prepared.append((request.content, metadata))
+            except Exception as e:
+                outcomes[i] = e
+                prepared.append(None)
+
+        if settings.preclassifier_enabled and not preclassified:
+            candidates = [i for i, p in enumerate(prepared) if p is not None]
+            local = self.preclassify([prepared[i][0] for i in candidates], [prepared[i][1] for i in candidates])
+            for i, response in zip(candidates, local):
+                outcomes[i] = response
+
+        with tracing.span("evaluate_packed", items=len(requests)):
+            packs: Dict[int, List[PackItem]] = {}
+            for i, item in enumerate(prepared):
+                if item is None or outcomes[i] is not None:
+                    continue
+                content, metadata = item
+                tier = self._choose_tier(content, metadata)
+                model = self._router.tiers[tier].model
+                system_prompt, user_prompt = self._build_prompts(content, metadata, request_id, model)
+                key = cache_key(system_prompt, user_prompt, model, settings.temperature)
+                near_key = self._near_key(content, metadata, model)
+                outcomes[i] = self._cache_lookup(key, request_id, near_key)
+                if outcomes[i] is None:
+                    packs.setdefault(tier, []).append(PackItem(i, system_prompt, user_prompt, key, near_key))
+
+            size = max(1, settings.packing_max_items)
+            groups = [(tier, items[s:s + size]) for tier, items in packs.items() for s in range(0, len(items), size)]
+            results = await asyncio.gather(*(self._evaluate_pack(items, tier, request_id) for tier, items in groups))
+            for (_, items), pack_outcomes in zip(groups, results):
+                for item, outcome in zip(items, pack_outcomes):
+                    outcomes[item.position] = outcome
+        return outcomes
+
+    async def _evaluate_pack(
+        self, items: List[PackItem], tier: int, request_id: str
+    ) -> List[Union[JudgeResponse, BaseException]]:
+        if len(items) == 1:
+            return list(await asyncio.gather(self._evaluate_item(items[0], tier, request_id), return_exceptions=True))
+
+        model = self._router.tiers[tier].model
+        system_prompt = items[0].system_prompt
+        user_prompt = build_packed_user_prompt([item.user_prompt for item in items])
+        try:
+            if settings.offline_mode:
+                raw = self._offline_response(request_id, False, items=len(items))
+            else:
+                raw = await self._call_llm_async(
+                    system_prompt, user_prompt, request_id=request_id, model=model,
+                    response_format=PACKED_RESPONSE_FORMAT,
+                )
+        except Exception as e:
+            return [e] * len(items)
+
+        try:
+            answers = split_packed(raw, len(items))
+        except JSONExtractionError as e:
+            logger.warning("judge.pack_parse_failed request_id=%s items=%s error=%s", request_id, len(items), e)
+            metrics.PARSE_FAILURES.inc()
+            answers = {}
+
+        # Each answer is validated (and locally repaired) on its own; misses go back one by one.
+        outcomes: List[Union[JudgeResponse, BaseException, None]] = [None] * len(items)
+        retry: List[int] = []
+        for pos, item in enumerate(items):
+            parsed = self._parse_and_validate(answers[pos], request_id) if pos in answers else None
+            if parsed is None or self._router.escalation_reason(tier, parsed) is not None:
+                retry.append(pos)
+                continue
+            outcomes[pos] = parsed
+            self._cache_store(item.key, parsed, item.near_key)
+        retried = await asyncio.gather(
+            *(self._evaluate_item(items[pos], tier, request_id) for pos in retry), return_exceptions=True
+        )
+        for pos, outcome in zip(retry, retried):
+            outcomes[pos] = outcome
+
+        self._record_pack(items, user_prompt, [items[pos] for pos in retry], request_id, model)
+        return outcomes
+
+    async def _evaluate_item(self, item: PackItem, tier: int, request_id: str) -> JudgeResponse:
+        result = await self._evaluate_uncached_async(item.system_prompt, item.user_prompt, request_id, tier)
+        self._cache_store(item.key, result, item.near_key)
+        return result
+
+    def _record_pack(
+        self, items: List[PackItem], user_prompt: str, retried: List[PackItem], request_id: str, model: str
+    ) -> None:
+        # Prompt tokens vs. one call per item; re-requested items pay their single prompt on top.
+        system_tokens = estimate_tokens(items[0].system_prompt)
+        singles = {id(item): system_tokens + estimate_tokens(item.user_prompt) for item in items}
+        saved = sum(singles.values()) - (system_tokens + estimate_tokens(user_prompt)) - sum(
+            singles[id(item)] for item in retried
+        )
+        self._packing["packs"] += 1
+        self._packing["items"] += len(items)
+        self._packing["rerequested"] += len(retried)
+        self._packing["prompt_tokens_saved"] += saved
+        metrics.PACKED_ITEMS.inc(len(items) - len(retried), outcome="packed")
+        metrics.PACKED_ITEMS.inc(len(retried), outcome="rerequested")
+        if saved > 0:
+            metrics.PACKING_TOKENS_SAVED.inc(saved)
+        logger.info(
+            "judge.pack_done request_id=%s model=%s items=%s rerequested=%s prompt_tokens_saved_per_item=%.1f",
+            request_id, model, len(items), len(retried), saved / len(items),
+        )
+
+    async def stream_text_async(
+        self,
+        content: str,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[StreamEvent]:
+        """
+        ("section", {"name", "value"}) for each top-level JudgeResponse field as soon
+        as it validates on its own, then ("result", full response). The result is
+        authoritative: sections replaced by escalation/repair are re-sent before it.
+        """
+        request_id = tracing.request_id()
+        if settings.preclassifier_enabled:
+            local = self.preclassify([content], [metadata])[0]
+            if local is not None:
+                for event in self._result_events(local, {}):
+                    yield event
+                return
+
+        if not settings.offline_mode:
+            await self._warm_async()
+        if (
+            settings.offline_mode
+            or not self._backend.supports_async
+            or estimate_tokens(content) > settings.max_input_tokens
+        ):
+            # Nothing to stream: offline/sync client, or chunked content that is merged at the end.
+            result = await self.evaluate_text_async(content, metadata, preclassified=True)
+            for event in self._result_events(result, {}):
+                yield event
+            return
+
+        with metrics.STAGE_SECONDS.time(stage="evaluate"), tracing.span("evaluate"):
+            tier = self._choose_tier(content, metadata)
+            model = self._router.tiers[tier].model
+            system_prompt, user_prompt = self._build_prompts(content, metadata, request_id, model)
+
+            key = cache_key(system_prompt, user_prompt, model, settings.temperature)
+            near_key = self._near_key(content, metadata, model)
+            result = self._cache_lookup(key, request_id, near_key)
+            sent: Dict[str, Any] = {}
+            if result is None:
+                parser = SectionStream()
+                parts: List[str] = []
+                async for delta in self._stream_llm_async(system_prompt, user_prompt, request_id, model):
+                    parts.append(delta)
+                    for name, value in parser.feed(delta):
+                        section = validate_section(name, value)
+                        if section is not None:
+                            sent[name] = section
+                            yield "section", {"name": name, "value": section}
+
+                raw = "".join(parts)
+                result = await self._evaluate_uncached_async(system_prompt, user_prompt, request_id, tier, raw)
+                self._cache_store(key, result, near_key)
+
+        for event in self._result_events(result, sent):
+            yield event
+
+    async def stream_video_async(
+        self,
+        content: str,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[StreamEvent]:
+        transcript, md = await self._normalize_video_async(content, metadata)
+        async for event in self.stream_text_async(transcript, md):
+            yield event
+
+    @staticmethod
+    def _result_events(result: JudgeResponse, sent: Dict[str, Any]) -> List[StreamEvent]:
+        body = result.model_dump(mode="json")
+        events: List[StreamEvent] = [
+            ("section", {"name": name, "value": body[name]}) for name in SECTIONS if sent.get(name) != body[name]
+        ]
+        events.append(("result", body))
+        return events
+
+    def preclassify(
+        self,
+        contents: List[str],
+        metadatas: List[Optional[Dict[str, Any]]],
+    ) -> List[Optional[JudgeResponse]]:
+        """
+        Vectorized stylometric pass over a batch. Returns a local JudgeResponse for
+        items beyond settings.preclassifier_threshold, None for items that need the LLM.
+        """
+        from app import stylometry  # NumPy; only loaded when pre-classification or tiering is on
+
+        out: List[Optional[JudgeResponse]] = []
+        for prediction, metadata in zip(stylometry.predict(contents), metadatas):
+            self._preclassified += 1
+            if prediction.confidence >= settings.preclassifier_threshold:
+                self._short_circuited += 1
+                metrics.PRECLASSIFIER.inc(outcome="short_circuit")
+                out.append(stylometry.local_response(prediction, metadata))
+            else:
+                metrics.PRECLASSIFIER.inc(outcome="routed")
+                out.append(None)
+        return out
+
+    def _normalize_video(self, content: str, metadata: Optional[Dict[str, Any]]):
+        with tracing.span("normalize_video"):
+            norm = normalize_video(content, metadata)
         # Include normalization notes into metadata for traceability (optional, small signal)
         md = dict(metadata or {})
         md["video_normalization_notes"] = norm.notes
-        return self.evaluate_text(norm.transcript, md)
+        return norm.transcript, md
+
+    async def _normalize_video_async(self, content: str, metadata: Optional[Dict[str, Any]]):
+        # Media ingestion hashes the file and waits on the process pool: keep it off the event loop.
+        if is_media_path(content):
+            return await asyncio.to_thread(self._normalize_video, content, metadata)
+        return self._normalize_video(content, metadata)
+
+    def _choose_tier(self, content: str, metadata: Optional[Dict[str, Any]]) -> int:
+        if not self._router.multi_tier:
+            return 0
+        from app import stylometry
+
+        cheap_confidence = stylometry.predict([content])[0].confidence
+        return self._router.choose(estimate_tokens(content), metadata, cheap_confidence)
+
+    def _escalate(self, tier: int, reason: str, request_id: str) -> None:
+        logger.info(
+            "judge.escalate request_id=%s from=%s to=%s reason=%s",
+            request_id, self._router.tiers[tier].model, self._router.tiers[tier + 1].model, reason,
+        )
+        self._router.record_escalation(tier, reason)
+
+    def _chunks_over_budget(self, content: str, request_id: str) -> Tuple[Optional[List[str]], int]:
+        """
+        Token-budget pre-stage: (None, 0) when content fits, otherwise the chunks to
+        evaluate (each under budget; evenly sampled down to settings.max_chunks) and
+        how many chunks the sampling skipped.
+        """
+        tokens = estimate_tokens(content)
+        if tokens <= settings.max_input_tokens:
+            return None, 0
+        chunks = split_into_chunks(content, settings.max_input_tokens)
+        if len(chunks) < 2:
+            return None, 0
+        sampled = sample_evenly(chunks, settings.max_chunks)
+        skipped = len(chunks) - len(sampled)
+        metrics.CHUNKED_EVALUATIONS.inc()
+        logger.info(
+            "judge.chunked request_id=%s tokens=%s chunks=%s skipped=%s", request_id, tokens, len(sampled), skipped
+        )
+        return sampled, skipped
+
+    @staticmethod
+    def _chunk_metadata(metadata: Optional[Dict[str, Any]], index: int, total: int) -> Dict[str, Any]:
+        md = dict(metadata or {})
+        md["chunk"] = f"{index + 1}/{total}"  # tells the model it sees a segment, not the whole
+        return md
+
+    def _build_prompts(self, content: str, metadata: Optional[Dict[str, Any]], request_id: str, model: str):
+        # model: the routed tier's, for logs and traces
+        with metrics.STAGE_SECONDS.time(stage="prompt_build"), tracing.span("prompt_build", model=model):
+            system_prompt = build_system_prompt()
+            user_prompt = build_user_prompt(content, metadata)
+
+        logger.info("judge.evaluate_text start request_id=%s model=%s offline=%s",
+                    request_id, model, settings.offline_mode)
+        return system_prompt, user_prompt
+
+    def _near_key(
+        self, content: str, metadata: Optional[Dict[str, Any]], model: str
+    ) -> Optional[Tuple[str, Optional[int]]]:
+        # (namespace, fingerprint) for the near-duplicate cache; fingerprint is None for short content
+        if self._semantic is None:
+            return None
+        return self._semantic.namespace(model, metadata), self._semantic.fingerprint(content)
+
+    def _cache_lookup(
+        self, key: str, request_id: str, near_key: Optional[Tuple[str, Optional[int]]] = None
+    ) -> Optional[JudgeResponse]:
+        cached = self._cache.get(key) if self._cache is not None else None
+        if self._cache is not None:
+            metrics.CACHE_REQUESTS.inc(result="miss" if cached is None else "hit")
+        span = tracing.current_span()
+        if cached is not None:
+            logger.info("judge.cache_hit request_id=%s key=%s", request_id, key[:12])
+        elif near_key is not None:
+            near = self._semantic.get(*near_key)
+            if near_key[1] is None:
+                metrics.SEMANTIC_CACHE_REQUESTS.inc(result="skipped")
+            else:
+                metrics.SEMANTIC_CACHE_REQUESTS.inc(result="miss" if near is None else "hit")
+            if near is not None:
+                cached, score = near
+                logger.info("judge.near_duplicate_hit request_id=%s similarity=%.3f", request_id, score)
+                if span is not None:
+                    span.set(near_duplicate_similarity=score)
+                if self._cache is not None:
+                    self._cache.set(key, cached)  # an exact repeat of this variant skips fingerprinting
+        if span is not None:
+            span.set(cache_hit=cached is not None)
+        return cached
+
+    def _cache_store(
+        self, key: str, result: JudgeResponse, near_key: Optional[Tuple[str, Optional[int]]] = None
+    ) -> None:
+        if self._cache is not None:
+            self._cache.set(key, result)
+        if near_key is not None:
+            self._semantic.add(*near_key, result)
 
-    def _call_llm(self, system_prompt: str, user_prompt: str, request_id: str, is_retry: bool = False) -> str:
-        # Offline mode: deterministic mock response for local dev / quota blockers
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cache": self._cache.stats() if self._cache is not None else {"enabled": False},
+            "semantic_cache": self._semantic.stats() if self._semantic is not None else {"enabled": False},
+            "preclassifier": {
+                "enabled": settings.preclassifier_enabled,
+                "threshold": settings.preclassifier_threshold,
+                "evaluated": self._preclassified,
+                "short_circuited": self._short_circuited,
+                "short_circuit_share": self._short_circuited / self._preclassified if self._preclassified else 0.0,
+            },
+            "tiers": self._router.stats(),
+            "coalescing": self._singleflight.stats(),
+            "repair": {
+                **self._repairs,
+                "retries_avoided": self._repairs["local"],
+                "prompt_tokens_saved": self._repair_tokens_saved,
+            },
+            "packing": {
+                **self._packing,
+                "prompt_tokens_saved_per_item": (
+                    self._packing["prompt_tokens_saved"] / self._packing["items"] if self._packing["items"] else 0.0
+                ),
+            },
+            "upstream": self._guard.stats(),
+            "tokens": {
+                "prompt": self.usage.prompt_tokens,
+                "completion": self.usage.completion_tokens,
+                "total": self.usage.total_tokens,
+                "cached_prompt": self.usage.cached_prompt_tokens,
+            },
+        }
+
+    def _offline_response(self, request_id: str, is_retry: bool, items: int = 0) -> str:
+        # items > 0: the answer to a packed prompt of that many items
+        logger.info("judge.offline_mode request_id=%s retry=%s", request_id, is_retry)
+        metrics.OFFLINE_HITS.inc()
+        tracing.record("llm_call", time.perf_counter(), offline=True, retry=is_retry)
+        return offline_packed_response(OFFLINE_RESPONSE, items) if items else OFFLINE_RESPONSE
+
+    @staticmethod
+    def _messages(system_prompt: str, user_prompt: str):
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+
+    def _completion_kwargs(
+        self, system_prompt: str, user_prompt: str, model: str, response_format: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {
+            "model": model,
+            "temperature": settings.temperature,
+            "messages": self._messages(system_prompt, user_prompt),
+        }
+        if self._structured_output:
+            kwargs["response_format"] = response_format or RESPONSE_FORMAT
+        return kwargs
+
+    def _should_fall_back(self, e: Exception, request_id: str) -> bool:
+        """
+        True (and structured output is switched off) when the upstream rejected the
+        response_format itself, e.g. a model without JSON-schema support.
+        """
+        if not self._structured_output or getattr(e, "status_code", None) != 400:
+            return False
+        message = str(e)
+        if "response_format" not in message and "json_schema" not in message:
+            return False
+        logger.warning("judge.structured_output_rejected request_id=%s error=%s", request_id, repr(e))
+        metrics.STRUCTURED_OUTPUT_FALLBACKS.inc()
+        self._structured_output = False
+        return True
+
+    def _call_llm(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        request_id: str,
+        is_retry: bool = False,
+        model: Optional[str] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
         if settings.offline_mode:
-            logger.info("judge.offline_mode request_id=%s retry=%s", request_id, is_retry)
-            return json.dumps({
-                "generation_prediction": {
-                    "label": "Human",
-                    "confidence": 0.62,
-                    "reasoning": "Contains personal narrative cues and emotionally specific phrasing; less uniformly polished."
-                },
-                "virality": {
-                    "score": 68,
-                    "confidence": 0.6,
-                    "reasoning": "Relatable theme with moderate emotional intensity; clear and shareable framing."
-                },
-                "distribution_analysis": {
-                    "likely_audiences": [
-                        {"community": "LinkedIn professionals", "why": "Career and learning narratives perform well."},
-                        {"community": "Startup builders", "why": "Build/ship stories resonate with builders."}
-                    ],
-                    "reasoning": "Topic aligns with career growth and builder communities; metadata can refine this further."
-                },
-                "meta_explanation": "Offline development mode: deterministic mock output to validate pipeline and schema."
-            })
-
-        start = time.time()
+            return self._offline_response(request_id, is_retry)
+
+        self.warm()
+        model = model or self._router.tiers[0].model
+
+        # Same limiter/breaker/rate budget as the async path; may block in pacing, or shed.
+        self._guard.acquire_sync()
+
+        start = time.perf_counter()
         try:
-            resp = self._client.chat.completions.create(
-                model=settings.model_name,
-                temperature=settings.temperature,
-                timeout=settings.timeout_seconds,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-            )
-            text = resp.choices[0].message.content or ""
-            latency_ms = int((time.time() - start) * 1000)
-            logger.info(
-                "judge.llm_ok request_id=%s retry=%s latency_ms=%s chars=%s",
-                request_id, is_retry, latency_ms, len(text)
-            )
-            return text
+            try:
+                resp = self._backend.complete(
+                    **self._completion_kwargs(system_prompt, user_prompt, model, response_format)
+                )
+            except Exception as e:
+                if not self._should_fall_back(e, request_id):
+                    raise
+                resp = self._backend.complete(
+                    **self._completion_kwargs(system_prompt, user_prompt, model, response_format)
+                )
+            text = self._handle_llm_ok(resp, start, request_id, is_retry, model)
 
-        except Exception as e:
-            latency_ms = int((time.time() - start) * 1000)
-            logger.exception(
-                "judge.llm_error request_id=%s retry=%s latency_ms=%s error=%s",
-                request_id, is_retry, latency_ms, repr(e)
-            )
+        except BaseException as e:
+            overloaded = self._guard.release(time.perf_counter() - start, e)
+            if not isinstance(e, Exception):
+                raise
+            self._log_llm_error(e, start, request_id, is_retry, model)
+            if overloaded is not None:
+                raise overloaded from e
             # Wrap OpenAI exceptions so API doesn’t leak vendor details
             raise RuntimeError("Upstream LLM call failed.") from e
 
-    def _parse_and_validate(self, raw_text: str, request_id: str) -> Optional[JudgeResponse]:
-        candidate = (raw_text or "").strip()
-        obj: Any = None
+        self._guard.release(time.perf_counter() - start)
+        return text
 
-        def try_load(s: str):
-            return json.loads(s)
+    async def _call_llm_async(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        request_id: str,
+        is_retry: bool = False,
+        model: Optional[str] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        if settings.offline_mode:
+            return self._offline_response(request_id, is_retry)
 
-        # 1) direct parse
+        await self._warm_async()
+        if not self._backend.supports_async:
+            # Injected sync-only client: keep the event loop free while it blocks.
+            return await asyncio.to_thread(
+                self._call_llm, system_prompt, user_prompt, request_id, is_retry, model, response_format
+            )
+
+        model = model or self._router.tiers[0].model
+
+        # Sheds immediately (OverloadedError) when over the adaptive limit, the breaker is open,
+        # or the provider asked us to back off for longer than we're willing to wait.
+        await self._guard.acquire()
+
+        start = time.perf_counter()
         try:
-            obj = try_load(candidate)
-        except Exception:
-            # 2) best-effort brace extraction
-            start = candidate.find("{")
-            end = candidate.rfind("}")
-            if start != -1 and end != -1 and end > start:
-                sliced = candidate[start:end + 1]
-                try:
-                    obj = try_load(sliced)
-                except Exception as e2:
-                    logger.warning("judge.json_parse_failed request_id=%s error=%s", request_id, repr(e2))
-                    return None
-            else:
-                logger.warning("judge.json_missing_braces request_id=%s", request_id)
-                return None
+            backend = self._backend
+            try:
+                resp = await backend.acomplete(
+                    **self._completion_kwargs(system_prompt, user_prompt, model, response_format)
+                )
+            except Exception as e:
+                if not self._should_fall_back(e, request_id):
+                    raise
+                resp = await backend.acomplete(
+                    **self._completion_kwargs(system_prompt, user_prompt, model, response_format)
+                )
+            text = self._handle_llm_ok(resp, start, request_id, is_retry, model)  # raises on e.g. choices=[]
+
+        except BaseException as e:
+            # The guard slot is released exactly once per acquire, cancellation included.
+            overloaded = self._guard.release(time.perf_counter() - start, e)
+            if not isinstance(e, Exception):
+                raise
+            self._log_llm_error(e, start, request_id, is_retry, model)
+            if overloaded is not None:
+                raise overloaded from e
+            # Wrap OpenAI exceptions so API doesn’t leak vendor details
+            raise RuntimeError("Upstream LLM call failed.") from e
 
+        self._guard.release(time.perf_counter() - start)
+        return text
+
+    async def _stream_llm_async(
+        self, system_prompt: str, user_prompt: str, request_id: str, model: str
+    ) -> AsyncIterator[str]:
+        """Content deltas from a streamed completion; same guard, fallback and accounting as _call_llm_async."""
+        await self._guard.acquire()
+
+        start = time.perf_counter()
+        parts: List[str] = []
+        usage = None
+        outcome: Optional[BaseException] = None
         try:
-            return JudgeResponse.model_validate(obj)
-        except ValidationError as ve:
-            logger.warning("judge.schema_validation_failed request_id=%s errors=%s", request_id, ve.errors())
+            backend = self._backend
+            try:
+                stream = await backend.acomplete(
+                    **self._completion_kwargs(system_prompt, user_prompt, model), **STREAM_KWARGS
+                )
+            except Exception as e:
+                if not self._should_fall_back(e, request_id):
+                    raise
+                stream = await backend.acomplete(
+                    **self._completion_kwargs(system_prompt, user_prompt, model), **STREAM_KWARGS
+                )
+            async for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
+
+        except Exception as e:
+            outcome = e
+            overloaded = self._guard.release(time.perf_counter() - start, e)
+            self._log_llm_error(e, start, request_id, False, model)
+            if overloaded is not None:
+                raise overloaded from e
+            raise RuntimeError("Upstream LLM call failed.") from e
+
+        finally:
+            if outcome is None:
+                # Also reached when the client disconnects mid-stream (generator closed).
+                self._guard.release(time.perf_counter() - start)
+
+        self._record_llm_ok("".join(parts), usage, start, request_id, False, model)
+
+    def _handle_llm_ok(self, resp, start: float, request_id: str, is_retry: bool, model: str) -> str:
+        text = resp.choices[0].message.content or ""
+        return self._record_llm_ok(text, getattr(resp, "usage", None), start, request_id, is_retry, model)
+
+    def _record_llm_ok(self, text: str, usage, start: float, request_id: str, is_retry: bool, model: str) -> str:
+        elapsed = time.perf_counter() - start
+        prompt_tokens = (usage.prompt_tokens or 0) if usage is not None else 0
+        completion_tokens = (usage.completion_tokens or 0) if usage is not None else 0
+        self._router.record_call(model, elapsed, prompt_tokens, completion_tokens, ok=True)
+        if usage is not None:
+            self.usage.prompt_tokens += usage.prompt_tokens or 0
+            self.usage.completion_tokens += usage.completion_tokens or 0
+            metrics.TOKENS.inc(usage.prompt_tokens or 0, kind="prompt")
+            metrics.TOKENS.inc(usage.completion_tokens or 0, kind="completion")
+            details = getattr(usage, "prompt_tokens_details", None)
+            cached = getattr(details, "cached_tokens", None) or 0
+            self.usage.cached_prompt_tokens += cached
+            metrics.TOKENS.inc(cached, kind="cached_prompt")
+        metrics.STAGE_SECONDS.observe(elapsed, stage="llm_call")
+        tracing.record(
+            "llm_call", start, model=model, retry=is_retry,
+            prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, chars=len(text),
+        )
+        latency_ms = int(elapsed * 1000)
+        logger.info(
+            "judge.llm_ok request_id=%s retry=%s model=%s latency_ms=%s chars=%s",
+            request_id, is_retry, model, latency_ms, len(text)
+        )
+        return text
+
+    def _log_llm_error(self, e: Exception, start: float, request_id: str, is_retry: bool, model: str) -> None:
+        elapsed = time.perf_counter() - start
+        self._router.record_call(model, elapsed, 0, 0, ok=False)
+        metrics.STAGE_SECONDS.observe(elapsed, stage="llm_call")
+        metrics.UPSTREAM_ERRORS.inc()
+        tracing.record("llm_call", start, error=e, model=model, retry=is_retry)
+        latency_ms = int(elapsed * 1000)
+        logger.exception(
+            "judge.llm_error request_id=%s retry=%s model=%s latency_ms=%s error=%s",
+            request_id, is_retry, model, latency_ms, repr(e)
+        )
+
+    def _repair_locally(self, text: str, request_id: str) -> Optional[JudgeResponse]:
+        # Deterministic fixes for near-misses; a success here is an LLM retry avoided.
+        repaired, fixes = repair_locally(text)
+        if repaired is None:
             return None
+        self._repairs["local"] += 1
+        metrics.REPAIRS.inc(kind="local")
+        logger.info("judge.local_repair request_id=%s fixes=%s", request_id, fixes)
+        return repaired
+
+    def _plan_repair(self, raw: str, request_id: str) -> RepairPlan:
+        plan = plan_repair(raw, self._structured_output)
+        self._repairs[plan.kind] += 1
+        self._repair_tokens_saved += plan.prompt_tokens_saved
+        metrics.REPAIRS.inc(kind=plan.kind)
+        logger.info(
+            "judge.repair_plan request_id=%s kind=%s prompt_tokens_saved=%s",
+            request_id, plan.kind, plan.prompt_tokens_saved,
+        )
+        return plan
+
+    def _parse_and_validate(self, raw_text: str, request_id: str) -> Optional[JudgeResponse]:
+        candidate = (raw_text or "").strip()
+
+        with metrics.STAGE_SECONDS.time(stage="parse_validate"), tracing.span("parse_validate") as span:
+            outcome, parsed = "valid", None
+            try:
+                parsed = validate_json_output(JudgeResponse, candidate)
+            except ValidationError as ve:
+                logger.warning("judge.schema_validation_failed request_id=%s errors=%s", request_id, ve.errors())
+                metrics.SCHEMA_FAILURES.inc()
+                parsed = self._repair_locally(candidate, request_id)
+                outcome = "schema_invalid" if parsed is None else "local_repair"
+            except JSONExtractionError as e:
+                logger.warning("judge.json_parse_failed request_id=%s error=%s", request_id, e)
+                metrics.PARSE_FAILURES.inc()
+                outcome = "parse_failed"
+            if span is not None:
+                span.set(outcome=outcome)
+            return parsed
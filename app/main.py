@@ -1,57 +1,172 @@
 # app/main.py
-from fastapi import FastAPI
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 import logging
-import uuid
+import math
+import os
 
-from app.models import InputRequest, JudgeResponse, JudgeErrorResponse
-from app.judge import JudgeAgent
+from app.models import InputRequest, JudgeResponse, JudgeErrorResponse, BatchRequest, BatchResponse, JobRequest, JobResponse
+from app.jobs import InvalidWebhookError, JobQueue, JobStore
+from app.judge import JudgeAgent, StreamEvent
+from app.batch import EVALUATION_FAILED_DETAIL, OVERLOADED_DETAIL, error_for_exception, evaluate_batch
 from app.config import settings
+from app.resilience import OverloadedError
+from app.streaming import format_sse
+from app import metrics, tracing, video
 
-# ---------------------------------------------------------
-# Logging setup
-# ---------------------------------------------------------
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------
-# FastAPI app
+# JudgeAgent: created once, on first use
 # ---------------------------------------------------------
-app = FastAPI(
-    title="Judge Agent API",
-    description="Evaluates text and video content for AI-generation likelihood, virality, and distribution analysis.",
-    version=settings.app_version,
-)
+# Construction is cheap (no SDK import, no client); the upstream clients are
+# built by agent.warm(), which the lifespan runs in the background so the
+# server accepts connections (and /health answers) before they exist.
+_judge_agent: Optional[JudgeAgent] = None
+_judge_agent_lock = threading.Lock()
+
+
+def get_judge_agent() -> Optional[JudgeAgent]:
+    global _judge_agent
+    if _judge_agent is None:
+        with _judge_agent_lock:
+            if _judge_agent is None:
+                try:
+                    _judge_agent = JudgeAgent()
+                except Exception as e:
+                    logger.exception("Failed to initialize JudgeAgent: %s", str(e))
+                    return None
+    return _judge_agent
+
 
 # ---------------------------------------------------------
-# Instantiate JudgeAgent once at startup
+# Job queue: created on first use, or at startup when a queue file already exists
 # ---------------------------------------------------------
-try:
-    judge_agent = JudgeAgent()
-except Exception as e:
-    logger.exception("Failed to initialize JudgeAgent: %s", str(e))
-    judge_agent = None
+_job_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> Optional[JobQueue]:
+    global _job_queue
+    if _job_queue is None:
+        judge_agent = get_judge_agent()
+        if judge_agent is None:
+            return None
+        with _judge_agent_lock:
+            if _job_queue is None:
+                _job_queue = JobQueue(
+                    JobStore(settings.jobs_sqlite_path, settings.jobs_retention_seconds),
+                    judge_agent,
+                    workers=settings.jobs_workers,
+                    max_in_flight_per_client=settings.jobs_max_in_flight_per_client,
+                    max_queued=settings.jobs_max_queued,
+                    max_requeues=settings.jobs_max_requeues,
+                    webhook_allowed_hosts=[
+                        h.strip() for h in settings.jobs_webhook_allowed_hosts.split(",") if h.strip()
+                    ],
+                )
+    return _job_queue
+
+
+async def _warm(agent: JudgeAgent) -> None:
+    try:
+        await asyncio.to_thread(agent.warm)
+    except Exception as e:
+        # Not fatal: the first upstream call retries warm() and surfaces the error per request.
+        logger.exception("JudgeAgent warm-up failed: %s", str(e))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    judge_agent = get_judge_agent()
+    warmup = asyncio.create_task(_warm(judge_agent)) if judge_agent is not None else None
+    if os.path.exists(settings.jobs_sqlite_path):
+        # Resume jobs accepted before a restart.
+        job_queue = get_job_queue()
+        if job_queue is not None:
+            job_queue.start()
+    yield
+    if warmup is not None:
+        await warmup
+    if _job_queue is not None:
+        await _job_queue.stop()
+    # Release pooled upstream connections on shutdown
+    if judge_agent is not None:
+        await judge_agent.aclose()
+    video.shutdown()
+
+
+router = APIRouter()
+
+
+def error_response(
+    status_code: int, error: str, detail: str, request_id: str, headers: Optional[Dict[str, str]] = None
+) -> JSONResponse:
+    # Bypass response_model validation: errors use their own contract.
+    body = JudgeErrorResponse(error=error, detail=detail, request_id=request_id)
+    return JSONResponse(status_code=status_code, content=body.model_dump(), headers=headers)
+
 
 # ---------------------------------------------------------
 # Health Endpoint
 # ---------------------------------------------------------
-@app.get("/health", summary="Health check endpoint")
+@router.get("/health", summary="Health check endpoint")
 def health() -> dict:
     return {"status": "ok"}
 
 
+# ---------------------------------------------------------
+# Readiness Endpoint
+# ---------------------------------------------------------
+@router.get("/ready", summary="Readiness: 200 once the upstream client is warm, 503 before")
+def ready() -> JSONResponse:
+    judge_agent = get_judge_agent()
+    if judge_agent is None:
+        return JSONResponse(status_code=503, content={"status": "unavailable"})
+    if not judge_agent.ready:
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    return JSONResponse(status_code=200, content={"status": "ready"})
+
+
+# ---------------------------------------------------------
+# Metrics Endpoint (Prometheus text format)
+# ---------------------------------------------------------
+@router.get("/metrics", summary="Prometheus metrics", response_class=PlainTextResponse)
+def metrics_endpoint() -> PlainTextResponse:
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
+# ---------------------------------------------------------
+# Stats Endpoint
+# ---------------------------------------------------------
+@router.get("/stats", summary="Runtime counters (cache hit/miss, etc.)")
+def stats() -> dict:
+    judge_agent = get_judge_agent()
+    if judge_agent is None:
+        return {}
+    out = judge_agent.stats()
+    if _job_queue is not None:
+        out["jobs"] = _job_queue.stats()
+    return out
+
+
 # ---------------------------------------------------------
 # Evaluate Endpoint
 # ---------------------------------------------------------
-@app.post(
+@router.post(
     "/evaluate",
     response_model=JudgeResponse,
     responses={
         400: {"model": JudgeErrorResponse},
         500: {"model": JudgeErrorResponse},
+        503: {"model": JudgeErrorResponse},
     },
     summary="Evaluate content for AI-generation, virality, and distribution analysis",
 )
-def evaluate(request: InputRequest):
+async def evaluate(request: InputRequest):
     """
     Evaluates text or video content using the JudgeAgent.
 
@@ -59,49 +174,203 @@ def evaluate(request: InputRequest):
     - Defensive LLM handling
     - Retry-once policy
     - Controlled failure surface
+    - Non-blocking: the upstream call runs on the event loop, not the threadpool
+    - Load shedding: 503 + Retry-After instead of queueing when upstream is saturated
     """
 
-    request_id = str(uuid.uuid4())
+    request_id = tracing.request_id()
+    judge_agent = get_judge_agent()
 
     if judge_agent is None:
-        return JudgeErrorResponse(
-            error="initialization_failed",
-            detail="JudgeAgent failed to initialize.",
-            request_id=request_id,
-        )
+        return error_response(500, "initialization_failed", "JudgeAgent failed to initialize.", request_id)
 
     try:
         metadata_dict = request.metadata.model_dump() if request.metadata else None
 
         if request.type == "text":
-            return judge_agent.evaluate_text(
+            return await judge_agent.evaluate_text_async(
                 content=request.content,
                 metadata=metadata_dict,
             )
 
         if request.type == "video":
-            return judge_agent.evaluate_video(
+            return await judge_agent.evaluate_video_async(
                 content=request.content,
                 metadata=metadata_dict,
             )
 
-        return JudgeErrorResponse(
-            error="invalid_type",
-            detail="Invalid type. Must be 'text' or 'video'.",
-            request_id=request_id,
-        )
+        return error_response(400, "invalid_type", "Invalid type. Must be 'text' or 'video'.", request_id)
+
+    except OverloadedError as e:
+        retry_after = str(math.ceil(e.retry_after or 1.0))
+        return error_response(503, "overloaded", OVERLOADED_DETAIL, request_id, headers={"Retry-After": retry_after})
 
     except RuntimeError:
-        return JudgeErrorResponse(
-            error="evaluation_failed",
-            detail="LLM output invalid after retry or upstream call failed.",
-            request_id=request_id,
-        )
+        return error_response(500, "evaluation_failed", EVALUATION_FAILED_DETAIL, request_id)
 
     except Exception as e:
         logger.exception("Unexpected server error: %s", str(e))
-        return JudgeErrorResponse(
-            error="unexpected_error",
-            detail="Unexpected server error.",
-            request_id=request_id,
-        )
+        return error_response(500, "unexpected_error", "Unexpected server error.", request_id)
+
+
+# ---------------------------------------------------------
+# Streaming Evaluate Endpoint (server-sent events)
+# ---------------------------------------------------------
+async def sse_stream(events: AsyncIterator[StreamEvent], request_id: str) -> AsyncIterator[str]:
+    # Headers are already sent once streaming starts, so failures become an `error` event.
+    try:
+        async for event, data in events:
+            yield format_sse(event, data)
+    except Exception as e:
+        yield format_sse("error", error_for_exception(e, request_id).model_dump())
+
+
+@router.post(
+    "/evaluate/stream",
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {"text/event-stream": {}}},
+        500: {"model": JudgeErrorResponse},
+    },
+    summary="Evaluate content, streaming each response section as it validates (SSE)",
+)
+async def evaluate_stream(request: InputRequest):
+    """
+    Same evaluation as /evaluate, as server-sent events:
+
+    - `section`: {"name", "value"} for generation_prediction, virality, distribution_analysis,
+      meta_explanation, each sent as soon as it validates against its own schema
+    - `result`: the full JudgeResponse (authoritative; sections changed by repair/escalation are re-sent first)
+    - `error`: a JudgeErrorResponse if evaluation fails mid-stream
+    """
+
+    request_id = tracing.request_id()
+    judge_agent = get_judge_agent()
+
+    if judge_agent is None:
+        return error_response(500, "initialization_failed", "JudgeAgent failed to initialize.", request_id)
+
+    metadata_dict = request.metadata.model_dump() if request.metadata else None
+    if request.type == "video":
+        events = judge_agent.stream_video_async(request.content, metadata_dict)
+    else:
+        events = judge_agent.stream_text_async(request.content, metadata_dict)
+
+    return StreamingResponse(
+        sse_stream(events, request_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ---------------------------------------------------------
+# Batch Evaluate Endpoint
+# ---------------------------------------------------------
+@router.post(
+    "/evaluate/batch",
+    response_model=BatchResponse,
+    responses={500: {"model": JudgeErrorResponse}},
+    summary="Evaluate a list of items with bounded concurrency",
+)
+async def evaluate_batch_endpoint(request: BatchRequest):
+    """
+    Evaluates many items in one call.
+
+    - Results are returned in input order, one per item
+    - Per-item failures become JudgeErrorResponse entries; the batch itself still succeeds
+    - Duplicate items are evaluated once (BATCH_CONCURRENCY bounds in-flight calls)
+    """
+
+    request_id = tracing.request_id()
+    judge_agent = get_judge_agent()
+
+    if judge_agent is None:
+        return error_response(500, "initialization_failed", "JudgeAgent failed to initialize.", request_id)
+
+    outcomes = await evaluate_batch(judge_agent, request.items, concurrency=settings.batch_concurrency)
+
+    results = [
+        outcome if isinstance(outcome, JudgeResponse) else error_for_exception(outcome, f"{request_id}:{i}")
+        for i, outcome in enumerate(outcomes)
+    ]
+    return BatchResponse(results=results)
+
+
+# ---------------------------------------------------------
+# Async Job Endpoints
+# ---------------------------------------------------------
+@router.post(
+    "/jobs",
+    status_code=202,
+    response_model=JobResponse,
+    responses={
+        422: {"model": JudgeErrorResponse}, 500: {"model": JudgeErrorResponse}, 503: {"model": JudgeErrorResponse},
+    },
+    summary="Queue an evaluation; poll GET /jobs/{job_id} or receive it on webhook_url",
+)
+async def create_job(request: JobRequest, http_request: Request):
+    """
+    For evaluations that outlive the load balancer's idle timeout (video, long text).
+
+    - Persistent queue: accepted jobs survive restarts
+    - Priority lanes: high, normal (default), low
+    - Per-client fairness: at most JOBS_MAX_IN_FLIGHT_PER_CLIENT running per client address, or per
+      X-Client-Id when JOBS_TRUST_CLIENT_ID_HEADER=true (only behind a proxy that sets the header)
+    - webhook_url (optional): receives the finished JobResponse as a POST; public hosts only,
+      or those in JOBS_WEBHOOK_ALLOWED_HOSTS
+    """
+
+    request_id = tracing.request_id()
+    job_queue = get_job_queue()
+
+    if job_queue is None:
+        return error_response(500, "initialization_failed", "JudgeAgent failed to initialize.", request_id)
+
+    job_queue.start()
+    client = http_request.headers.get("x-client-id") if settings.jobs_trust_client_id_header else None
+    client = client or (http_request.client.host if http_request.client else "")
+    try:
+        job = await asyncio.to_thread(job_queue.submit, request, client or "anonymous")
+    except InvalidWebhookError as e:
+        return error_response(422, "invalid_webhook_url", str(e), request_id)
+    except OverloadedError as e:
+        retry_after = str(math.ceil(e.retry_after or 1.0))
+        return error_response(503, "overloaded", "Job queue is full.", request_id, headers={"Retry-After": retry_after})
+
+    return JSONResponse(status_code=202, content=job.model_dump(mode="json"), headers={"Location": f"/jobs/{job.job_id}"})
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=JobResponse,
+    responses={404: {"model": JudgeErrorResponse}, 500: {"model": JudgeErrorResponse}},
+    summary="Job status; result (or error) once finished",
+)
+def get_job(job_id: str):
+    job_queue = get_job_queue()
+
+    if job_queue is None:
+        return error_response(500, "initialization_failed", "JudgeAgent failed to initialize.", job_id)
+
+    job = job_queue.store.get(job_id)
+    if job is None:
+        return error_response(404, "not_found", "Unknown job id.", job_id)
+    return job
+
+# ---------------------------------------------------------
+# FastAPI app
+# ---------------------------------------------------------
+def create_app() -> FastAPI:
+    logging.basicConfig(level=logging.INFO)
+    application = FastAPI(
+        title="Judge Agent API",
+        description="Evaluates text and video content for AI-generation likelihood, virality, and distribution analysis.",
+        version=settings.app_version,
+        lifespan=lifespan,
+    )
+    application.add_middleware(tracing.TracingMiddleware)
+    application.include_router(router)
+    return application
+
+
+app = create_app()
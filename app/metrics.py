@@ -0,0 +1,272 @@
+# app/metrics.py
+"""
+Minimal in-process metrics with Prometheus text exposition (served at /metrics).
+
+Kept dependency-free on purpose: counters and histograms with static label
+names cover what we need, and the text format is stable and simple.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# Seconds; spans sub-millisecond local stages up to the upstream timeout.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: (bucket counts, sum, count)
+        self._values: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            idx = bisect_left(self.buckets, value)
+            if idx < len(counts):
+                counts[idx] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        # Monotonic clock: immune to wall-clock adjustments.
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(c), s, n)) for k, (c, s, n) in self._values.items())
+        lines: List[str] = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets, counts):
+                cumulative += c
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            inf = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+registry = Registry()
+
+# ---------------------------------------------------------
+# JudgeAgent metrics
+# ---------------------------------------------------------
+STAGE_SECONDS = registry.histogram(
+    "judge_stage_seconds",
+    "Time spent per evaluation stage (prompt_build, llm_call, parse_validate, retry, evaluate).",
+    labelnames=("stage",),
+)
+RETRIES = registry.counter("judge_retries_total", "Repair retries issued after a validation failure.")
+PARSE_FAILURES = registry.counter("judge_parse_failures_total", "LLM outputs that were not parseable JSON.")
+SCHEMA_FAILURES = registry.counter("judge_schema_failures_total", "LLM outputs that failed JudgeResponse validation.")
+OFFLINE_HITS = registry.counter("judge_offline_hits_total", "LLM calls answered by offline mode.")
+UPSTREAM_ERRORS = registry.counter("judge_upstream_errors_total", "LLM calls that raised an upstream error.")
+TOKENS = registry.counter("judge_tokens_total", "Provider-reported token usage.", labelnames=("kind",))
+CACHE_REQUESTS = registry.counter("judge_cache_requests_total", "Response cache lookups.", labelnames=("result",))
+SEMANTIC_CACHE_REQUESTS = registry.counter(
+    "judge_semantic_cache_requests_total",
+    "Near-duplicate cache lookups after an exact-cache miss (hit, miss, skipped for short content).",
+    labelnames=("result",),
+)
+STRUCTURED_OUTPUT_FALLBACKS = registry.counter(
+    "judge_structured_output_fallbacks_total",
+    "Times the model rejected the JSON-schema response_format and the agent fell back to plain JSON mode.",
+)
+CHUNKED_EVALUATIONS = registry.counter(
+    "judge_chunked_evaluations_total", "Evaluations over the input token budget that were split into chunks."
+)
+PRECLASSIFIER = registry.counter(
+    "judge_preclassifier_total", "Pre-classifier decisions (short_circuit or routed to the LLM).", labelnames=("outcome",)
+)
+ESCALATIONS = registry.counter(
+    "judge_escalations_total", "Escalations to a stronger model tier.", labelnames=("tier", "reason")
+)
+TIER_LATENCY_SECONDS = registry.histogram(
+    "judge_tier_latency_seconds", "Upstream call latency per model tier.", labelnames=("tier",)
+)
+TIER_COST_USD = registry.counter("judge_tier_cost_usd_total", "Estimated spend per model tier.", labelnames=("tier",))
+COALESCED_REQUESTS = registry.counter(
+    "judge_coalesced_requests_total", "Evaluations that joined an identical in-flight upstream call."
+)
+REPAIRS = registry.counter(
+    "judge_repairs_total", "Invalid outputs repaired, by kind (local = LLM retry avoided).", labelnames=("kind",)
+)
+PACKED_ITEMS = registry.counter(
+    "judge_packed_items_total",
+    "Items evaluated in multi-item packs: answered by the pack, or re-requested on their own.",
+    labelnames=("outcome",),
+)
+PACKING_TOKENS_SAVED = registry.counter(
+    "judge_packing_prompt_tokens_saved_total", "Estimated prompt tokens saved by multi-item packing."
+)
+SHED_REQUESTS = registry.counter(
+    "judge_shed_requests_total", "Upstream calls rejected fast instead of queueing.", labelnames=("reason",)
+)
+UPSTREAM_LIMIT = registry.gauge("judge_upstream_concurrency_limit", "Current adaptive upstream concurrency limit.")
+UPSTREAM_IN_FLIGHT = registry.gauge("judge_upstream_in_flight", "Upstream calls currently in flight.")
+VIDEO_STAGE_SECONDS = registry.histogram(
+    "judge_video_stage_seconds",
+    "Media ingestion time per stage (hash, decode_audio, stt, keyframes, ocr).",
+    labelnames=("stage",),
+)
+VIDEO_ARTIFACTS = registry.counter(
+    "judge_video_artifacts_total", "Video artifact cache lookups by content hash.", labelnames=("result",)
+)
+JOBS_QUEUED = registry.gauge("judge_jobs_queued", "Jobs waiting in the queue, per priority lane.", labelnames=("lane",))
+JOBS_RUNNING = registry.gauge("judge_jobs_running", "Jobs currently being evaluated.")
+JOB_WAIT_SECONDS = registry.histogram(
+    "judge_job_wait_seconds",
+    "Time from enqueue to a worker picking the job up.",
+    labelnames=("lane",),
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0),
+)
+JOBS = registry.counter("judge_jobs_total", "Finished job attempts by outcome.", labelnames=("outcome",))
+JOB_WEBHOOKS = registry.counter("judge_job_webhooks_total", "Job webhook deliveries by outcome.", labelnames=("outcome",))
+SLOW_TRACES = registry.counter(
+    "judge_slow_traces_total", "Traces over TRACE_SLOW_MS, by whether they were sampled to the trace file.",
+    labelnames=("exported",),
+)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Literal, Optional
+from typing import Any, Dict, List, Literal, Optional, Union
 from pydantic import BaseModel, Field, ConfigDict
 
 
@@ -28,6 +28,15 @@ class InputRequest(BaseModel):
     metadata: InputMetadata = Field(default_factory=InputMetadata)
 
 
+BATCH_MAX_ITEMS = 1000
+
+
+class BatchRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    items: List[InputRequest] = Field(min_length=1, max_length=BATCH_MAX_ITEMS)
+
+
 # Response Contract
 
 class GenerationPrediction(BaseModel):
@@ -81,3 +90,34 @@ class JudgeErrorResponse(BaseModel):
     error: str
     detail: Optional[str] = None
     request_id: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    # Same length and order as BatchRequest.items
+    results: List[Union[JudgeResponse, JudgeErrorResponse]]
+
+
+# Async jobs (POST /jobs, GET /jobs/{id})
+
+JOB_PRIORITIES = ("high", "normal", "low")  # lanes, drained in this order
+
+
+class JobRequest(InputRequest):
+    priority: Literal["high", "normal", "low"] = "normal"
+    # POSTed the final JobResponse when the job finishes
+    webhook_url: Optional[str] = Field(default=None, pattern=r"^https?://", max_length=2048)
+
+
+class JobResponse(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    job_id: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    priority: Literal["high", "normal", "low"]
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[JudgeResponse] = None
+    error: Optional[JudgeErrorResponse] = None
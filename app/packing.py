@@ -0,0 +1,132 @@
+# app/packing.py
+"""
+Multi-item packing.
+
+For short posts the fixed system prompt and per-call latency dominate, so up
+to PACKING_MAX_ITEMS items under PACKING_MAX_ITEM_TOKENS are sent in one call
+(JudgeAgent.evaluate_packed_async). The model answers
+
+    {"results": [{"index": 0, "response": {...JudgeResponse...}}, ...]}
+
+and each response is validated on its own; only the items that come back
+missing or invalid are re-requested, one by one.
+
+The batch endpoint knows all its items up front and packs them directly. Bulk
+streams rows, so it goes through Packer: items wait up to PACKING_MAX_WAIT_MS
+for a pack to fill.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.chunking import estimate_tokens
+from app.config import settings
+from app.models import InputRequest, JudgeResponse
+from app.parsing import load_json_output
+from app.video import is_media_path
+
+
+@dataclass
+class PackItem:
+    position: int  # index into the caller's request list
+    system_prompt: str
+    user_prompt: str
+    key: str  # response cache key of the single-item prompt
+    near_key: Optional[Tuple[str, Optional[int]]] = None
+
+
+def packable(request: InputRequest) -> bool:
+    if settings.packing_max_items < 2 or estimate_tokens(request.content) > settings.packing_max_item_tokens:
+        return False
+    return request.type == "text" or not is_media_path(request.content)
+
+
+def split_packed(raw: str, count: int) -> Dict[int, str]:
+    """
+    Response JSON per item index from a packed answer. Entries with an index
+    out of range or seen before are dropped; a bare array is accepted too.
+    Raises JSONExtractionError when the answer is not JSON at all.
+    """
+    obj: Any = load_json_output((raw or "").strip())
+    results = obj.get("results") if isinstance(obj, dict) else obj
+    answers: Dict[int, str] = {}
+    for entry in results if isinstance(results, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        index = entry.get("index")
+        if isinstance(index, int) and 0 <= index < count and index not in answers:
+            answers[index] = json.dumps(entry.get("response"), ensure_ascii=False)
+    return answers
+
+
+def offline_packed_response(single: str, count: int) -> str:
+    response = json.loads(single)
+    return json.dumps({"results": [{"index": i, "response": response} for i in range(count)]})
+
+
+class Packer:
+    """
+    Collects items submitted one at a time into packs: a pack is sent when it
+    has PACKING_MAX_ITEMS items or its first item has waited PACKING_MAX_WAIT_MS.
+    Each pack holds one `semaphore` slot, like a single evaluation would.
+    """
+
+    def __init__(self, agent, semaphore: Optional[asyncio.Semaphore] = None, preclassified: bool = False) -> None:
+        self._agent = agent
+        self._semaphore = semaphore
+        self._preclassified = preclassified
+        self._max_items = max(1, settings.packing_max_items)
+        self._max_wait = settings.packing_max_wait_ms / 1000
+        self._pending: List[Tuple[InputRequest, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def evaluate(self, request: InputRequest) -> JudgeResponse:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((request, future))
+        if len(self._pending) >= self._max_items:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._max_wait, self.flush)
+        return await future
+
+    def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pack, self._pending = self._pending, []
+        if pack:
+            task = asyncio.ensure_future(self._run(pack))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, pack: List[Tuple[InputRequest, asyncio.Future]]) -> None:
+        outcomes: List[Any] = []
+        try:
+            if self._semaphore is not None:
+                async with self._semaphore:
+                    outcomes = await self._evaluate(pack)
+            else:
+                outcomes = await self._evaluate(pack)
+            if len(outcomes) != len(pack):
+                raise RuntimeError(f"Packed evaluation returned {len(outcomes)} outcomes for {len(pack)} items.")
+        except Exception as e:
+            outcomes = [e] * len(pack)
+        finally:
+            # Also runs when the pack is cancelled: every caller still waiting gets an answer.
+            for i, (_, future) in enumerate(pack):
+                if future.done():
+                    continue  # caller gave up (cancelled)
+                outcome = outcomes[i] if i < len(outcomes) else RuntimeError("Packed evaluation was cancelled.")
+                if isinstance(outcome, BaseException):
+                    future.set_exception(outcome)
+                else:
+                    future.set_result(outcome)
+
+    async def _evaluate(self, pack: List[Tuple[InputRequest, asyncio.Future]]) -> List[Any]:
+        requests = [request for request, _ in pack]
+        return await self._agent.evaluate_packed_async(requests, preclassified=self._preclassified)
@@ -0,0 +1,102 @@
+# app/parsing.py
+"""
+JSON extraction for model output.
+
+Each candidate is parsed and validated in one pass by pydantic-core
+(`model_validate_json`), never json.loads + model_validate. Candidates, cheapest
+first: the whole text; the outermost `{...}` slice (fences, preamble); then
+balanced `{...}` spans from a single-pass scanner (braces in surrounding prose,
+several objects).
+"""
+from __future__ import annotations
+
+import json
+import re
+from itertools import islice
+from typing import Any, Iterator, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+M = TypeVar("M", bound=BaseModel)
+
+# Inside an object only strings and braces matter; each string is consumed whole
+# by the regex engine, so the Python loop runs once per token, not per character.
+_TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}]')
+
+# Candidates tried before giving up (guards against pathological brace-heavy prose).
+MAX_CANDIDATES = 8
+
+
+def iter_json_objects(text: str) -> Iterator[str]:
+    """
+    Yield balanced top-level `{...}` spans in order, in a single left-to-right pass.
+    Braces inside JSON strings (including escaped quotes) don't count; prose
+    between objects is skipped, so fences and preambles fall away.
+    """
+    start = text.find("{")
+    while start != -1:
+        depth = 0
+        for m in _TOKEN.finditer(text, start):
+            token = m.group()
+            if token == "{":
+                depth += 1
+            elif token == "}":
+                depth -= 1
+                if depth == 0:
+                    yield text[start:m.end()]
+                    break
+        else:
+            return  # unbalanced to the end (truncated output)
+        start = text.find("{", m.end())
+
+
+class JSONExtractionError(ValueError):
+    """No candidate in the text parsed as JSON."""
+
+
+def is_json_error(error: ValidationError) -> bool:
+    # model_validate_json reports unparseable input as a single json_invalid error.
+    return any(e["type"] == "json_invalid" for e in error.errors())
+
+
+def _candidates(text: str) -> Iterator[str]:
+    yield text
+    first, last = text.find("{"), text.rfind("}")
+    if first == -1 or last <= first:
+        return
+    outer = text[first:last + 1]
+    if outer != text:
+        yield outer
+    for span in islice(iter_json_objects(text), MAX_CANDIDATES):
+        if span != outer:
+            yield span
+
+
+def validate_json_output(model: Type[M], text: str) -> M:
+    """
+    First candidate that validates wins, so a stray `{...}` in prose before the
+    real object costs nothing. Otherwise raises the first candidate's
+    ValidationError if any candidate parsed, JSONExtractionError if none did.
+    """
+    schema_error = json_error = None
+    for candidate in _candidates(text):
+        try:
+            return model.model_validate_json(candidate)
+        except ValidationError as ve:
+            if is_json_error(ve):
+                json_error = json_error or ve
+            else:
+                schema_error = schema_error or ve
+    if schema_error is not None:
+        raise schema_error
+    raise JSONExtractionError(json_error.errors()[0]["msg"] if json_error is not None else "no JSON object found")
+
+
+def load_json_output(text: str) -> Any:
+    """Same candidate order as validate_json_output, without the schema (for repair)."""
+    for candidate in _candidates(text):
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            continue
+    raise JSONExtractionError("no JSON object found")
@@ -1,7 +1,9 @@
 # app/prompts.py
 from __future__ import annotations
 import json
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.models import JudgeResponse
 
 OUTPUT_SCHEMA_REMINDER = """
 Return ONLY valid JSON.
@@ -16,7 +18,7 @@ Rules:
 - distribution_analysis.likely_audiences: 1 to 6 items
 """
 
-def build_system_prompt() -> str:
+def _render_system_prompt() -> str:
     return f"""
 You are a Judge Agent that evaluates content across:
 1) AI vs Human generation prediction (heuristic, probabilistic)
@@ -37,19 +39,34 @@ You must be uncertainty-aware:
 {OUTPUT_SCHEMA_REMINDER}
 """.strip()
 
+
+# Rendered once at import. Every request sends this byte-identical system message
+# first, so providers with prompt caching can reuse the prefix across requests.
+SYSTEM_PROMPT = _render_system_prompt()
+
+
+def build_system_prompt() -> str:
+    return SYSTEM_PROMPT
+
+
 def build_user_prompt(content: str, metadata: Dict[str, Any] | None) -> str:
+    # Schema rules live only in the system prompt; variable content goes last.
     md = metadata or {}
-    metadata_json = json.dumps(md, ensure_ascii=False)
-    return f"""
-CONTENT:
-{content}
+    metadata_json = json.dumps(md, ensure_ascii=False, sort_keys=True)
+    return f"METADATA (json):\n{metadata_json}\n\nCONTENT:\n{content}"
 
-METADATA (json):
-{metadata_json}
+def build_packed_user_prompt(user_prompts: Sequence[str]) -> str:
+    # Several single-item prompts behind one copy of the system prompt; answers come back by index.
+    items = "\n\n".join(f"=== ITEM {i} ===\n{prompt}" for i, prompt in enumerate(user_prompts))
+    return f"""
+Evaluate each of the {len(user_prompts)} ITEMs below independently, as if it were the only content.
+Return ONLY a JSON object of the form {{"results": [{{"index": <item number>, "response": <evaluation>}}, ...]}}
+with exactly one entry per item; each "response" is a complete evaluation object.
 
-{OUTPUT_SCHEMA_REMINDER}
+{items}
 """.strip()
 
+
 def build_repair_prompt(bad_output: str) -> str:
     return f"""
 The previous output was invalid (not valid JSON and/or did not match the schema).
@@ -60,3 +77,92 @@ INVALID OUTPUT:
 
 Remember: output ONLY JSON.
 """.strip()
+
+
+def build_partial_repair_prompt(fragment: Dict[str, Any], errors: List[Dict[str, Any]]) -> str:
+    # Only the failing top-level sections and their errors go back to the model.
+    keys = ", ".join(fragment)
+    problems = "\n".join(f"- {'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in errors)
+    return f"""
+Part of the previous output did not match the schema.
+Return ONLY a JSON object with exactly these top-level keys, corrected: {keys}
+
+INVALID FRAGMENT:
+{json.dumps(fragment, ensure_ascii=False)}
+
+VALIDATION ERRORS:
+{problems}
+
+Remember: output ONLY JSON.
+""".strip()
+
+
+# Keywords accepted by strict structured-output schemas; everything else is stripped.
+_STRICT_SCHEMA_KEYS = {
+    "type", "properties", "required", "additionalProperties", "items", "enum", "const",
+    "anyOf", "$defs", "$ref", "description", "minimum", "maximum", "minItems", "maxItems",
+}
+
+
+def _strict_schema(node: Any) -> Any:
+    if isinstance(node, list):
+        return [_strict_schema(n) for n in node]
+    if not isinstance(node, dict):
+        return node
+
+    out: Dict[str, Any] = {}
+    for key, value in node.items():
+        if key in ("properties", "$defs"):
+            out[key] = {name: _strict_schema(sub) for name, sub in value.items()}
+        elif key in _STRICT_SCHEMA_KEYS:
+            out[key] = _strict_schema(value)
+
+    # Strict mode requires every property to be listed as required.
+    if out.get("type") == "object" and "properties" in out:
+        out["required"] = list(out["properties"])
+        out["additionalProperties"] = False
+    return out
+
+
+def build_response_format(sections: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    response_format payload that constrains decoding to the JudgeResponse schema
+    (or only the given top-level sections, for partial repair).
+    Bounds the provider can't enforce (string lengths) are still checked by Pydantic.
+    """
+    schema = _strict_schema(JudgeResponse.model_json_schema())
+    if sections:
+        schema["properties"] = {k: v for k, v in schema["properties"].items() if k in sections}
+        schema["required"] = list(schema["properties"])
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "judge_response_partial" if sections else "judge_response",
+            "strict": True,
+            "schema": schema,
+        },
+    }
+
+
+def build_packed_response_format() -> Dict[str, Any]:
+    """response_format for a packed call: {"results": [{"index", "response": JudgeResponse}]}."""
+    response = _strict_schema(JudgeResponse.model_json_schema())
+    defs = response.pop("$defs", None)
+    item = {
+        "type": "object",
+        "properties": {"index": {"type": "integer"}, "response": response},
+        "required": ["index", "response"],
+        "additionalProperties": False,
+    }
+    schema: Dict[str, Any] = {
+        "type": "object",
+        "properties": {"results": {"type": "array", "items": item}},
+        "required": ["results"],
+        "additionalProperties": False,
+    }
+    if defs:
+        schema["$defs"] = defs  # refs point at the root
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": "judge_response_packed", "strict": True, "schema": schema},
+    }
@@ -0,0 +1,178 @@
+# app/repair.py
+"""
+Repair of schema-invalid model output.
+
+1) fix_locally: deterministic fixes for the usual near-misses (float or
+   "72/100" scores, percent confidences, label casing, a 7th audience, stray
+   keys). When that is enough, no retry call is made.
+2) plan_repair: when an LLM repair is still needed, ask only for the top-level
+   sections that fail validation (with their errors) and merge the answer back,
+   instead of sending the whole output for regeneration.
+"""
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.chunking import MAX_AUDIENCES, estimate_tokens
+from app.models import (
+    AudienceSegment,
+    DistributionAnalysis,
+    GenerationPrediction,
+    JudgeResponse,
+    Virality,
+)
+from app.parsing import JSONExtractionError, load_json_output
+from app.prompts import build_partial_repair_prompt, build_repair_prompt, build_response_format
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+_LABELS = {"ai": "AI", "ai-generated": "AI", "ai_generated": "AI", "human": "Human", "human-written": "Human"}
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        m = _NUMBER.search(value)  # "72", "72.5", "72/100", "72%"
+        return float(m.group()) if m else None
+    return None
+
+
+def _drop_extra(obj: Dict[str, Any], allowed, path: str, fixes: List[str]) -> None:
+    for key in [k for k in obj if k not in allowed]:
+        del obj[key]
+        fixes.append(f"{path}{key}:dropped")
+
+
+def _fix_confidence(section: Dict[str, Any], path: str, fixes: List[str]) -> None:
+    value = section.get("confidence")
+    number = _number(value)
+    if number is None:
+        return
+    if 1.0 < number <= 100.0:
+        number /= 100.0  # percent
+    number = min(1.0, max(0.0, number))
+    if number != value:
+        section["confidence"] = number
+        fixes.append(f"{path}.confidence")
+
+
+def fix_locally(obj: Any) -> List[str]:
+    """Apply deterministic fixes in place; returns what was changed (empty = nothing to do)."""
+    fixes: List[str] = []
+    if not isinstance(obj, dict):
+        return fixes
+    _drop_extra(obj, JudgeResponse.model_fields, "", fixes)
+
+    gp = obj.get("generation_prediction")
+    if isinstance(gp, dict):
+        _drop_extra(gp, GenerationPrediction.model_fields, "generation_prediction.", fixes)
+        label = gp.get("label")
+        if isinstance(label, str) and label not in ("AI", "Human"):
+            normalized = _LABELS.get(label.strip().lower())
+            if normalized:
+                gp["label"] = normalized
+                fixes.append("generation_prediction.label")
+        _fix_confidence(gp, "generation_prediction", fixes)
+
+    virality = obj.get("virality")
+    if isinstance(virality, dict):
+        _drop_extra(virality, Virality.model_fields, "virality.", fixes)
+        score = virality.get("score")
+        number = _number(score)
+        if number is not None:
+            fixed = int(min(100, max(0, round(number))))
+            if fixed != score or not isinstance(score, int):
+                virality["score"] = fixed
+                fixes.append("virality.score")
+        _fix_confidence(virality, "virality", fixes)
+
+    distribution = obj.get("distribution_analysis")
+    if isinstance(distribution, dict):
+        _drop_extra(distribution, DistributionAnalysis.model_fields, "distribution_analysis.", fixes)
+        audiences = distribution.get("likely_audiences")
+        if isinstance(audiences, list):
+            if len(audiences) > MAX_AUDIENCES:
+                del audiences[MAX_AUDIENCES:]
+                fixes.append("distribution_analysis.likely_audiences:truncated")
+            for i, segment in enumerate(audiences):
+                if isinstance(segment, dict):
+                    path = f"distribution_analysis.likely_audiences.{i}."
+                    _drop_extra(segment, AudienceSegment.model_fields, path, fixes)
+
+    return fixes
+
+
+def repair_locally(text: str) -> Tuple[Optional[JudgeResponse], List[str]]:
+    """Validated response if deterministic fixes are enough, plus the fixes applied."""
+    try:
+        obj = load_json_output(text)
+    except JSONExtractionError:
+        return None, []
+    fixes = fix_locally(obj)
+    if not fixes:
+        return None, []
+    try:
+        return JudgeResponse.model_validate(obj), fixes
+    except ValidationError:
+        return None, fixes
+
+
+@dataclass(frozen=True)
+class RepairPlan:
+    kind: str  # "partial_llm" | "full_llm"
+    prompt: str
+    response_format: Optional[Dict[str, Any]] = None  # None = the full JudgeResponse schema
+    base: Optional[Dict[str, Any]] = None  # locally-fixed output the repaired sections merge into
+    prompt_tokens_saved: int = 0
+
+    def merge(self, repaired: str) -> str:
+        """Text to validate after the repair call: the returned sections merged into the base."""
+        if self.base is None:
+            return repaired
+        try:
+            fragment = load_json_output((repaired or "").strip())
+        except JSONExtractionError:
+            return repaired
+        if not isinstance(fragment, dict):
+            return repaired
+        merged = dict(self.base)
+        merged.update({k: v for k, v in fragment.items() if k in JudgeResponse.model_fields})
+        return json.dumps(merged, ensure_ascii=False)
+
+
+def plan_repair(raw: str, structured_output: bool) -> RepairPlan:
+    full = RepairPlan(kind="full_llm", prompt=build_repair_prompt(raw))
+    try:
+        obj = load_json_output((raw or "").strip())
+    except JSONExtractionError:
+        return full  # nothing parseable to keep
+    if not isinstance(obj, dict):
+        return full
+
+    fix_locally(obj)
+    try:
+        JudgeResponse.model_validate(obj)
+        return full  # valid after fixes; not expected here, regenerate to be safe
+    except ValidationError as ve:
+        errors = ve.errors(include_url=False, include_input=False)
+
+    sections = sorted({str(e["loc"][0]) for e in errors if e["loc"]})
+    if not sections or len(sections) == len(JudgeResponse.model_fields):
+        return full
+
+    prompt = build_partial_repair_prompt({s: obj.get(s) for s in sections}, errors)
+    return RepairPlan(
+        kind="partial_llm",
+        prompt=prompt,
+        response_format=build_response_format(tuple(sections)) if structured_output else None,
+        base=obj,
+        prompt_tokens_saved=max(0, estimate_tokens(full.prompt) - estimate_tokens(prompt)),
+    )
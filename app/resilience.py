@@ -0,0 +1,428 @@
+# app/resilience.py
+"""
+Upstream protection for LLM calls (async path, and the sync path via acquire_sync).
+
+- AdaptiveLimiter: AIMD concurrency limit driven by latency (short-window
+  average vs. the long-run baseline) and overload signals; requests over the limit are shed
+  immediately instead of queueing.
+- CircuitBreaker: opens after consecutive upstream failures, probes after a
+  cool-down (half-open), closes on success.
+- TokenBucket: optional steady-state pacing; 429 Retry-After pauses it.
+  SharedTokenBucket keeps the same state in an mmap'd file, so with several
+  worker processes (app.serve) the budget and 429 pauses are host-wide.
+
+UpstreamGuard combines the three around each upstream call, on the async path
+(acquire) and the sync one (acquire_sync, from worker threads).
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterator, Optional, Union
+
+from app import metrics
+from app.config import settings
+
+
+class OverloadedError(RuntimeError):
+    """Raised to shed load fast; maps to a 503 JudgeErrorResponse with Retry-After."""
+
+    def __init__(self, reason: str, retry_after: Optional[float] = None) -> None:
+        super().__init__(f"Upstream overloaded ({reason}).")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def retry_after_seconds(e: BaseException) -> Optional[float]:
+    """Retry-After (seconds or HTTP date) / retry-after-ms from an upstream error, if any."""
+    headers = getattr(getattr(e, "response", None), "headers", None) or {}
+    ms = headers.get("retry-after-ms")
+    if ms:
+        try:
+            return float(ms) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify(e: BaseException) -> str:
+    """'rate_limited', 'failure' (counts against upstream health), 'client_error' or 'cancelled'."""
+    if not isinstance(e, Exception):
+        return "cancelled"  # CancelledError, KeyboardInterrupt: the caller gave up
+    status = getattr(e, "status_code", None)
+    if status == 429:
+        return "rate_limited"
+    if status is not None and 400 <= status < 500:
+        return "client_error"
+    return "failure"  # 5xx, timeouts, connection errors
+
+
+class AdaptiveLimiter:
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        latency_tolerance: float = 2.0,
+        backoff: float = 0.9,
+    ) -> None:
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self.in_flight = 0
+        # Short- vs long-window latency averages: a short window well above the
+        # long one means requests are queueing upstream.
+        self._short: Optional[float] = None
+        self._long: Optional[float] = None
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= int(self.limit):
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self, latency: float, overloaded: bool) -> None:
+        self.in_flight -= 1
+        if overloaded:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+            return
+
+        if self._short is None:
+            self._short = self._long = latency
+        self._short += (latency - self._short) * 0.2
+        self._long += (latency - self._long) * 0.01
+
+        if self._short > self._long * self.latency_tolerance:
+            self.limit = max(self.min_limit, self.limit * self.backoff)  # queueing upstream: back off
+        else:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)  # additive increase
+
+    def abandon(self) -> None:
+        # Caller gave up (cancelled): free the slot without a latency sample or limit change.
+        self.in_flight -= 1
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int, reset_seconds: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        """Raises OverloadedError to shed; True when the caller now holds the half-open probe."""
+        if self.state == self.OPEN:
+            remaining = self._opened_at + self.reset_seconds - time.monotonic()
+            if remaining > 0:
+                raise OverloadedError("circuit_open", retry_after=remaining)
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                raise OverloadedError("circuit_half_open", retry_after=1.0)
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._probe_in_flight = False
+        self.state = self.CLOSED
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def release_probe(self) -> None:
+        self._probe_in_flight = False
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate  # tokens/sec; 0 disables steady-state pacing
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def paused_for(self) -> float:
+        return max(0.0, self.paused_until - time.monotonic())
+
+    def reserve(self, max_wait: float) -> float:
+        """Seconds until the caller may proceed; a token is taken only when that is within max_wait."""
+        now = time.monotonic()
+        wait = max(0.0, self.paused_until - now)
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                wait = max(wait, (1 - self._tokens) / self.rate)
+            if wait <= max_wait:
+                self._tokens -= 1  # may go negative: concurrent waiters queue behind this reservation
+        return wait
+
+    def refund(self) -> None:
+        """Give back a reserved token whose call never happened (shed or cancelled after reserve)."""
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+    async def acquire(self, max_wait: float) -> None:
+        wait = self.reserve(max_wait)
+        if wait > max_wait:
+            raise OverloadedError("rate_limited", retry_after=wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class SharedTokenBucket:
+    """
+    TokenBucket for several processes on one host: tokens, last refill and
+    pause live in a 32-byte mmap'd file and every update holds an flock, so
+    all workers draw from one budget and a 429 seen by any of them pauses all.
+    A token is reserved before sleeping, so concurrent waiters queue up behind
+    each other instead of all waking for the same token. POSIX only.
+    """
+
+    _LAYOUT = struct.Struct("<8sddd")  # magic, tokens, updated, paused_until (wall clock: valid across restarts)
+    _MAGIC = b"jbucket1"
+
+    def __init__(self, path: str, rate: float, burst: int) -> None:
+        import fcntl
+        import mmap
+
+        self.path = path
+        self.rate = rate
+        self.burst = burst
+        self._flock = fcntl.flock
+        self._lock = threading.Lock()  # flock doesn't exclude threads sharing this descriptor
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size < self._LAYOUT.size:
+                os.ftruncate(self._fd, self._LAYOUT.size)
+            self._map = mmap.mmap(self._fd, self._LAYOUT.size)
+            if self._LAYOUT.unpack_from(self._map)[0] != self._MAGIC:
+                self._write(float(burst), time.time(), 0.0)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        import fcntl
+
+        with self._lock:
+            self._flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                self._flock(self._fd, fcntl.LOCK_UN)
+
+    def _write(self, tokens: float, updated: float, paused_until: float) -> None:
+        self._LAYOUT.pack_into(self._map, 0, self._MAGIC, tokens, updated, paused_until)
+
+    def pause(self, seconds: float) -> None:
+        with self._locked():
+            _, tokens, updated, paused_until = self._LAYOUT.unpack_from(self._map)
+            self._write(tokens, updated, max(paused_until, time.time() + seconds))
+
+    def paused_for(self) -> float:
+        with self._locked():
+            paused_until = self._LAYOUT.unpack_from(self._map)[3]
+        return max(0.0, paused_until - time.time())
+
+    def reserve(self, max_wait: float) -> float:
+        """Seconds until the caller may proceed; a token is taken only when that is within max_wait."""
+        with self._locked():
+            now = time.time()
+            _, tokens, updated, paused_until = self._LAYOUT.unpack_from(self._map)
+            wait = max(0.0, paused_until - now)
+            if self.rate > 0:
+                tokens = min(float(self.burst), tokens + max(0.0, now - updated) * self.rate)
+                if tokens < 1:
+                    wait = max(wait, (1 - tokens) / self.rate)
+                if wait <= max_wait:
+                    tokens -= 1  # may go negative: later callers wait for it to refill
+            self._write(tokens, now, paused_until)
+        return wait
+
+    def refund(self) -> None:
+        """Give back a reserved token whose call never happened (shed or cancelled after reserve)."""
+        if self.rate <= 0:
+            return
+        with self._locked():
+            _, tokens, updated, paused_until = self._LAYOUT.unpack_from(self._map)
+            self._write(min(float(self.burst), tokens + 1), updated, paused_until)
+
+    async def acquire(self, max_wait: float) -> None:
+        wait = self.reserve(max_wait)
+        if wait > max_wait:
+            raise OverloadedError("rate_limited", retry_after=wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
+
+
+class UpstreamGuard:
+    def __init__(
+        self,
+        limiter: AdaptiveLimiter,
+        breaker: CircuitBreaker,
+        bucket: Union[TokenBucket, SharedTokenBucket],
+        max_wait_seconds: float,
+    ) -> None:
+        self.limiter = limiter
+        self.breaker = breaker
+        self.bucket = bucket
+        self.max_wait_seconds = max_wait_seconds
+        self.shed: Dict[str, int] = {}
+        # The async path runs on one event loop; the sync path calls in from worker threads.
+        self._lock = threading.Lock()
+
+    async def acquire(self) -> None:
+        probe, reserved = self._admit(), False
+        try:
+            wait = self._reserve()
+            reserved = True
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._take_slot()
+        except BaseException as e:
+            self._abort(probe, e, reserved)
+            raise
+
+    def acquire_sync(self) -> None:
+        """acquire() for the sync path (worker threads): paces with a blocking sleep."""
+        probe, reserved = self._admit(), False
+        try:
+            wait = self._reserve()
+            reserved = True
+            if wait > 0:
+                time.sleep(wait)
+            self._take_slot()
+        except BaseException as e:
+            self._abort(probe, e, reserved)
+            raise
+
+    def _admit(self) -> bool:
+        try:
+            with self._lock:
+                return self.breaker.allow()
+        except OverloadedError as e:
+            self._abort(False, e)
+            raise
+
+    def _reserve(self) -> float:
+        with self._lock:
+            wait = self.bucket.reserve(self.max_wait_seconds)
+        if wait > self.max_wait_seconds:
+            raise OverloadedError("rate_limited", retry_after=wait)
+        return wait
+
+    def _take_slot(self) -> None:
+        with self._lock:
+            if not self.limiter.try_acquire():
+                raise OverloadedError("concurrency_limit", retry_after=1.0)
+        metrics.UPSTREAM_LIMIT.set(self.limiter.limit)
+        metrics.UPSTREAM_IN_FLIGHT.set(self.limiter.in_flight)
+
+    def _abort(self, probe: bool, e: BaseException, reserved: bool = False) -> None:
+        # Includes cancellation while paced: a probe left claimed would keep the breaker half-open forever,
+        # and a token reserved for a call that never happens (e.g. shed at the concurrency limit) would
+        # let shed load drain the rate budget.
+        with self._lock:
+            if probe:
+                self.breaker.release_probe()
+            if reserved:
+                self.bucket.refund()
+            if isinstance(e, OverloadedError):
+                self.shed[e.reason] = self.shed.get(e.reason, 0) + 1
+        if isinstance(e, OverloadedError):
+            metrics.SHED_REQUESTS.inc(reason=e.reason)
+
+    def release(self, latency: float, error: Optional[BaseException] = None) -> Optional[OverloadedError]:
+        """
+        Record the outcome. Returns an OverloadedError to raise instead of the
+        upstream error when the provider rate-limited us.
+        """
+        kind = classify(error) if error is not None else "ok"
+        with self._lock:
+            if kind == "cancelled":
+                self.limiter.abandon()
+            else:
+                self.limiter.release(latency, overloaded=kind in ("rate_limited", "failure"))
+            metrics.UPSTREAM_LIMIT.set(self.limiter.limit)
+            metrics.UPSTREAM_IN_FLIGHT.set(self.limiter.in_flight)
+
+            if kind == "ok":
+                self.breaker.record_success()
+                return None
+            if kind in ("client_error", "cancelled"):
+                self.breaker.release_probe()
+                return None
+
+            self.breaker.record_failure()
+        if kind == "rate_limited":
+            retry_after = retry_after_seconds(error) or 1.0
+            self.bucket.pause(retry_after)
+            return OverloadedError("upstream_rate_limited", retry_after=retry_after)
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency_limit": round(self.limiter.limit, 2),
+            "in_flight": self.limiter.in_flight,
+            "breaker_state": self.breaker.state,
+            "paused_for_seconds": round(self.bucket.paused_for(), 3),
+            "rate_budget": "shared" if isinstance(self.bucket, SharedTokenBucket) else "process",
+            "shed": dict(self.shed),
+        }
+
+
+def build_token_bucket() -> Union[TokenBucket, SharedTokenBucket]:
+    if settings.shared_state_dir:
+        path = os.path.join(settings.shared_state_dir, "rate_budget")
+        return SharedTokenBucket(path, settings.rate_limit_rps, settings.rate_limit_burst)
+    return TokenBucket(settings.rate_limit_rps, settings.rate_limit_burst)
+
+
+def build_upstream_guard() -> UpstreamGuard:
+    return UpstreamGuard(
+        limiter=AdaptiveLimiter(
+            initial=settings.limiter_initial,
+            min_limit=settings.limiter_min,
+            max_limit=settings.limiter_max,
+            latency_tolerance=settings.limiter_latency_tolerance,
+        ),
+        breaker=CircuitBreaker(settings.breaker_failure_threshold, settings.breaker_reset_seconds),
+        bucket=build_token_bucket(),
+        max_wait_seconds=settings.rate_limit_max_wait_seconds,
+    )
@@ -0,0 +1,154 @@
+# app/routing.py
+"""
+Cost-aware model routing across a tiered model pool.
+
+Tiers are ordered cheapest -> strongest (MODEL_TIERS="model:in_cost:out_cost,...",
+costs in USD per 1M tokens). Each request starts on a tier picked from content
+length, metadata and the local pre-classifier's confidence, and escalates one
+tier at a time only when the output fails validation or is low-confidence.
+"""
+from __future__ import annotations
+
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+from app import metrics
+from app.config import settings
+from app.models import JudgeResponse
+
+# Recent latencies kept per tier for p95 reporting.
+LATENCY_WINDOW = 1024
+
+
+@dataclass(frozen=True)
+class ModelTier:
+    model: str
+    input_cost_per_mtok: float = 0.0
+    output_cost_per_mtok: float = 0.0
+
+    def cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        return (prompt_tokens * self.input_cost_per_mtok + completion_tokens * self.output_cost_per_mtok) / 1_000_000
+
+
+def parse_tiers(spec: str, default_model: str) -> List[ModelTier]:
+    """'gpt-4o-mini:0.15:0.6,gpt-4o:2.5:10' -> tiers; empty spec -> one tier on default_model."""
+    tiers: List[ModelTier] = []
+    for part in (p.strip() for p in spec.split(",")):
+        if not part:
+            continue
+        name, *costs = part.split(":")
+        in_cost, out_cost = (float(c) for c in (costs + ["0", "0"])[:2])
+        tiers.append(ModelTier(name.strip(), in_cost, out_cost))
+    return tiers or [ModelTier(default_model)]
+
+
+@dataclass
+class TierStats:
+    calls: int = 0
+    errors: int = 0
+    escalations: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+
+    def snapshot(self) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+        p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] if ordered else 0.0
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "escalations": self.escalations,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+            "latency_avg_ms": round(1000 * sum(ordered) / len(ordered), 1) if ordered else 0.0,
+            "latency_p95_ms": round(1000 * p95, 1),
+        }
+
+
+class ModelRouter:
+    def __init__(
+        self,
+        tiers: List[ModelTier],
+        long_content_tokens: int,
+        long_video_seconds: int,
+        premium_platforms: List[str],
+        confident_score: float,
+        escalation_confidence: float,
+    ) -> None:
+        self.tiers = tiers
+        self.long_content_tokens = long_content_tokens
+        self.long_video_seconds = long_video_seconds
+        self.premium_platforms = {p.lower() for p in premium_platforms}
+        self.confident_score = confident_score
+        self.escalation_confidence = escalation_confidence
+
+        self._lock = threading.Lock()
+        self._stats = {t.model: TierStats() for t in tiers}
+
+    @property
+    def multi_tier(self) -> bool:
+        return len(self.tiers) > 1
+
+    def choose(self, content_tokens: int, metadata: Optional[Dict[str, Any]], cheap_confidence: Optional[float]) -> int:
+        """Starting tier index: one step up per difficulty signal, one step down if the cheap score is confident."""
+        md = metadata or {}
+        steps = 0
+        if content_tokens > self.long_content_tokens:
+            steps += 1
+        if (md.get("duration_seconds") or 0) > self.long_video_seconds:
+            steps += 1
+        if str(md.get("platform") or "").lower() in self.premium_platforms:
+            steps += 1
+        if cheap_confidence is not None and cheap_confidence >= self.confident_score:
+            steps -= 1
+        return max(0, min(steps, len(self.tiers) - 1))
+
+    def escalation_reason(self, tier: int, parsed: Optional[JudgeResponse]) -> Optional[str]:
+        if tier + 1 >= len(self.tiers):
+            return None
+        if parsed is None:
+            return "invalid_output"
+        if parsed.generation_prediction.confidence < self.escalation_confidence:
+            return "low_confidence"
+        return None
+
+    def record_escalation(self, tier: int, reason: str) -> None:
+        model = self.tiers[tier].model
+        with self._lock:
+            self._stats[model].escalations += 1
+        metrics.ESCALATIONS.inc(tier=model, reason=reason)
+
+    def record_call(self, model: str, latency_s: float, prompt_tokens: int, completion_tokens: int, ok: bool) -> None:
+        tier = next((t for t in self.tiers if t.model == model), None)
+        cost = tier.cost(prompt_tokens, completion_tokens) if tier else 0.0
+        with self._lock:
+            stats = self._stats.setdefault(model, TierStats())
+            stats.calls += 1
+            stats.errors += int(not ok)
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+            stats.cost_usd += cost
+            stats.latencies.append(latency_s)
+        metrics.TIER_LATENCY_SECONDS.observe(latency_s, tier=model)
+        metrics.TIER_COST_USD.inc(cost, tier=model)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {model: s.snapshot() for model, s in self._stats.items()}
+
+
+def build_router() -> ModelRouter:
+    return ModelRouter(
+        tiers=parse_tiers(
+            settings.model_tiers, settings.local_llm_model if settings.llm_backend == "local" else settings.model_name
+        ),
+        long_content_tokens=settings.routing_long_content_tokens,
+        long_video_seconds=settings.routing_long_video_seconds,
+        premium_platforms=[p.strip() for p in settings.routing_premium_platforms.split(",") if p.strip()],
+        confident_score=settings.routing_confident_score,
+        escalation_confidence=settings.routing_escalation_confidence,
+    )
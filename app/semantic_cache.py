@@ -0,0 +1,204 @@
+# app/semantic_cache.py
+"""
+Near-duplicate response cache.
+
+The exact cache keys on the full prompt, so the same post with other hashtags,
+emojis, links or spacing misses it. Here content is normalized (lowercase,
+hashtags/mentions/URLs/emoji/punctuation dropped), shingled into word 3-grams
+and fingerprinted with a 64-bit SimHash; similarity is 1 - hamming/64.
+
+Index: the fingerprint is split into `max_distance + 1` bands. Two
+fingerprints within `max_distance` bits must agree on at least one whole band
+(pigeonhole), so looking up each band's bucket finds every stored entry above
+the threshold without scanning: recall is exact, candidates are few. The
+default threshold 0.95 (<= 3 differing bits) is the near-duplicate setting
+used for web-scale SimHash dedup. At most 16 bands are used, so thresholds
+below 1 - 15/64 (~0.766) are rejected rather than silently missing matches.
+
+Entries are namespaced by model and metadata (platform changes virality), and
+evicted LRU / by TTL. Content shorter than `min_tokens` is never matched: a
+fingerprint of a few words says little.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.config import settings
+from app.models import JudgeResponse
+
+_URL = re.compile(r"https?://\S+|www\.\S+")
+_TAG = re.compile(r"[#@]\w+")
+_WORD = re.compile(r"\w+")  # letters/digits only: emoji and punctuation fall away
+
+BITS = 64
+# 16 bands of 4 bits; narrower bands would make each bucket hold most of the cache.
+MAX_BANDS = 16
+SHINGLE = 3
+
+
+def normalize(text: str) -> List[str]:
+    text = _TAG.sub(" ", _URL.sub(" ", text or ""))
+    return _WORD.findall(text.lower())
+
+
+def simhash(tokens: List[str]) -> int:
+    import numpy as np  # lazy: keeps app startup lean
+
+    n = max(1, len(tokens) - SHINGLE + 1)
+    shingles = [" ".join(tokens[i:i + SHINGLE]) for i in range(n)]
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles],
+        dtype=np.uint64,
+    )
+    # bit i of every shingle hash votes +1/-1; the fingerprint keeps the majority
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    majority = bits.sum(axis=0) * 2 > len(shingles)
+    return int(np.packbits(majority, bitorder="little").view(np.uint64)[0])
+
+
+def similarity(a: int, b: int) -> float:
+    return 1.0 - (a ^ b).bit_count() / BITS
+
+
+@dataclass
+class _Entry:
+    namespace: str
+    fingerprint: int
+    response: JudgeResponse
+    expires_at: float
+
+
+class SemanticCache:
+    def __init__(self, threshold: float, max_entries: int, ttl_seconds: float, min_tokens: int = 8) -> None:
+        self.threshold = threshold
+        self.max_distance = int((1.0 - threshold) * BITS + 1e-9)
+        if self.max_distance + 1 > MAX_BANDS:
+            min_threshold = 1.0 - (MAX_BANDS - 1) / BITS
+            raise ValueError(
+                f"SEMANTIC_CACHE_THRESHOLD={threshold} needs {self.max_distance + 1} bands for exact recall; "
+                f"the index supports {MAX_BANDS} (threshold >= {min_threshold:.4f})"
+            )
+        self.bands = self.max_distance + 1
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.min_tokens = min_tokens
+
+        width = BITS // self.bands
+        self._band_slices = [(i * width, BITS if i == self.bands - 1 else (i + 1) * width) for i in range(self.bands)]
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._buckets: Dict[Tuple[str, int, int], Set[int]] = {}
+        self._next_id = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.similarity_sum = 0.0
+
+    @staticmethod
+    def namespace(model: str, metadata: Optional[Dict[str, Any]]) -> str:
+        return hashlib.sha256(
+            json.dumps([model, metadata or {}], sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()[:16]
+
+    def fingerprint(self, content: str) -> Optional[int]:
+        tokens = normalize(content)
+        if len(tokens) < self.min_tokens:
+            return None
+        return simhash(tokens)
+
+    def _band_keys(self, namespace: str, fingerprint: int) -> List[Tuple[str, int, int]]:
+        return [
+            (namespace, i, (fingerprint >> lo) & ((1 << (hi - lo)) - 1))
+            for i, (lo, hi) in enumerate(self._band_slices)
+        ]
+
+    def get(self, namespace: str, fingerprint: Optional[int]) -> Optional[Tuple[JudgeResponse, float]]:
+        """Closest stored response at or above the threshold, with its similarity."""
+        if fingerprint is None:
+            with self._lock:
+                self.skipped += 1
+            return None
+        now = time.time()
+        with self._lock:
+            best: Optional[Tuple[int, float]] = None
+            candidates = set().union(*(self._buckets.get(k, ()) for k in self._band_keys(namespace, fingerprint)))
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                if entry.expires_at <= now:
+                    self._remove(entry_id)
+                    self.expirations += 1
+                    continue
+                score = similarity(fingerprint, entry.fingerprint)
+                if score >= self.threshold and (best is None or score > best[1]):
+                    best = (entry_id, score)
+            if best is None:
+                self.misses += 1
+                return None
+            entry_id, score = best
+            self._entries.move_to_end(entry_id)
+            self.hits += 1
+            self.similarity_sum += score
+            return self._entries[entry_id].response, score
+
+    def add(self, namespace: str, fingerprint: Optional[int], response: JudgeResponse) -> None:
+        if fingerprint is None:
+            return
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _Entry(namespace, fingerprint, response, time.time() + self.ttl_seconds)
+            for key in self._band_keys(namespace, fingerprint):
+                self._buckets.setdefault(key, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        for key in self._band_keys(entry.namespace, entry.fingerprint):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": True,
+                "threshold": self.threshold,
+                "max_hamming_distance": self.max_distance,
+                "bands": self.bands,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "buckets": len(self._buckets),
+                "hits": self.hits,
+                "misses": self.misses,
+                "skipped_short": self.skipped,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "avg_hit_similarity": round(self.similarity_sum / self.hits, 4) if self.hits else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+def build_semantic_cache() -> Optional[SemanticCache]:
+    if not settings.semantic_cache_enabled:
+        return None
+    return SemanticCache(
+        threshold=settings.semantic_cache_threshold,
+        max_entries=settings.semantic_cache_max_entries,
+        ttl_seconds=settings.cache_ttl_seconds,
+        min_tokens=settings.semantic_cache_min_tokens,
+    )
@@ -0,0 +1,48 @@
+# app/serve.py
+"""
+Multi-process serving.
+
+    python -m app.serve --workers 4 --port 8000 [--state-dir .judge-state]
+
+Runs uvicorn with N worker processes behind one socket. Each worker builds its
+own JudgeAgent and connection pool; what must be host-wide lives in
+SHARED_STATE_DIR so it isn't split N ways:
+- rate budget: RATE_LIMIT_RPS/RATE_LIMIT_BURST become one token bucket for all
+  workers (mmap'd file + flock), and a provider 429 pauses every worker
+- response cache: the SQLite disk tier (CACHE_SQLITE_PATH defaults into the
+  state dir); each worker keeps its in-memory LRU in front of it
+- job queue: JOBS_SQLITE_PATH defaults into the state dir; claims are atomic
+  across processes and the per-client in-flight limit is host-wide
+
+The adaptive concurrency limit and circuit breaker stay per worker (they
+react to what each worker observes). /metrics and /stats describe the worker
+that answered the request.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.serve")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--state-dir", default=os.getenv("SHARED_STATE_DIR") or ".judge-state")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    state_dir = os.path.abspath(args.state_dir)
+    os.makedirs(state_dir, exist_ok=True)
+    # Workers are spawned processes that read settings from the environment at import.
+    os.environ["SHARED_STATE_DIR"] = state_dir
+    os.environ.setdefault("JOBS_SQLITE_PATH", os.path.join(state_dir, "jobs.sqlite3"))
+
+    import uvicorn
+
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers, log_level=args.log_level)
+
+
+if __name__ == "__main__":
+    main()
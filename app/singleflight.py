@@ -0,0 +1,47 @@
+# app/singleflight.py
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+from app import metrics
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    In-flight deduplication: concurrent calls with the same key share one execution.
+
+    The work runs in its own task, so a caller that disconnects (is cancelled) does
+    not cancel the call other waiters depend on. Results and errors are delivered to
+    every waiter; the key is released as soon as the call finishes, so later calls
+    start fresh (the response cache covers completed results).
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            metrics.COALESCED_REQUESTS.inc()
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._release(key, t))
+        return await asyncio.shield(task)
+
+    def _release(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception retrieved even if every waiter went away.
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"leaders": self.leaders, "coalesced": self.coalesced, "in_flight": len(self._inflight)}
@@ -0,0 +1,104 @@
+# app/streaming.py
+"""
+Incremental section parsing for streamed model output (POST /evaluate/stream).
+
+The model writes JudgeResponse top to bottom, so generation_prediction is
+complete long before meta_explanation. SectionStream watches the token stream
+and hands back each top-level member as soon as its value closes; each one is
+validated against its own field type before it is sent as an SSE event.
+"""
+from __future__ import annotations
+
+import json
+from typing import Annotated, Any, Dict, List, Optional, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+
+from app.models import JudgeResponse
+
+# One validator per top-level field, carrying the field's own constraints.
+_SECTION_ADAPTERS: Dict[str, TypeAdapter] = {
+    name: TypeAdapter(Annotated[field.annotation, field]) for name, field in JudgeResponse.model_fields.items()
+}
+
+SECTIONS = tuple(_SECTION_ADAPTERS)
+
+
+class SectionStream:
+    """
+    Feed text deltas; get (key, value) pairs for top-level members whose value
+    is complete. Text before the first `{` (fences, preamble) is ignored.
+    """
+
+    def __init__(self) -> None:
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key_start = -1
+        self._key: Optional[str] = None
+        self._value_start: Optional[int] = None
+        self._done = False
+
+    def feed(self, delta: str) -> List[Tuple[str, Any]]:
+        if self._done:
+            return []
+        self._text += delta
+        text = self._text
+        out: List[Tuple[str, Any]] = []
+
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._value_start is None:
+                        self._key = json.loads(text[self._key_start:i + 1])
+                continue
+            if self._depth == 0:
+                if c == "{":
+                    self._depth = 1
+                continue
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1 and self._value_start is None:
+                    self._key_start = i
+            elif self._depth == 1 and c == ":":
+                self._value_start = i + 1
+            elif self._depth == 1 and c in ",}":
+                if self._key is not None and self._value_start is not None:
+                    try:
+                        out.append((self._key, json.loads(text[self._value_start:i])))
+                    except ValueError:
+                        pass  # left for the final full parse/repair
+                self._key, self._value_start = None, None
+                if c == "}":
+                    self._done = True
+                    break
+            elif c in "{[":
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+
+        self._pos = len(text)
+        return out
+
+
+def validate_section(name: str, value: Any) -> Optional[Any]:
+    """JSON-ready section if it validates against its field type, else None."""
+    adapter = _SECTION_ADAPTERS.get(name)
+    if adapter is None:
+        return None
+    try:
+        return adapter.dump_python(adapter.validate_python(value), mode="json")
+    except ValidationError:
+        return None
+
+
+def format_sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
@@ -0,0 +1,163 @@
+# app/stylometry.py
+"""
+Cheap local pre-classifier.
+
+Extracts stylometric features that mirror the heuristic signals in the system
+prompt (lexical diversity, sentence-length variance, punctuation variety,
+first-person / anecdote markers, generic "polished" phrasing) and scores
+P(AI) with a fixed logistic model. Feature scoring is vectorized with NumPy so
+batches are scored in one pass.
+
+It is a router, not a detector: only outputs beyond the configured confidence
+threshold skip the LLM.
+"""
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from app.models import (
+    AudienceSegment,
+    DistributionAnalysis,
+    GenerationPrediction,
+    JudgeResponse,
+    Virality,
+)
+
+FEATURE_NAMES = (
+    "type_token_ratio",
+    "sentence_length_cv",
+    "punctuation_entropy",
+    "first_person_rate",
+    "anecdote_rate",
+    "generic_phrase_rate",
+)
+
+# Logistic model over standardized features: z = bias + sum(w * (x - center) / scale).
+# Positive weights push toward AI. Hand-set from the prompt's heuristic signals.
+_CENTER = np.array([0.70, 0.45, 1.20, 0.03, 0.01, 0.00])
+_SCALE = np.array([0.15, 0.25, 0.60, 0.03, 0.02, 0.01])
+_WEIGHTS = np.array([0.2, -0.6, -0.45, -0.65, -0.5, 0.8])
+_BIAS = 0.0
+
+# Below this many words there is too little signal to be confident either way.
+MIN_WORDS = 12
+
+_WORD = re.compile(r"[A-Za-z']+")
+_SENTENCE = re.compile(r"[^.!?\n]+[.!?]*")
+_PUNCT = re.compile(r"[^\w\s]")
+
+_FIRST_PERSON = {"i", "i'm", "i've", "i'd", "i'll", "me", "my", "mine", "myself", "we", "our", "us"}
+_ANECDOTE = {
+    "yesterday", "today", "tonight", "last", "ago", "remember", "mom", "dad", "wife", "husband",
+    "kid", "kids", "friend", "boss", "lol", "lmao", "honestly", "literally", "ok", "omg",
+}
+_GENERIC = (
+    "in today's", "rapidly evolving", "landscape", "leverage", "synergies", "it is important to note",
+    "delve", "furthermore", "in conclusion", "unlock", "game-changer", "seamless", "holistic",
+    "navigate the", "ever-changing", "a testament to", "plays a crucial role",
+)
+
+
+def _features(text: str) -> List[float]:
+    lower = text.lower()
+    words = _WORD.findall(lower)
+    n_words = max(len(words), 1)
+
+    ttr = len(set(words)) / n_words
+
+    lengths = [len(_WORD.findall(s)) for s in _SENTENCE.findall(text)]
+    lengths = [n for n in lengths if n > 0]
+    if len(lengths) > 1:
+        mean = sum(lengths) / len(lengths)
+        cv = math.sqrt(sum((n - mean) ** 2 for n in lengths) / len(lengths)) / mean
+    else:
+        cv = _CENTER[1]
+
+    punct = Counter(_PUNCT.findall(text))
+    total = sum(punct.values())
+    entropy = -sum((c / total) * math.log2(c / total) for c in punct.values()) if total else 0.0
+
+    first_person = sum(w in _FIRST_PERSON for w in words) / n_words
+    anecdote = sum(w in _ANECDOTE for w in words) / n_words
+    generic = sum(lower.count(p) for p in _GENERIC) / n_words
+
+    return [ttr, cv, entropy, first_person, anecdote, generic]
+
+
+def extract_features(texts: Sequence[str]) -> np.ndarray:
+    """Feature matrix of shape (len(texts), len(FEATURE_NAMES))."""
+    if not texts:
+        return np.zeros((0, len(FEATURE_NAMES)))
+    return np.array([_features(t) for t in texts], dtype=float)
+
+
+def _standardize(features: np.ndarray) -> np.ndarray:
+    # Clipped so one extreme feature can't saturate the score on its own.
+    return np.clip((features - _CENTER) / _SCALE, -3.0, 3.0)
+
+
+def score(features: np.ndarray, word_counts: np.ndarray) -> np.ndarray:
+    """P(AI) per row; rows with too few words are pinned to 0.5 (no signal)."""
+    z = _BIAS + _standardize(features) @ _WEIGHTS
+    p_ai = 1.0 / (1.0 + np.exp(-z))
+    return np.where(word_counts >= MIN_WORDS, p_ai, 0.5)
+
+
+@dataclass(frozen=True)
+class Prediction:
+    p_ai: float
+    features: Sequence[float]
+
+    @property
+    def label(self) -> str:
+        return "AI" if self.p_ai >= 0.5 else "Human"
+
+    @property
+    def confidence(self) -> float:
+        return max(self.p_ai, 1.0 - self.p_ai)
+
+
+def predict(texts: Sequence[str]) -> List[Prediction]:
+    features = extract_features(texts)
+    word_counts = np.array([len(_WORD.findall(t)) for t in texts])
+    probs = score(features, word_counts) if len(texts) else np.zeros(0)
+    return [Prediction(float(p), tuple(row)) for p, row in zip(probs, features.tolist())]
+
+
+def local_response(prediction: Prediction, metadata: Optional[dict] = None) -> JudgeResponse:
+    """
+    Full JudgeResponse for a short-circuited item. Only generation_prediction is
+    grounded in the classifier; virality/distribution are marked low-confidence.
+    """
+    contributions = _standardize(np.array(prediction.features)) * _WEIGHTS
+    top = [FEATURE_NAMES[i] for i in np.argsort(-np.abs(contributions))[:2]]
+    platform = (metadata or {}).get("platform")
+
+    return JudgeResponse(
+        generation_prediction=GenerationPrediction(
+            label=prediction.label,
+            confidence=round(prediction.confidence, 4),
+            reasoning=f"Local stylometric pre-classifier (P(AI)={prediction.p_ai:.2f}); "
+                      f"strongest signals: {', '.join(top)}.",
+        ),
+        virality=Virality(
+            score=50,
+            confidence=0.1,
+            reasoning="Not assessed: evaluation short-circuited by the local pre-classifier.",
+        ),
+        distribution_analysis=DistributionAnalysis(
+            likely_audiences=[AudienceSegment(
+                community=f"{platform} general audience" if platform else "General social audience",
+                why="Default segment; audience analysis was skipped for this item.",
+            )],
+            reasoning="Not assessed: evaluation short-circuited by the local pre-classifier.",
+        ),
+        meta_explanation="Resolved locally without an LLM call because the stylometric "
+                         "pre-classifier exceeded the configured confidence threshold.",
+    )
@@ -0,0 +1,280 @@
+# app/tracing.py
+"""
+Per-request trace spans.
+
+One ID per request: TracingMiddleware takes X-Request-ID (or the trace id of a
+W3C `traceparent`, or a new uuid4) and every layer below reads it through
+request_id(): error bodies, `judge.*` log lines and the trace all carry it,
+and it is echoed back as X-Request-ID. The current span lives in a contextvar,
+so it follows the request into asyncio tasks and `to_thread` calls without
+being passed around.
+
+Spans use OpenTelemetry's data model (32-hex trace id, 16-hex span ids, unix
+nanosecond timestamps, status codes). Traces slower than TRACE_SLOW_MS are
+sampled (TRACE_SAMPLE_RATE) and appended to TRACE_FILE as OTLP/JSON, one
+export request per line, which the collector's `otlpjsonfile` receiver reads.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from app import metrics
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "judge-agent"
+
+# OTLP enums
+KIND_INTERNAL, KIND_SERVER, KIND_CONSUMER = 1, 2, 5
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+_TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+@dataclass
+class Span:
+    trace: "Trace"
+    name: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    kind: int = KIND_INTERNAL
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: int = STATUS_UNSET
+    message: str = ""
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def fail(self, error: BaseException) -> None:
+        self.status = STATUS_ERROR
+        self.message = repr(error)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": self.status, **({"message": self.message} if self.message else {})},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class Trace:
+    def __init__(self, request_id: str, trace_id: str) -> None:
+        self.request_id = request_id
+        self.trace_id = trace_id
+        self.spans: List[Span] = []  # finished spans; appends are atomic, so threads may share a trace
+
+    def duration_ms(self) -> float:
+        root = self.spans[-1] if self.spans else None
+        return (root.end_ns - root.start_ns) / 1e6 if root is not None and root.end_ns else 0.0
+
+    def to_otlp(self) -> Dict[str, Any]:
+        return {"resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": [s.to_otlp() for s in self.spans]}],
+        }]}
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def _span_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def trace_id_for(request_id: str) -> str:
+    # uuid4 request ids are already 128-bit; anything else is hashed to a stable trace id.
+    try:
+        return uuid.UUID(request_id).hex
+    except ValueError:
+        return hashlib.sha256(request_id.encode("utf-8")).hexdigest()[:32]
+
+
+# ---------------------------------------------------------
+# Exporter
+# ---------------------------------------------------------
+class FileExporter:
+    """Appends each trace as one OTLP/JSON line."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, trace: Trace) -> None:
+        line = json.dumps(trace.to_otlp(), separators=(",", ":"), ensure_ascii=False)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+_exporter: Optional[FileExporter] = None
+
+
+def get_exporter() -> Optional[FileExporter]:
+    global _exporter
+    if _exporter is None and settings.trace_file:
+        _exporter = FileExporter(settings.trace_file)
+    return _exporter
+
+
+def _finish(trace: Trace) -> None:
+    duration_ms = trace.duration_ms()
+    if duration_ms < settings.trace_slow_ms:
+        return
+    exporter = get_exporter()
+    exported = exporter is not None and random.random() < settings.trace_sample_rate
+    metrics.SLOW_TRACES.inc(exported=str(exported).lower())
+    logger.info(
+        "trace.slow request_id=%s duration_ms=%s spans=%s exported=%s",
+        trace.request_id, int(duration_ms), len(trace.spans), exported,
+    )
+    if exported:
+        try:
+            exporter.export(trace)
+        except OSError as e:
+            logger.warning("trace.export_failed path=%s error=%s", exporter.path, repr(e))
+
+
+# ---------------------------------------------------------
+# Context
+# ---------------------------------------------------------
+_current: ContextVar[Optional[Span]] = ContextVar("judge_current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def request_id() -> str:
+    """The active request's ID; a fresh uuid4 outside a trace (scripts, bulk, tests)."""
+    span = _current.get()
+    return span.trace.request_id if span is not None else str(uuid.uuid4())
+
+
+@contextmanager
+def trace(
+    name: str,
+    request_id: Optional[str] = None,
+    trace_id: Optional[str] = None,
+    parent_id: Optional[str] = None,
+    kind: int = KIND_SERVER,
+    **attributes: Any,
+) -> Iterator[Span]:
+    """Root span of a new trace (a request, a job); exported on exit if slow."""
+    request_id = request_id or str(uuid.uuid4())
+    new = Trace(request_id, trace_id or trace_id_for(request_id))
+    root = Span(new, name, _span_id(), parent_id, time.time_ns(), kind=kind, attributes={"request_id": request_id})
+    root.set(**attributes)
+    token = _current.set(root)
+    try:
+        yield root
+    except BaseException as e:
+        root.fail(e)
+        raise
+    finally:
+        _current.reset(token)
+        root.end_ns = time.time_ns()
+        new.spans.append(root)
+        _finish(new)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Child of the current span; a no-op (yields None) outside a trace."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(parent.trace, name, _span_id(), parent.span_id, time.time_ns(), attributes=attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.fail(e)
+        raise
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            _current.set(parent)  # exited from another context (async generator closed elsewhere)
+        child.end_ns = time.time_ns()
+        parent.trace.spans.append(child)
+
+
+def record(name: str, started: float, error: Optional[BaseException] = None, **attributes: Any) -> None:
+    """Add an already-finished child span; `started` is a time.perf_counter() reading."""
+    parent = _current.get()
+    if parent is None:
+        return
+    end_ns = time.time_ns()
+    child = Span(
+        parent.trace, name, _span_id(), parent.span_id,
+        end_ns - int((time.perf_counter() - started) * 1e9), end_ns=end_ns, attributes=attributes,
+    )
+    if error is not None:
+        child.fail(error)
+    parent.trace.spans.append(child)
+
+
+# ---------------------------------------------------------
+# ASGI middleware
+# ---------------------------------------------------------
+class TracingMiddleware:
+    """Root span per HTTP request; request ID in from headers, out as X-Request-ID."""
+
+    def __init__(self, app, skip_paths=("/health", "/ready", "/metrics", "/stats")) -> None:
+        self.app = app
+        self.skip_paths = frozenset(skip_paths)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.skip_paths or not settings.tracing_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        trace_id = parent_id = None
+        match = _TRACEPARENT.match(headers.get("traceparent", "").strip())
+        if match and match.group(1) != "0" * 32:
+            trace_id, parent_id = match.groups()
+        incoming = headers.get("x-request-id", "").strip()
+        rid = incoming if _REQUEST_ID.match(incoming) else (trace_id or str(uuid.uuid4()))
+
+        attributes = {"http.method": scope["method"], "http.target": scope["path"]}
+        with trace(f"{scope['method']} {scope['path']}", rid, trace_id, parent_id, **attributes) as root:
+            async def send_with_id(message) -> None:
+                if message["type"] == "http.response.start":
+                    root.set(**{"http.status_code": message["status"]})
+                    if message["status"] >= 500:
+                        root.status = STATUS_ERROR
+                    message = {**message, "headers": [*message.get("headers", []), (b"x-request-id", rid.encode())]}
+                await send(message)
+
+            await self.app(scope, receive, send_with_id)
@@ -0,0 +1,121 @@
+# benchmarks/bench_parse.py
+"""
+Parse/validate micro-benchmark.
+
+    python -m benchmarks.bench_parse [--iterations 2000]
+
+Times the previous extraction (json.loads, then find/rfind brace slice and a
+second json.loads, then model_validate on the dict) against the current
+path (app.parsing.validate_json_output: model_validate_json per candidate,
+balanced-brace scanner as the last resort) over a corpus of output shapes
+seen from real models. Logging/metrics around both are excluded. Reports
+microseconds per response and whether each path recovered a valid
+JudgeResponse; a miss costs a repair round trip to the LLM, which dwarfs
+any parse time.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.models import JudgeResponse
+from app.parsing import JSONExtractionError, validate_json_output
+
+PAYLOAD = {
+    "generation_prediction": {
+        "label": "AI",
+        "confidence": 0.81,
+        "reasoning": "Uniform sentence rhythm, generic {framework} phrasing and no concrete personal detail.",
+    },
+    "virality": {"score": 44, "confidence": 0.55, "reasoning": "Polished but interchangeable with similar posts."},
+    "distribution_analysis": {
+        "likely_audiences": [
+            {"community": "LinkedIn thought-leadership readers", "why": "Matches the register."},
+            {"community": "Marketing generalists", "why": "Tips-list format."},
+            {"community": "Early-career professionals", "why": "Self-improvement framing."},
+        ],
+        "reasoning": "Broad professional audience; little community-specific signal.",
+    },
+    "meta_explanation": "Stylometric signals dominate; metadata was sparse.",
+}
+
+CLEAN = json.dumps(PAYLOAD)
+PRETTY = json.dumps(PAYLOAD, indent=2)
+LONG = json.dumps({**PAYLOAD, "meta_explanation": "Detailed rationale. " * 400})
+
+CORPUS: List[Tuple[str, str]] = [
+    ("clean", CLEAN),
+    ("pretty_printed", PRETTY),
+    ("long_reasoning", LONG),
+    ("markdown_fence", f"```json\n{PRETTY}\n```"),
+    ("chatty_preamble", f"Sure! Here's my evaluation of the post:\n\n{CLEAN}"),
+    ("trailing_prose_with_brace", f"{CLEAN}\n\nNote: scores use the {{0-100}} scale."),
+    ("preamble_with_braces", f"Using the format {{label, confidence}}:\n{CLEAN}"),
+    ("two_objects", f"{CLEAN}\n{CLEAN}"),
+    ("truncated", CLEAN[: len(CLEAN) * 2 // 3]),
+    ("schema_violation", CLEAN.replace('"score": 44', '"score": 44.5')),
+    ("no_json", "I'm sorry, I can't evaluate this content."),
+]
+
+
+def legacy_parse(raw_text: str) -> Optional[JudgeResponse]:
+    # _parse_and_validate before the single-pass rewrite (logging/metrics omitted).
+    candidate = (raw_text or "").strip()
+    try:
+        obj = json.loads(candidate)
+    except Exception:
+        start = candidate.find("{")
+        end = candidate.rfind("}")
+        if start == -1 or end == -1 or end <= start:
+            return None
+        try:
+            obj = json.loads(candidate[start:end + 1])
+        except Exception:
+            return None
+    try:
+        return JudgeResponse.model_validate(obj)
+    except ValidationError:
+        return None
+
+
+def current_parse(raw_text: str) -> Optional[JudgeResponse]:
+    try:
+        return validate_json_output(JudgeResponse, (raw_text or "").strip())
+    except (ValidationError, JSONExtractionError):
+        return None
+
+
+def time_per_call(fn: Callable[[str], object], text: str, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(text)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_parse")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    both: Dict[str, float] = {"legacy": 0.0, "current": 0.0}
+    print(f"{'case':<28}{'bytes':>7}{'legacy µs':>12}{'current µs':>12}{'speedup':>9}  recovered (legacy/current)")
+    for name, text in CORPUS:
+        legacy_us = time_per_call(legacy_parse, text, args.iterations)
+        current_us = time_per_call(current_parse, text, args.iterations)
+        legacy_ok, current_ok = legacy_parse(text) is not None, current_parse(text) is not None
+        if legacy_ok and current_ok:
+            both["legacy"] += legacy_us
+            both["current"] += current_us
+        print(
+            f"{name:<28}{len(text):>7}{legacy_us:>12.1f}{current_us:>12.1f}{legacy_us / current_us:>8.2f}x  "
+            f"{legacy_ok}/{current_ok}"
+        )
+    print(f"{'recovered by both':<35}{both['legacy']:>12.1f}{both['current']:>12.1f}"
+          f"{both['legacy'] / both['current']:>8.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# benchmarks/bench_prompts.py
+"""
+Prompt layout benchmark.
+
+    python -m benchmarks.bench_prompts            # offline: token accounting only
+    python -m benchmarks.bench_prompts --live 20  # also call the API and report cached-token ratio
+
+Compares the previous layout (schema reminder repeated in the user message,
+content before metadata) against the current one, and reports the input
+tokens saved per request and the size of the byte-identical static prefix.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from typing import Any, Dict, List, Optional
+
+from app.chunking import estimate_tokens
+from app.prompts import OUTPUT_SCHEMA_REMINDER, SYSTEM_PROMPT, build_user_prompt
+
+SAMPLES: List[Dict[str, Any]] = [
+    {"content": "I built this startup after failing twice. Here's what I learned about hiring.",
+     "metadata": {"platform": "linkedin"}},
+    {"content": "10 productivity hacks that will transform your morning routine. Number 7 will surprise you!",
+     "metadata": {"platform": "twitter"}},
+    {"content": "ok so my cat knocked my coffee onto the laptop mid-demo and the client LOVED it lol",
+     "metadata": {"platform": "tiktok", "duration_seconds": 42}},
+    {"content": "In today's rapidly evolving landscape, organizations must leverage synergies to drive value.",
+     "metadata": {}},
+]
+
+
+def legacy_user_prompt(content: str, metadata: Optional[Dict[str, Any]]) -> str:
+    # Layout before prompts were precomputed: content first, schema reminder repeated.
+    metadata_json = json.dumps(metadata or {}, ensure_ascii=False)
+    return f"""
+CONTENT:
+{content}
+
+METADATA (json):
+{metadata_json}
+
+{OUTPUT_SCHEMA_REMINDER}
+""".strip()
+
+
+def static_prefix_tokens(prompts: List[str]) -> int:
+    # Longest common prefix across requests = what a provider prefix cache can reuse.
+    prefix = prompts[0]
+    for p in prompts[1:]:
+        i = 0
+        while i < min(len(prefix), len(p)) and prefix[i] == p[i]:
+            i += 1
+        prefix = prefix[:i]
+    return estimate_tokens(prefix)
+
+
+def offline_report() -> None:
+    system_tokens = estimate_tokens(SYSTEM_PROMPT)
+    legacy = [estimate_tokens(legacy_user_prompt(s["content"], s["metadata"])) for s in SAMPLES]
+    current = [estimate_tokens(build_user_prompt(s["content"], s["metadata"])) for s in SAMPLES]
+    saved = [a - b for a, b in zip(legacy, current)]
+
+    full_current = [SYSTEM_PROMPT + build_user_prompt(s["content"], s["metadata"]) for s in SAMPLES]
+
+    print(f"system prompt tokens:          {system_tokens}")
+    print(f"user prompt tokens (legacy):   {sum(legacy) / len(legacy):.1f} avg")
+    print(f"user prompt tokens (current):  {sum(current) / len(current):.1f} avg")
+    print(f"input tokens saved / request:  {sum(saved) / len(saved):.1f}")
+    print(f"static prefix tokens:          {static_prefix_tokens(full_current)}")
+
+
+def live_report(n: int) -> None:
+    from app.judge import JudgeAgent
+
+    agent = JudgeAgent()
+    agent._cache = None  # measure the provider, not our response cache
+    agent._semantic = None  # "(variant i)" payloads are near duplicates of each other
+    for i in range(n):
+        sample = SAMPLES[i % len(SAMPLES)]
+        agent.evaluate_text(f"{sample['content']} (variant {i})", sample["metadata"])
+
+    usage = agent.usage
+    ratio = usage.cached_prompt_tokens / usage.prompt_tokens if usage.prompt_tokens else 0.0
+    print(f"live calls:                    {n}")
+    print(f"prompt tokens / request:       {usage.prompt_tokens / n:.1f}")
+    print(f"cached prompt tokens ratio:    {ratio:.1%}")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_prompts")
+    parser.add_argument("--live", type=int, default=0, help="number of real API calls to make")
+    args = parser.parse_args(argv)
+
+    offline_report()
+    if args.live:
+        live_report(args.live)
+
+
+if __name__ == "__main__":
+    main()
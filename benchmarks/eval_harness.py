@@ -0,0 +1,380 @@
+# benchmarks/eval_harness.py
+"""
+Offline evaluation harness: accuracy, calibration, latency and cost of the
+judge over a labeled dataset, per configuration.
+
+    python -m benchmarks.eval_harness labeled.jsonl --mode auto --workers 4 \
+        --config baseline --config "mini:OPENAI_MODEL=gpt-4o-mini;OPENAI_STRUCTURED_OUTPUT=false"
+
+Dataset: one InputRequest per line plus "label" ("AI" or "Human") and an
+optional "id". A configuration is a name plus settings overrides (env vars,
+";"-separated); each runs in fresh worker processes started with those
+overrides, the dataset split across them.
+
+Upstream calls go through the replay store (benchmarks.replay): record once,
+then `--mode replay` re-runs parsing, repair, validation and scoring changes
+against the recordings at no cost. Latency is local processing time plus the
+recorded upstream latency of the calls each item made, so replayed runs report
+what a live run would have taken. Cost uses the MODEL_TIERS prices.
+
+Reported per configuration: accuracy of generation_prediction.label, a
+calibration curve (10 confidence bins) with expected calibration error and
+Brier score of P(AI), latency p50/p95, tokens and estimated cost. Results are
+written to benchmarks/results/eval-*.json.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.backends import build_backend
+from app.config import settings
+from app.judge import JudgeAgent
+from app.models import InputRequest
+from benchmarks.load_test import RESULTS_DIR, git_commit, percentile
+from benchmarks.replay import MODES, ReplayClient, ReplayStore
+
+LABELS = ("AI", "Human")
+CALIBRATION_BINS = 10
+
+# Worker processes judge every item for real: no canned offline answers, and no
+# caches that would answer one dataset item with another's response.
+WORKER_ENV = {
+    "OPENAI_OFFLINE_MODE": "false",
+    "SEMANTIC_CACHE_ENABLED": "false",
+    "CACHE_SQLITE_PATH": "",
+    "SHARED_STATE_DIR": "",
+    "TRACING_ENABLED": "false",
+}
+
+
+@dataclass
+class LabeledItem:
+    id: str
+    label: str
+    request: InputRequest
+
+
+@dataclass
+class Config:
+    name: str
+    env: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class ItemResult:
+    id: str
+    label: str
+    predicted: Optional[str] = None
+    confidence: Optional[float] = None
+    latency_ms: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    error: Optional[str] = None
+
+    @property
+    def p_ai(self) -> float:
+        return self.confidence if self.predicted == "AI" else 1.0 - self.confidence
+
+
+@dataclass
+class ChunkResult:
+    items: List[ItemResult]
+    cost_usd: float = 0.0
+    replay_hits: int = 0
+    recorded: int = 0
+    replay_misses: int = 0
+
+
+@dataclass
+class CalibrationBin:
+    lower: float
+    upper: float
+    count: int
+    mean_confidence: float
+    accuracy: float
+
+
+@dataclass
+class ConfigReport:
+    config: str
+    overrides: Dict[str, str]
+    items: int
+    errors: int
+    accuracy: float
+    ece: float
+    brier: float
+    calibration: List[CalibrationBin]
+    latency_p50_ms: float
+    latency_p95_ms: float
+    prompt_tokens: int
+    completion_tokens: int
+    cost_usd: float
+    cost_per_item_usd: float
+    replay: Dict[str, int]
+    elapsed_s: float
+
+
+@dataclass
+class EvalRun:
+    commit: str
+    timestamp: str
+    dataset: str
+    mode: str
+    reports: List[ConfigReport] = field(default_factory=list)
+
+
+# ---------------------------------------------------------
+# Inputs
+# ---------------------------------------------------------
+def load_dataset(path: str) -> List[LabeledItem]:
+    items: List[LabeledItem] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                label = record.pop("label")
+                item_id = str(record.pop("id", line_no))
+                request = InputRequest.model_validate(record)
+            except (ValueError, KeyError, ValidationError) as e:
+                raise SystemExit(f"{path}:{line_no + 1}: not a labeled InputRequest ({e!r})")
+            if label not in LABELS:
+                raise SystemExit(f"{path}:{line_no + 1}: label must be one of {LABELS}, got {label!r}")
+            items.append(LabeledItem(item_id, label, request))
+    return items
+
+
+def parse_config(spec: str) -> Config:
+    """"name" or "name:KEY=VALUE;KEY=VALUE" (values may contain ":" and ",", e.g. MODEL_TIERS)."""
+    name, _, overrides = spec.partition(":")
+    env: Dict[str, str] = {}
+    for pair in filter(None, (p.strip() for p in overrides.split(";"))):
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise SystemExit(f"config {name!r}: expected KEY=VALUE, got {pair!r}")
+        env[key.strip()] = value
+    return Config(name.strip(), env)
+
+
+# ---------------------------------------------------------
+# Evaluation (runs inside the worker processes)
+# ---------------------------------------------------------
+def build_agent(store_path: str, mode: str) -> Tuple[JudgeAgent, ReplayClient]:
+    # The upstream is the configured LLM_BACKEND (openai, local or fake); replay never builds one.
+    upstream = build_backend() if mode != "replay" else None
+    client = ReplayClient(ReplayStore(store_path), mode, upstream)
+    return JudgeAgent(client=client), client
+
+
+def _cost(agent: JudgeAgent) -> float:
+    return sum(tier["cost_usd"] for tier in agent.stats()["tiers"].values())
+
+
+def evaluate_items(agent: JudgeAgent, client: ReplayClient, items: List[LabeledItem]) -> ChunkResult:
+    """Judge items one after another; per-item latency = local time + recorded upstream time."""
+    cost_before = _cost(agent)
+    counters_before = (client.hits, client.recorded, client.misses)
+    results: List[ItemResult] = []
+    for item in items:
+        result = ItemResult(item.id, item.label)
+        tokens_before = (agent.usage.prompt_tokens, agent.usage.completion_tokens)
+        wall_before, upstream_before = client.wall_seconds, client.upstream_seconds
+        metadata = item.request.metadata.model_dump() if item.request.metadata else None
+        start = time.perf_counter()
+        try:
+            if item.request.type == "video":
+                response = agent.evaluate_video(item.request.content, metadata)
+            else:
+                response = agent.evaluate_text(item.request.content, metadata)
+            result.predicted = response.generation_prediction.label
+            result.confidence = response.generation_prediction.confidence
+        except Exception as e:
+            result.error = type(e.__cause__ or e).__name__
+        elapsed = time.perf_counter() - start
+        local = elapsed - (client.wall_seconds - wall_before)
+        result.latency_ms = round(1000 * (local + client.upstream_seconds - upstream_before), 1)
+        result.prompt_tokens = agent.usage.prompt_tokens - tokens_before[0]
+        result.completion_tokens = agent.usage.completion_tokens - tokens_before[1]
+        results.append(result)
+
+    hits, recorded, misses = (now - before for now, before in zip(
+        (client.hits, client.recorded, client.misses), counters_before
+    ))
+    return ChunkResult(results, _cost(agent) - cost_before, hits, recorded, misses)
+
+
+_worker: Optional[Tuple[JudgeAgent, ReplayClient]] = None
+
+
+def _init_worker(store_path: str, mode: str, verbose: bool) -> None:
+    global _worker
+    if not verbose:
+        # Failed items are counted in the report; a replay miss each would bury it in tracebacks.
+        logging.getLogger("app").setLevel(logging.CRITICAL)
+    _worker = build_agent(store_path, mode)
+
+
+def _run_chunk(items: List[LabeledItem]) -> ChunkResult:
+    agent, client = _worker
+    return evaluate_items(agent, client, items)
+
+
+@contextmanager
+def _environment(overrides: Dict[str, str]) -> Iterator[None]:
+    # Spawned workers read settings from the environment they start with.
+    saved = {key: os.environ.get(key) for key in overrides}
+    os.environ.update(overrides)
+    try:
+        yield
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def run_config(
+    config: Config, items: List[LabeledItem], store_path: str, mode: str, workers: int, verbose: bool = False
+) -> ConfigReport:
+    """workers=0 judges in this process with its current settings (config.env must be empty)."""
+    start = time.perf_counter()
+    if workers <= 0:
+        if config.env:
+            raise ValueError("settings overrides need worker processes (workers >= 1)")
+        chunks = [evaluate_items(*build_agent(store_path, mode), items)]
+    else:
+        size = max(1, -(-len(items) // (workers * 4)))
+        with _environment({**WORKER_ENV, **config.env}), ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),  # fresh interpreters: settings from the env above
+            initializer=_init_worker,
+            initargs=(store_path, mode, verbose),
+        ) as pool:
+            chunks = list(pool.map(_run_chunk, [items[i:i + size] for i in range(0, len(items), size)]))
+    return summarize(config, chunks, time.perf_counter() - start)
+
+
+# ---------------------------------------------------------
+# Scoring
+# ---------------------------------------------------------
+def calibration_curve(results: List[ItemResult], bins: int = CALIBRATION_BINS) -> Tuple[List[CalibrationBin], float]:
+    """Reliability bins over the predicted label's confidence, and the expected calibration error."""
+    grouped: Dict[int, List[ItemResult]] = {}
+    for r in results:
+        grouped.setdefault(min(int(r.confidence * bins), bins - 1), []).append(r)
+    curve, ece = [], 0.0
+    for index in sorted(grouped):
+        members = grouped[index]
+        confidence = sum(r.confidence for r in members) / len(members)
+        accuracy = sum(r.predicted == r.label for r in members) / len(members)
+        ece += len(members) / len(results) * abs(accuracy - confidence)
+        curve.append(CalibrationBin(
+            round(index / bins, 2), round((index + 1) / bins, 2), len(members), round(confidence, 4), round(accuracy, 4)
+        ))
+    return curve, round(ece, 4)
+
+
+def summarize(config: Config, chunks: List[ChunkResult], elapsed: float) -> ConfigReport:
+    results = [r for chunk in chunks for r in chunk.items]
+    answered = [r for r in results if r.error is None]
+    curve, ece = calibration_curve(answered)
+    latencies = [r.latency_ms for r in answered]
+    cost = sum(chunk.cost_usd for chunk in chunks)
+    return ConfigReport(
+        config=config.name,
+        overrides=config.env,
+        items=len(results),
+        errors=len(results) - len(answered),
+        accuracy=round(sum(r.predicted == r.label for r in answered) / len(answered), 4) if answered else 0.0,
+        ece=ece,
+        brier=round(sum((r.p_ai - (r.label == "AI")) ** 2 for r in answered) / len(answered), 4) if answered else 0.0,
+        calibration=curve,
+        latency_p50_ms=percentile(latencies, 50),
+        latency_p95_ms=percentile(latencies, 95),
+        prompt_tokens=sum(r.prompt_tokens for r in results),
+        completion_tokens=sum(r.completion_tokens for r in results),
+        cost_usd=round(cost, 6),
+        cost_per_item_usd=round(cost / len(results), 8) if results else 0.0,
+        replay={
+            "hits": sum(c.replay_hits for c in chunks),
+            "recorded": sum(c.recorded for c in chunks),
+            "misses": sum(c.replay_misses for c in chunks),
+        },
+        elapsed_s=round(elapsed, 2),
+    )
+
+
+# ---------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------
+def print_report(report: ConfigReport) -> None:
+    replay = report.replay
+    print(
+        f"{report.config:<16} n={report.items:<5} err={report.errors:<4} acc={report.accuracy:.1%} "
+        f"ece={report.ece:.3f} brier={report.brier:.3f} p50={report.latency_p50_ms}ms p95={report.latency_p95_ms}ms "
+        f"tokens={report.prompt_tokens + report.completion_tokens} cost=${report.cost_usd:.4f} "
+        f"(${report.cost_per_item_usd:.6f}/item) replay={replay['hits']} hit/{replay['recorded']} rec/{replay['misses']} miss"
+    )
+    for b in report.calibration:
+        print(f"    conf {b.lower:.1f}-{b.upper:.1f}  n={b.count:<5} mean_conf={b.mean_confidence:.2f} acc={b.accuracy:.2f}")
+
+
+def save(run: EvalRun, results_dir: Path) -> Path:
+    results_dir.mkdir(parents=True, exist_ok=True)
+    stamp = run.timestamp.replace(":", "").replace("-", "")
+    path = results_dir / f"eval-{stamp}-{run.commit}.json"
+    path.write_text(json.dumps(asdict(run), indent=2))
+    return path
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.eval_harness")
+    parser.add_argument("dataset", help="labeled JSONL: InputRequest fields plus \"label\" (AI|Human)")
+    parser.add_argument("--config", action="append", default=[],
+                        help='"name" or "name:KEY=VALUE;KEY=VALUE" settings overrides (repeatable)')
+    parser.add_argument("--mode", choices=MODES, default="auto", help="replay store mode (replay = zero upstream calls)")
+    parser.add_argument("--store", default="eval_replay.sqlite3", help="replay store file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes per configuration")
+    parser.add_argument("--results-dir", type=Path, default=RESULTS_DIR)
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="show the workers' judge logs")
+    args = parser.parse_args(argv)
+
+    if args.mode != "replay" and settings.llm_backend == "openai" and not os.getenv("OPENAI_API_KEY"):
+        raise SystemExit("--mode record/auto calls the upstream: set OPENAI_API_KEY, or LLM_BACKEND=local|fake")
+    items = load_dataset(args.dataset)
+    configs = [parse_config(spec) for spec in args.config] or [Config("baseline")]
+    ReplayStore(args.store).close()  # create the schema once, before the workers race for it
+
+    run = EvalRun(
+        commit=git_commit(),
+        timestamp=datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        dataset=os.path.abspath(args.dataset),
+        mode=args.mode,
+    )
+    for config in configs:
+        report = run_config(config, items, args.store, args.mode, max(1, args.workers), args.verbose)
+        run.reports.append(report)
+        print_report(report)
+
+    if not args.no_save:
+        print(f"\nsaved {save(run, args.results_dir)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# benchmarks/fake_llm.py
+"""
+Local OpenAI-compatible stub for load testing.
+
+    python -m benchmarks.fake_llm --port 9100 --latency-ms 400 --latency-sigma 0.5 \
+        --malformed-rate 0.05 --error-rate 0.01 --rate-limit-rate 0.0
+
+Serves POST /v1/chat/completions (plain or `stream: true`) with a lognormal
+latency distribution and injectable malformed-JSON, 5xx and 429 rates, so the
+real client path (pooling, parsing, repair retries, shedding) runs without
+network or quota.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Any, Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+PAYLOAD = {
+    "generation_prediction": {"label": "Human", "confidence": 0.71, "reasoning": "Specific personal details."},
+    "virality": {"score": 58, "confidence": 0.6, "reasoning": "Relatable but niche."},
+    "distribution_analysis": {
+        "likely_audiences": [
+            {"community": "Startup builders", "why": "Shipping story."},
+            {"community": "Career switchers", "why": "Learning narrative."},
+        ],
+        "reasoning": "Builder and career communities.",
+    },
+    "meta_explanation": "Stub model output.",
+}
+
+
+# Characters per streamed delta (roughly two tokens).
+STREAM_PIECE_CHARS = 8
+
+
+@dataclass(frozen=True)
+class StubProfile:
+    latency_ms: float = 300.0  # median
+    latency_sigma: float = 0.4  # lognormal shape; 0 = fixed latency
+    malformed_rate: float = 0.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after_seconds: float = 1.0
+    seed: int = 0
+
+
+def _latency(rng: random.Random, profile: StubProfile) -> float:
+    if profile.latency_sigma <= 0:
+        return profile.latency_ms / 1000
+    return rng.lognormvariate(0.0, profile.latency_sigma) * profile.latency_ms / 1000
+
+
+def _malformed(rng: random.Random) -> str:
+    # The failure modes the parser/repair path has to handle.
+    text = json.dumps(PAYLOAD)
+    return rng.choice([
+        text[: len(text) // 2],                               # truncated
+        "Sure! Here is the evaluation:\n```json\n" + text,    # chatty + unterminated fence
+        text.replace('"score": 58', '"score": "58/100"'),     # schema violation
+    ])
+
+
+async def _stream(body: Dict[str, Any], text: str, prompt_chars: int, latency: float):
+    # Tokens spread evenly over the latency, OpenAI chunk format, usage in a final chunk.
+    pieces = [text[i:i + STREAM_PIECE_CHARS] for i in range(0, len(text), STREAM_PIECE_CHARS)] or [""]
+    base = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "object": "chat.completion.chunk",
+            "created": int(time.time()), "model": body.get("model", "stub")}
+    for piece in pieces:
+        await asyncio.sleep(latency / len(pieces))
+        chunk = {**base, "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+        yield f"data: {json.dumps(chunk)}\n\n"
+    usage = {"prompt_tokens": prompt_chars // 4, "completion_tokens": len(text) // 4,
+             "total_tokens": prompt_chars // 4 + len(text) // 4}
+    yield f"data: {json.dumps({**base, 'choices': [], 'usage': usage})}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+def create_app(profile: StubProfile) -> FastAPI:
+    app = FastAPI(title="Fake LLM")
+    rng = random.Random(profile.seed)
+    counts: Dict[str, int] = {"requests": 0, "malformed": 0, "errors": 0, "rate_limited": 0}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body: Dict[str, Any] = await request.json()
+        counts["requests"] += 1
+        roll = rng.random()
+
+        if roll < profile.rate_limit_rate:
+            counts["rate_limited"] += 1
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                headers={"retry-after": str(profile.retry_after_seconds)},
+            )
+        roll -= profile.rate_limit_rate
+
+        latency = _latency(rng, profile)
+        if not body.get("stream"):
+            await asyncio.sleep(latency)
+
+        if roll < profile.error_rate:
+            counts["errors"] += 1
+            return JSONResponse(status_code=500, content={"error": {"message": "Internal error", "type": "server_error"}})
+        roll -= profile.error_rate
+
+        if roll < profile.malformed_rate:
+            counts["malformed"] += 1
+            text = _malformed(rng)
+        else:
+            text = json.dumps(PAYLOAD)
+
+        prompt_chars = sum(len(m.get("content") or "") for m in body.get("messages", []))
+        if body.get("stream"):
+            return StreamingResponse(_stream(body, text, prompt_chars, latency), media_type="text/event-stream")
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_chars // 4,
+                "completion_tokens": len(text) // 4,
+                "total_tokens": prompt_chars // 4 + len(text) // 4,
+            },
+        }
+
+    @app.get("/stats")
+    def stats() -> Dict[str, Any]:
+        return {"profile": asdict(profile), **counts}
+
+    return app
+
+
+def add_profile_args(parser: argparse.ArgumentParser) -> None:
+    defaults = StubProfile()
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms, help="median upstream latency")
+    parser.add_argument("--latency-sigma", type=float, default=defaults.latency_sigma, help="lognormal sigma")
+    parser.add_argument("--malformed-rate", type=float, default=defaults.malformed_rate)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="share of 500 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=defaults.rate_limit_rate, help="share of 429s")
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after_seconds)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def profile_from_args(args: argparse.Namespace) -> StubProfile:
+    return StubProfile(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        malformed_rate=args.malformed_rate,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after_seconds=args.retry_after,
+        seed=args.seed,
+    )
+
+
+def profile_to_argv(profile: StubProfile) -> list:
+    return [
+        "--latency-ms", str(profile.latency_ms),
+        "--latency-sigma", str(profile.latency_sigma),
+        "--malformed-rate", str(profile.malformed_rate),
+        "--error-rate", str(profile.error_rate),
+        "--rate-limit-rate", str(profile.rate_limit_rate),
+        "--retry-after", str(profile.retry_after_seconds),
+        "--seed", str(profile.seed),
+    ]
+
+
+def main(argv=None) -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.fake_llm")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_profile_args(parser)
+    args = parser.parse_args(argv)
+
+    uvicorn.run(create_app(profile_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
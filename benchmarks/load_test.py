@@ -0,0 +1,365 @@
+# benchmarks/load_test.py
+"""
+End-to-end load test of POST /evaluate against the local stub LLM.
+
+    python -m benchmarks.load_test --rps 20,50 --concurrency 16,64 --duration 20 \
+        --latency-ms 400 --malformed-rate 0.05 --error-rate 0.01
+
+Starts benchmarks.fake_llm and the real app (uvicorn, OPENAI_BASE_URL pointed
+at the stub) as subprocesses, then drives each level:
+- --rps: open loop, requests issued on a fixed schedule regardless of latency
+- --concurrency: closed loop, N workers each waiting for their response
+
+Every request has unique content, so the response cache and request coalescing
+don't hide upstream cost. The near-duplicate cache is turned off
+(SEMANTIC_CACHE_ENABLED=false) because payloads differing only by a counter would
+all match. Reports p50/p95/p99 latency, throughput, status mix, repair-retry rate
+and peak app RSS; results are written to benchmarks/results/ tagged with the git
+commit and compared against the previous run.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.bench_prompts import SAMPLES
+from benchmarks.fake_llm import StubProfile, add_profile_args, profile_from_args, profile_to_argv
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# p95 / throughput change beyond this share is flagged in the comparison.
+REGRESSION_THRESHOLD = 0.10
+
+
+@dataclass
+class LevelResult:
+    mode: str  # "rps" | "concurrency"
+    target: float
+    duration_s: float
+    requests: int
+    statuses: Dict[str, int]
+    throughput_rps: float
+    latency_p50_ms: float
+    latency_p95_ms: float
+    latency_p99_ms: float
+    retry_rate: Optional[float]
+    peak_rss_mb: Optional[float]
+
+
+@dataclass
+class RunResult:
+    commit: str
+    timestamp: str
+    profile: Dict[str, Any]
+    workers: int = 1
+    levels: List[LevelResult] = field(default_factory=list)
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile; q in [0, 100]."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def process_tree(pid: int) -> List[int]:
+    # The app and, with --workers, its uvicorn worker processes.
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            children = [int(c) for c in f.read().split()]
+    except OSError:
+        return [pid]
+    return [pid] + [p for child in children for p in process_tree(child)]
+
+
+def tree_rss_mb(pid: int) -> Optional[float]:
+    sizes = [mb for mb in (rss_mb(p) for p in process_tree(pid)) if mb is not None]
+    return sum(sizes) if sizes else None
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process(pid).memory_info().rss / (1024 * 1024)
+
+
+def scrape_counter(metrics_text: str, name: str) -> float:
+    for line in metrics_text.splitlines():
+        if line.startswith(name + " "):
+            return float(line.split()[1])
+    return 0.0
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def payload(i: int) -> Dict[str, Any]:
+    sample = SAMPLES[i % len(SAMPLES)]
+    return {"type": "text", "content": f"{sample['content']} (#{i})", "metadata": sample["metadata"]}
+
+
+# ---------------------------------------------------------
+# Subprocesses
+# ---------------------------------------------------------
+def start_stub(profile: StubProfile, port: int, log) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_llm", "--port", str(port), *profile_to_argv(profile)],
+        stdout=log,
+        stderr=log,
+    )
+
+
+def start_app(port: int, stub_port: int, log, workers: int = 1, state_dir: Optional[str] = None) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{stub_port}/v1",
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY") or "load-test",
+        "OPENAI_OFFLINE_MODE": "false",
+        "SEMANTIC_CACHE_ENABLED": "false",
+    }
+    if workers > 1:
+        command = ["-m", "app.serve", "--workers", str(workers), "--state-dir", state_dir]
+    else:
+        command = ["-m", "uvicorn", "app.main:app"]
+    return subprocess.Popen(
+        [sys.executable, *command, "--port", str(port), "--log-level", "warning"],
+        env=env,
+        stdout=log,
+        stderr=log,
+    )
+
+
+def wait_until_up(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+# ---------------------------------------------------------
+# Load generation
+# ---------------------------------------------------------
+async def _one(client: httpx.AsyncClient, i: int, latencies: List[float], statuses: Counter) -> None:
+    start = time.perf_counter()
+    try:
+        resp = await client.post("/evaluate", json=payload(i))
+        statuses[str(resp.status_code)] += 1
+    except httpx.HTTPError as e:
+        statuses[type(e).__name__] += 1
+        return
+    if resp.status_code == 200:
+        latencies.append(time.perf_counter() - start)
+
+
+async def open_loop(client: httpx.AsyncClient, rps: float, duration: float, latencies, statuses) -> int:
+    tasks = []
+    start = time.perf_counter()
+    i = 0
+    while (due := i / rps) < duration:
+        delay = start + due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(_one(client, i, latencies, statuses)))
+        i += 1
+    await asyncio.gather(*tasks)
+    return i
+
+
+async def closed_loop(client: httpx.AsyncClient, workers: int, duration: float, latencies, statuses) -> int:
+    deadline = time.perf_counter() + duration
+    issued = 0
+
+    async def worker() -> None:
+        nonlocal issued
+        while time.perf_counter() < deadline:
+            i = issued
+            issued += 1
+            await _one(client, i, latencies, statuses)
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    return issued
+
+
+async def run_level(
+    base_url: str, app_pid: int, mode: str, target: float, duration: float, workers: int = 1
+) -> LevelResult:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    peak_rss: List[float] = []
+
+    async def sample_memory() -> None:
+        while True:
+            mb = tree_rss_mb(app_pid)
+            if mb is not None:
+                peak_rss.append(mb)
+            await asyncio.sleep(0.5)
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as client:
+        before = (await client.get("/metrics")).text
+        sampler = asyncio.create_task(sample_memory())
+        start = time.perf_counter()
+        if mode == "rps":
+            requests = await open_loop(client, target, duration, latencies, statuses)
+        else:
+            requests = await closed_loop(client, int(target), duration, latencies, statuses)
+        elapsed = time.perf_counter() - start
+        sampler.cancel()
+        after = (await client.get("/metrics")).text
+
+    retries = scrape_counter(after, "judge_retries_total") - scrape_counter(before, "judge_retries_total")
+    return LevelResult(
+        mode=mode,
+        target=target,
+        duration_s=round(elapsed, 2),
+        requests=requests,
+        statuses=dict(statuses),
+        throughput_rps=round(len(latencies) / elapsed, 2),
+        latency_p50_ms=round(1000 * percentile(latencies, 50), 1),
+        latency_p95_ms=round(1000 * percentile(latencies, 95), 1),
+        latency_p99_ms=round(1000 * percentile(latencies, 99), 1),
+        # /metrics is per process: with several workers it only shows the one that answered.
+        retry_rate=round(retries / requests, 4) if requests and workers == 1 else None,
+        peak_rss_mb=round(max(peak_rss), 1) if peak_rss else None,
+    )
+
+
+# ---------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------
+def level_key(level: Dict[str, Any]) -> str:
+    return f"{level['mode']}={level['target']:g}"
+
+
+def print_level(level: LevelResult) -> None:
+    print(
+        f"{level_key(asdict(level)):<18} n={level.requests:<6} ok/s={level.throughput_rps:<8} "
+        f"p50={level.latency_p50_ms}ms p95={level.latency_p95_ms}ms p99={level.latency_p99_ms}ms "
+        f"retry={'n/a' if level.retry_rate is None else f'{level.retry_rate:.2%}'} rss={level.peak_rss_mb}MB statuses={level.statuses}"
+    )
+
+
+def save(result: RunResult, results_dir: Path) -> Path:
+    results_dir.mkdir(parents=True, exist_ok=True)
+    stamp = result.timestamp.replace(":", "").replace("-", "")
+    path = results_dir / f"load-{stamp}-{result.commit}.json"
+    path.write_text(json.dumps(asdict(result), indent=2))
+    return path
+
+
+def previous_run(results_dir: Path, exclude: Path) -> Optional[Path]:
+    runs = sorted(p for p in results_dir.glob("load-*.json") if p != exclude)
+    return runs[-1] if runs else None
+
+
+def compare(current: RunResult, baseline_path: Path) -> None:
+    baseline = json.loads(baseline_path.read_text())
+    if baseline["profile"] != current.profile:
+        print(f"note: stub profile differs from baseline {baseline_path.name}; deltas are not like-for-like")
+    if baseline.get("workers", 1) != current.workers:
+        print(f"note: worker count differs from baseline {baseline_path.name}")
+    by_key = {level_key(level): level for level in baseline["levels"]}
+    print(f"\nvs {baseline_path.name} (commit {baseline['commit']}):")
+    for level in map(asdict, current.levels):
+        old = by_key.get(level_key(level))
+        if old is None:
+            continue
+        deltas = []
+        for metric, worse_if_higher in (("latency_p95_ms", True), ("throughput_rps", False)):
+            if not old[metric]:
+                continue
+            change = (level[metric] - old[metric]) / old[metric]
+            regressed = change > REGRESSION_THRESHOLD if worse_if_higher else change < -REGRESSION_THRESHOLD
+            deltas.append(f"{metric} {change:+.1%}{' REGRESSION' if regressed else ''}")
+        print(f"  {level_key(level):<18} " + ", ".join(deltas))
+
+
+def _levels(spec: str) -> List[float]:
+    return [float(x) for x in spec.split(",") if x.strip()]
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load_test")
+    parser.add_argument("--rps", default="10,25", help="comma-separated open-loop request rates")
+    parser.add_argument("--concurrency", default="8,32", help="comma-separated closed-loop worker counts")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per level")
+    parser.add_argument("--app-port", type=int, default=8765)
+    parser.add_argument("--stub-port", type=int, default=9100)
+    parser.add_argument("--workers", type=int, default=1, help="app worker processes (>1 runs app.serve)")
+    parser.add_argument("--results-dir", type=Path, default=RESULTS_DIR)
+    parser.add_argument("--baseline", type=Path, default=None, help="result file to compare against (default: previous run)")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="show app and stub logs")
+    add_profile_args(parser)
+    args = parser.parse_args(argv)
+
+    profile = profile_from_args(args)
+    log = None if args.verbose else subprocess.DEVNULL
+    stub = start_stub(profile, args.stub_port, log)
+    state_dir = tempfile.mkdtemp(prefix="judge-load-") if args.workers > 1 else None
+    app = start_app(args.app_port, args.stub_port, log, args.workers, state_dir)
+    base_url = f"http://127.0.0.1:{args.app_port}"
+    try:
+        wait_until_up(f"http://127.0.0.1:{args.stub_port}/stats")
+        wait_until_up(f"{base_url}/health")
+
+        result = RunResult(
+            commit=git_commit(),
+            timestamp=datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            profile=asdict(profile),
+            workers=args.workers,
+        )
+        levels = [("rps", r) for r in _levels(args.rps)] + [("concurrency", c) for c in _levels(args.concurrency)]
+        for mode, target in levels:
+            level = asyncio.run(run_level(base_url, app.pid, mode, target, args.duration, args.workers))
+            result.levels.append(level)
+            print_level(level)
+    finally:
+        app.terminate()
+        stub.terminate()
+        app.wait()
+        stub.wait()
+
+    saved = None if args.no_save else save(result, args.results_dir)
+    if saved is not None:
+        print(f"\nsaved {saved}")
+    baseline = args.baseline or (previous_run(args.results_dir, saved) if args.results_dir.exists() else None)
+    if baseline is not None:
+        compare(result, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# benchmarks/replay.py
+"""
+Record/replay of upstream LLM calls.
+
+ReplayClient is given to JudgeAgent in place of the OpenAI client. Each
+chat.completions.create call is keyed by what decides the model's answer
+(model, messages, temperature, response_format):
+- "record": call the upstream and store the raw text, usage and latency
+- "replay": serve from the store only; a miss raises, it is never a paid call
+- "auto":   replay what is stored, record the rest
+
+Replaying re-runs everything after the call (parsing, local repair,
+validation, escalation, scoring) against recorded outputs at zero cost. A
+prompt or model change changes the key, so those calls are recorded afresh.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+MODES = ("record", "replay", "auto")
+
+_KEY_FIELDS = ("model", "messages", "temperature", "response_format")
+
+
+class ReplayMiss(Exception):
+    """A replay-only run asked for a call that was never recorded."""
+
+    # Classified as a client error (app.resilience.classify): a miss says nothing about
+    # upstream health, so it must not open the breaker and shed the recorded items after it.
+    status_code = 404
+
+
+@dataclass
+class Recording:
+    text: str
+    prompt_tokens: int
+    completion_tokens: int
+    latency_s: float
+
+
+def replay_key(kwargs: Dict[str, Any]) -> str:
+    payload = {k: kwargs.get(k) for k in _KEY_FIELDS}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class ReplayStore:
+    """SQLite file of recordings; safe to share between worker processes (WAL)."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS recordings ("
+            " key TEXT PRIMARY KEY, model TEXT, text TEXT NOT NULL,"
+            " prompt_tokens INTEGER, completion_tokens INTEGER, latency_s REAL, created_at REAL)"
+        )
+
+    def get(self, key: str) -> Optional[Recording]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text, prompt_tokens, completion_tokens, latency_s FROM recordings WHERE key = ?", (key,)
+            ).fetchone()
+        return Recording(*row) if row is not None else None
+
+    def put(self, key: str, model: str, recording: Recording) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO recordings VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, recording.text, recording.prompt_tokens, recording.completion_tokens,
+                 recording.latency_s, time.time()),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM recordings").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class ReplayClient:
+    """Sync OpenAI-client stand-in (`.chat.completions.create`) in front of a ReplayStore."""
+
+    def __init__(self, store: ReplayStore, mode: str = "auto", upstream: Any = None) -> None:
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+        self.store = store
+        self.mode = mode
+        self.upstream = upstream
+        self.chat = SimpleNamespace(completions=self)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.recorded = 0
+        self.misses = 0
+        self.upstream_seconds = 0.0  # recorded latency of every call served
+        self.wall_seconds = 0.0      # time actually spent inside create()
+
+    def create(self, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return self._create(kwargs)
+        finally:
+            with self._lock:
+                self.wall_seconds += time.perf_counter() - start
+
+    def _create(self, kwargs: Dict[str, Any]) -> Any:
+        key = replay_key(kwargs)
+        recording = self.store.get(key) if self.mode != "record" else None
+        if recording is not None:
+            outcome = "hits"
+        elif self.mode == "replay" or self.upstream is None:
+            with self._lock:
+                self.misses += 1
+            raise ReplayMiss(f"no recording for key {key[:12]} (model={kwargs.get('model')})")
+        else:
+            start = time.perf_counter()
+            resp = self.upstream.chat.completions.create(**kwargs)
+            usage = getattr(resp, "usage", None)
+            recording = Recording(
+                text=resp.choices[0].message.content or "",
+                prompt_tokens=(getattr(usage, "prompt_tokens", 0) or 0) if usage is not None else 0,
+                completion_tokens=(getattr(usage, "completion_tokens", 0) or 0) if usage is not None else 0,
+                latency_s=time.perf_counter() - start,
+            )
+            self.store.put(key, kwargs.get("model") or "", recording)
+            outcome = "recorded"
+
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            self.upstream_seconds += recording.latency_s
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=recording.text))],
+            usage=SimpleNamespace(prompt_tokens=recording.prompt_tokens, completion_tokens=recording.completion_tokens),
+        )
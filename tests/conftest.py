@@ -0,0 +1,11 @@
+# tests/conftest.py
+
+import pytest
+
+from app import judge as judge_module
+
+
+@pytest.fixture
+def online(monkeypatch):
+    """Calls reach the (injected) upstream instead of the offline canned response."""
+    monkeypatch.setattr(judge_module, "settings", judge_module.settings.__class__(offline_mode=False))
@@ -0,0 +1,112 @@
+# tests/fakes.py
+"""
+Local stand-ins for the OpenAI client used across tests (no network, deterministic).
+"""
+
+import asyncio
+import json
+import random
+from types import SimpleNamespace
+
+VALID_PAYLOAD = {
+    "generation_prediction": {"label": "Human", "confidence": 0.7, "reasoning": "Personal tone."},
+    "virality": {"score": 60, "confidence": 0.6, "reasoning": "Relatable."},
+    "distribution_analysis": {
+        "likely_audiences": [{"community": "Startup founders", "why": "Career topic."}],
+        "reasoning": "Founder-focused content."
+    },
+    "meta_explanation": "Fake model output."
+}
+
+
+def completion(text, prompt_tokens=100, completion_tokens=50):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens),
+    )
+
+
+class FakeCompletions:
+    """
+    `respond(kwargs) -> str` decides what the fake model returns for each call;
+    every call's kwargs are recorded for assertions.
+    """
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return completion(self.respond(kwargs))
+
+
+def make_client(respond):
+    completions = FakeCompletions(respond)
+    return SimpleNamespace(chat=SimpleNamespace(completions=completions)), completions
+
+
+class SloppyModel:
+    """
+    Fake model that honors response_format perfectly, but without it returns
+    schema-violating output (float score, 7 audiences, empty reasoning) at
+    `invalid_rate`. The empty reasoning can't be fixed locally.
+    """
+
+    def __init__(self, invalid_rate=0.3, seed=0):
+        self.invalid_rate = invalid_rate
+        self.rng = random.Random(seed)
+
+    def __call__(self, kwargs):
+        if "response_format" in kwargs or self.rng.random() >= self.invalid_rate:
+            return json.dumps(VALID_PAYLOAD)
+        bad = json.loads(json.dumps(VALID_PAYLOAD))
+        bad["virality"]["score"] = 72.5
+        bad["distribution_analysis"]["likely_audiences"] = [
+            {"community": f"Community {i}", "why": "Overlap."} for i in range(7)
+        ]
+        bad["distribution_analysis"]["reasoning"] = ""
+        return "```json\n" + json.dumps(bad) + "\n```"
+
+
+class RateLimitError(Exception):
+    """Shaped like openai.RateLimitError: status_code plus response headers."""
+
+    status_code = 429
+
+    def __init__(self, retry_after):
+        super().__init__("rate limited")
+        self.response = SimpleNamespace(headers={"retry-after": str(retry_after)})
+
+
+class FakeUpstream:
+    """
+    Async upstream with injectable latency and failures. Latency grows with
+    concurrency past `capacity` (provider-side queueing); past `rate_limit_at`
+    in-flight calls it answers 429 with Retry-After.
+    """
+
+    def __init__(self, latency=0.01, capacity=8, rate_limit_at=None, retry_after=2, fail=False):
+        self.latency = latency
+        self.capacity = capacity
+        self.rate_limit_at = rate_limit_at
+        self.retry_after = retry_after
+        self.fail = fail
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=self)
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.rate_limit_at is not None and self.in_flight > self.rate_limit_at:
+                raise RateLimitError(self.retry_after)
+            if self.fail:
+                raise ConnectionError("upstream down")
+            await asyncio.sleep(self.latency * max(1.0, self.in_flight / self.capacity))
+            return completion(json.dumps(VALID_PAYLOAD))
+        finally:
+            self.in_flight -= 1
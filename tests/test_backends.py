@@ -0,0 +1,114 @@
+# tests/test_backends.py
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from openai import AsyncOpenAI, OpenAI
+
+from app import backends as backends_module
+from app import config as config_module
+from app import judge as judge_module
+from app import routing as routing_module
+from app.backends import FakeBackend, build_backend, fake_output
+from app.judge import JudgeAgent
+from app.models import InputRequest, JudgeResponse
+from app.prompts import build_response_format
+from fakes import VALID_PAYLOAD
+
+
+@pytest.fixture
+def use_settings(monkeypatch):
+    def apply(**overrides):
+        s = judge_module.settings.__class__(**overrides)
+        for module in (backends_module, config_module, judge_module, routing_module):
+            monkeypatch.setattr(module, "settings", s)
+        return s
+    return apply
+
+
+def test_fake_backend_is_deterministic_per_prompt(use_settings):
+    use_settings(offline_mode=False)
+    agent = JudgeAgent(backend=FakeBackend())
+    agent._cache = agent._semantic = None
+
+    posts = [f"Post number {i} about shipping a side project" for i in range(12)]
+    first = [agent.evaluate_text(p) for p in posts]
+    again = [agent.evaluate_text(p) for p in posts]
+
+    assert first == again
+    assert len({r.generation_prediction.label for r in first}) == 2  # varied, unlike the offline blob
+    assert agent.backend.calls == 24 and agent.usage.prompt_tokens > 0
+
+
+def test_fake_backend_honors_partial_and_packed_formats(use_settings):
+    use_settings(offline_mode=False)
+    partial = json.loads(fake_output({
+        "messages": [{"role": "user", "content": "fix it"}],
+        "response_format": build_response_format(["virality"]),
+    }))
+    assert list(partial) == ["virality"]
+
+    agent = JudgeAgent(backend=FakeBackend())
+    items = [InputRequest(type="text", content=f"Short post {i}") for i in range(3)]
+    packed = asyncio.run(agent.evaluate_packed_async(items))
+    singles = [asyncio.run(JudgeAgent(backend=FakeBackend()).evaluate_request_async(i)) for i in items]
+
+    assert all(isinstance(r, JudgeResponse) for r in packed)
+    assert agent.backend.calls == 1 and agent.stats()["packing"]["rerequested"] == 0
+    assert packed == singles  # an item gets the same answer packed or alone
+
+
+def test_fake_backend_streams_sections(use_settings):
+    use_settings(offline_mode=False)
+    agent = JudgeAgent(backend=FakeBackend())
+
+    async def collect():
+        return [event async for event in agent.stream_text_async("A post streamed from the fake backend.")]
+
+    events = asyncio.run(collect())
+    assert [e for e, _ in events] == ["section"] * 4 + ["result"]
+    assert agent.usage.completion_tokens > 0
+
+
+def test_local_backend_needs_no_key_and_uses_its_own_pool_and_timeout(use_settings, monkeypatch):
+    use_settings(
+        offline_mode=False, openai_api_key="", llm_backend="local",
+        local_llm_base_url="http://127.0.0.1:8080/v1", local_llm_model="qwen2.5-1.5b-instruct",
+        local_llm_timeout_seconds=90, local_llm_max_connections=2,
+    )
+    seen = []
+
+    def handler(request):
+        seen.append((str(request.url), json.loads(request.content)["model"], request.extensions["timeout"]["read"]))
+        return httpx.Response(200, json={
+            "id": "x", "object": "chat.completion", "created": 0, "model": "local",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": json.dumps(VALID_PAYLOAD)}}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        })
+
+    agent = JudgeAgent()
+    backend = agent.backend
+    assert (backend.name, backend.max_connections, backend.timeout) == ("local", 2, 90)
+    assert not agent.ready
+
+    transport = httpx.MockTransport(handler)
+    monkeypatch.setattr(backend, "_build_clients", lambda: (
+        OpenAI(api_key=backend.api_key, base_url=backend.base_url, http_client=httpx.Client(transport=transport)),
+        AsyncOpenAI(api_key=backend.api_key, base_url=backend.base_url,
+                    http_client=httpx.AsyncClient(transport=transport)),
+    ))
+
+    agent.evaluate_text("Scored on local CPU inference")
+    asyncio.run(agent.evaluate_text_async("Scored on local CPU inference, async"))
+
+    assert agent.ready
+    assert seen == [("http://127.0.0.1:8080/v1/chat/completions", "qwen2.5-1.5b-instruct", 90)] * 2
+    assert agent.stats()["tiers"]["qwen2.5-1.5b-instruct"]["cost_usd"] == 0
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        build_backend("mystery")
@@ -0,0 +1,93 @@
+# tests/test_batch.py
+
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app import batch as batch_module
+from app import packing as packing_module
+from app.batch import evaluate_batch
+from app.judge import OFFLINE_RESPONSE
+from app.main import app
+from app.models import InputRequest, JudgeResponse
+
+client = TestClient(app)
+
+RESPONSE = JudgeResponse.model_validate_json(OFFLINE_RESPONSE)
+
+
+class CountingAgent:
+    def __init__(self):
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def evaluate_request_async(self, request, preclassified=False):
+        self.calls.append(request.content)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if request.content == "boom":
+            raise RuntimeError("upstream failed")
+        return RESPONSE
+
+
+def test_batch_dedupes_and_preserves_order(monkeypatch):
+    monkeypatch.setattr(packing_module, "settings", packing_module.settings.__class__(packing_max_items=1))
+    agent = CountingAgent()
+    items = [InputRequest(type="text", content=c) for c in ["a", "b", "a", "boom", "c", "b"]]
+
+    outcomes = asyncio.run(evaluate_batch(agent, items, concurrency=2))
+
+    assert sorted(agent.calls) == ["a", "b", "boom", "c"]
+    assert agent.max_in_flight == 2
+    assert isinstance(outcomes[3], RuntimeError)
+    assert [o is RESPONSE for o in outcomes] == [True, True, True, False, True, True]
+
+
+def test_batch_endpoint():
+    payload = {
+        "items": [
+            {"type": "text", "content": "First post"},
+            {"type": "video", "content": "A transcript", "metadata": {"duration_seconds": 30}},
+        ]
+    }
+
+    response = client.post("/evaluate/batch", json=payload)
+    assert response.status_code == 200
+
+    results = response.json()["results"]
+    assert len(results) == 2
+    assert all("generation_prediction" in r for r in results)
+
+
+def test_batch_endpoint_rejects_empty():
+    response = client.post("/evaluate/batch", json={"items": []})
+    assert response.status_code == 422
+
+
+def test_media_paths_are_preclassified_on_their_transcript(monkeypatch):
+    monkeypatch.setattr(batch_module, "settings", batch_module.settings.__class__(preclassifier_enabled=True))
+    monkeypatch.setattr(batch_module, "is_media_path", lambda content: content.endswith(".mp4"))
+    monkeypatch.setattr(packing_module, "settings", packing_module.settings.__class__(packing_max_items=1))
+
+    class PreclassifyingAgent(CountingAgent):
+        def __init__(self):
+            super().__init__()
+            self.preclassified, self.flags = [], {}
+
+        def preclassify(self, contents, metadatas):
+            self.preclassified.extend(contents)
+            return [None] * len(contents)
+
+        async def evaluate_request_async(self, request, preclassified=False):
+            self.flags[request.content] = preclassified
+            return RESPONSE
+
+    agent = PreclassifyingAgent()
+    items = [InputRequest(type="text", content="A post"), InputRequest(type="video", content="clip.mp4")]
+    asyncio.run(evaluate_batch(agent, items, concurrency=2))
+
+    assert agent.preclassified == ["A post"]  # never the file name
+    assert agent.flags["clip.mp4"] is False  # evaluate_video_async pre-classifies the transcript
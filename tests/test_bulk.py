@@ -0,0 +1,77 @@
+# tests/test_bulk.py
+
+import asyncio
+import json
+
+import pytest
+
+from app import packing as packing_module
+from app.bulk import Checkpoint, run_bulk
+from app.judge import OFFLINE_RESPONSE, TokenUsage
+from app.models import JudgeResponse
+
+RESPONSE = JudgeResponse.model_validate_json(OFFLINE_RESPONSE)
+
+
+class FakeAgent:
+    def __init__(self):
+        self.usage = TokenUsage()
+        self.seen = []
+
+    async def evaluate_request_async(self, request, preclassified=False):
+        self.seen.append(request.content)
+        await asyncio.sleep(0.001 * (len(self.seen) % 3))  # finish out of order
+        if request.content == "boom":
+            raise RuntimeError("upstream failed")
+        self.usage.prompt_tokens += 10
+        return RESPONSE
+
+
+@pytest.fixture(autouse=True)
+def one_call_per_row(monkeypatch):
+    # FakeAgent evaluates rows one at a time; packing is covered in test_packing.py.
+    monkeypatch.setattr(packing_module, "settings", packing_module.settings.__class__(packing_max_items=1))
+
+
+def write_input(path, contents):
+    with open(path, "w", encoding="utf-8") as f:
+        for c in contents:
+            f.write((c if c.startswith("{bad") else json.dumps({"type": "text", "content": c})) + "\n")
+
+
+def read_output(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_bulk_writes_in_order_with_errors(tmp_path):
+    src, out = tmp_path / "in.jsonl", tmp_path / "out.ndjson"
+    write_input(src, ["a", "b", "boom", "{bad json", "c"])
+
+    agent = FakeAgent()
+    summary = asyncio.run(run_bulk(agent, str(src), str(out), concurrency=2))
+
+    rows = read_output(out)
+    assert [r["line"] for r in rows] == [0, 1, 2, 3, 4]
+    assert rows[2]["error"]["error"] == "evaluation_failed"
+    assert rows[3]["error"]["error"] == "invalid_input"
+    assert "result" in rows[4]
+    assert summary.processed == 5 and summary.errors == 2 and summary.tokens == 30
+
+
+def test_bulk_resumes_from_checkpoint(tmp_path):
+    src, out = tmp_path / "in.jsonl", tmp_path / "out.ndjson"
+    write_input(src, ["a", "b", "c", "d"])
+    asyncio.run(run_bulk(FakeAgent(), str(src), str(out), concurrency=2))
+    full = out.read_bytes()
+
+    # Simulate a crash after two rows: checkpoint at row 2, torn partial row on disk.
+    first_two = b"".join(full.splitlines(keepends=True)[:2])
+    out.write_bytes(first_two + b'{"line": 2, "res')
+    Checkpoint(str(src.resolve()), next_line=2, output_bytes=len(first_two)).save(f"{out}.ckpt")
+
+    agent = FakeAgent()
+    asyncio.run(run_bulk(agent, str(src), str(out), concurrency=2))
+
+    assert agent.seen == ["c", "d"]
+    assert out.read_bytes() == full
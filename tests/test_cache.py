@@ -0,0 +1,92 @@
+# tests/test_cache.py
+
+import sqlite3
+import time
+
+from app.cache import ResponseCache, SqliteCacheStore, cache_key
+from app.judge import JudgeAgent, OFFLINE_RESPONSE
+from app.models import JudgeResponse
+
+
+RESPONSE = JudgeResponse.model_validate_json(OFFLINE_RESPONSE)
+
+
+def test_cache_key_depends_on_model_and_temperature():
+    base = cache_key("sys", "user", "gpt-4o-mini", 0.2)
+    assert base == cache_key("sys", "user", "gpt-4o-mini", 0.2)
+    assert base != cache_key("sys", "user", "gpt-4o", 0.2)
+    assert base != cache_key("sys", "user", "gpt-4o-mini", 0.0)
+    assert cache_key("ab", "c", "m", 0.2) != cache_key("a", "bc", "m", 0.2)
+
+
+def test_lru_eviction_and_ttl():
+    cache = ResponseCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", RESPONSE)
+    cache.set("b", RESPONSE)
+    assert cache.get("a") is RESPONSE  # "a" becomes most recently used
+    cache.set("c", RESPONSE)           # evicts "b"
+    assert cache.get("b") is None
+
+    expired = ResponseCache(max_entries=2, ttl_seconds=-1)
+    expired.set("a", RESPONSE)
+    assert expired.get("a") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["evictions"] == 1
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    ResponseCache(max_entries=10, ttl_seconds=60, disk=SqliteCacheStore(path)).set("k", RESPONSE)
+
+    restarted = ResponseCache(max_entries=10, ttl_seconds=60, disk=SqliteCacheStore(path))
+    assert restarted.get("k") == RESPONSE
+    assert restarted.stats()["disk_hits"] == 1
+    assert restarted.get("k") == RESPONSE
+    assert restarted.stats()["memory_hits"] == 1
+
+
+def test_unreadable_disk_rows_are_misses(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    disk = SqliteCacheStore(path)
+    disk.set("stale", '{"virality": {"score": 50}}', time.time() + 60)  # an older schema
+    disk.set("corrupt", "not json", time.time() + 60)
+    cache = ResponseCache(max_entries=10, ttl_seconds=60, disk=disk)
+
+    assert cache.get("stale") is None
+    assert cache.get("corrupt") is None
+    assert cache.stats()["misses"] == 2
+
+    disk.close()
+    assert cache.get("gone") is None  # sqlite3.ProgrammingError: closed database
+
+
+def test_locked_disk_tier_does_not_stall_callers(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache(max_entries=10, ttl_seconds=60, disk=SqliteCacheStore(path, busy_timeout_ms=50))
+    other_worker = sqlite3.connect(path, isolation_level=None)
+    other_worker.execute("BEGIN IMMEDIATE")  # holds the write lock
+
+    start = time.monotonic()
+    cache.set("k", RESPONSE)  # the disk write gives up; memory still has it
+    assert time.monotonic() - start < 1
+    assert cache.get("k") == RESPONSE
+
+    other_worker.execute("ROLLBACK")
+
+
+def test_agent_resubmission_skips_llm(monkeypatch):
+    agent = JudgeAgent(cache=ResponseCache(max_entries=10, ttl_seconds=60))
+    calls = {"count": 0}
+
+    def mock_call_llm(*args, **kwargs):
+        calls["count"] += 1
+        return OFFLINE_RESPONSE
+
+    monkeypatch.setattr(agent, "_call_llm", mock_call_llm)
+
+    first = agent.evaluate_text("Same post", {"platform": "x"})
+    second = agent.evaluate_text("Same post", {"platform": "x"})
+    assert second is first
+    assert calls["count"] == 1
+    assert agent.stats()["cache"]["hits"] == 1
@@ -0,0 +1,86 @@
+# tests/test_chunking.py
+
+import asyncio
+import json
+
+from app import chunking as chunking_module
+from app import judge as judge_module
+from app.chunking import estimate_tokens, merge_responses, sample_evenly, split_into_chunks
+from app.judge import JudgeAgent
+from app.models import JudgeResponse
+from fakes import VALID_PAYLOAD
+
+
+def response(label, confidence, score, communities):
+    payload = json.loads(json.dumps(VALID_PAYLOAD))
+    payload["generation_prediction"].update(label=label, confidence=confidence)
+    payload["virality"]["score"] = score
+    payload["distribution_analysis"]["likely_audiences"] = [{"community": c, "why": "Fit."} for c in communities]
+    return JudgeResponse.model_validate(payload)
+
+
+def test_split_respects_budget():
+    text = " ".join(f"Sentence number {i} talks about something." for i in range(300))
+    chunks = split_into_chunks(text, max_tokens=100)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(c) <= 100 for c in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+
+def test_hard_split_respects_budget_for_dense_scripts(monkeypatch):
+    # CJK and emoji run near one token per character under tiktoken, not four.
+    monkeypatch.setattr(chunking_module, "estimate_tokens", len)
+    text = "漢字😀" * 500  # one "sentence": no breaks to split on
+    chunks = split_into_chunks(text, max_tokens=50)
+
+    assert all(len(c) <= 50 for c in chunks)
+    assert "".join(chunks) == text
+
+
+def test_sample_evenly_keeps_ends():
+    chunks = [str(i) for i in range(20)]
+    assert sample_evenly(chunks, 4) == ["0", "6", "13", "19"]
+
+
+def test_merge_weights_and_caps_audiences():
+    a = response("AI", 0.9, 80, ["Tech", "Founders", "Designers", "PMs"])
+    b = response("Human", 0.6, 40, ["tech", "Writers", "Students", "Teachers"])
+
+    merged = merge_responses([a, b], weights=[3, 1])
+
+    # P(AI) = 0.75 * 0.9 + 0.25 * 0.4 = 0.775
+    assert merged.generation_prediction.label == "AI"
+    assert abs(merged.generation_prediction.confidence - 0.775) < 1e-9
+    assert merged.virality.score == 70
+    audiences = [s.community for s in merged.distribution_analysis.likely_audiences]
+    assert len(audiences) == 6
+    assert audiences[0] == "Tech"  # named by both chunks
+
+
+def test_long_transcript_is_chunked_and_evaluated_concurrently(monkeypatch):
+    monkeypatch.setattr(
+        judge_module, "settings",
+        judge_module.settings.__class__(offline_mode=True, max_input_tokens=200, max_chunks=4),
+    )
+    agent = JudgeAgent()
+    state = {"calls": 0, "in_flight": 0, "max_in_flight": 0}
+
+    async def fake_call(system_prompt, user_prompt, request_id, is_retry=False, model=None):
+        state["calls"] += 1
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        await asyncio.sleep(0.01)
+        state["in_flight"] -= 1
+        assert estimate_tokens(user_prompt) < 400
+        return json.dumps(VALID_PAYLOAD)
+
+    monkeypatch.setattr(agent, "_call_llm_async", fake_call)
+
+    transcript = " ".join(f"At minute {i} the speaker tells another story." for i in range(500))
+    result = asyncio.run(agent.evaluate_video_async(transcript))
+
+    assert isinstance(result, JudgeResponse)
+    assert state["calls"] == 4
+    assert state["max_in_flight"] == 4
+    assert "not evaluated" in result.meta_explanation  # the chunks sampling dropped are reported
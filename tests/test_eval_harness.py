@@ -0,0 +1,98 @@
+# tests/test_eval_harness.py
+
+import json
+
+import pytest
+
+from app.judge import JudgeAgent
+from app.models import InputRequest
+from benchmarks.eval_harness import (
+    Config,
+    LabeledItem,
+    evaluate_items,
+    load_dataset,
+    parse_config,
+    run_config,
+    summarize,
+)
+from benchmarks.replay import ReplayClient, ReplayStore
+from fakes import VALID_PAYLOAD, make_client
+
+
+def dataset():
+    # The fake model always answers "Human" at 0.7 confidence.
+    labels = ["Human", "AI", "Human", "AI"]
+    return [
+        LabeledItem(str(i), label, InputRequest(type="text", content=f"Labeled post number {i}"))
+        for i, label in enumerate(labels)
+    ]
+
+
+@pytest.fixture
+def recorded(tmp_path, online):
+    store_path = str(tmp_path / "replay.sqlite3")
+    client, completions = make_client(lambda kwargs: json.dumps(VALID_PAYLOAD))
+    recorder = ReplayClient(ReplayStore(store_path), "record", upstream=client)
+    chunk = evaluate_items(JudgeAgent(client=recorder), recorder, dataset())
+    assert len(completions.calls) == 4 and chunk.recorded == 4
+    return store_path
+
+
+def test_scores_accuracy_and_calibration(recorded):
+    replayer = ReplayClient(ReplayStore(recorded), "replay")
+    chunk = evaluate_items(JudgeAgent(client=replayer), replayer, dataset())
+    report = summarize(Config("baseline"), [chunk], elapsed=1.0)
+
+    assert report.accuracy == 0.5 and report.errors == 0
+    assert [(b.lower, b.count, b.mean_confidence, b.accuracy) for b in report.calibration] == [(0.7, 4, 0.7, 0.5)]
+    assert report.ece == 0.2
+    assert report.brier == pytest.approx((2 * 0.3 ** 2 + 2 * 0.7 ** 2) / 4)
+    assert report.replay == {"hits": 4, "recorded": 0, "misses": 0}
+
+
+def test_replay_never_calls_upstream(recorded):
+    client, completions = make_client(lambda kwargs: json.dumps(VALID_PAYLOAD))
+    replayer = ReplayClient(ReplayStore(recorded), "replay", upstream=client)
+    unseen = [LabeledItem("new", "AI", InputRequest(type="text", content="A post nobody recorded"))]
+
+    chunk = evaluate_items(JudgeAgent(client=replayer), replayer, dataset() + unseen)
+
+    assert completions.calls == []
+    assert chunk.items[-1].error == "ReplayMiss"
+    assert (chunk.replay_hits, chunk.replay_misses) == (4, 1)
+
+
+def test_replay_misses_do_not_trip_the_breaker(recorded):
+    replayer = ReplayClient(ReplayStore(recorded), "replay")
+    unseen = [
+        LabeledItem(f"new{i}", "AI", InputRequest(type="text", content=f"Unrecorded post {i}")) for i in range(6)
+    ]
+
+    chunk = evaluate_items(JudgeAgent(client=replayer), replayer, unseen + dataset())
+
+    assert [r.error for r in chunk.items] == ["ReplayMiss"] * 6 + [None] * 4
+    assert (chunk.replay_hits, chunk.replay_misses) == (4, 6)
+
+
+def test_workers_replay_in_parallel(recorded):
+    report = run_config(Config("parallel"), dataset(), recorded, "replay", workers=2)
+
+    assert report.items == 4 and report.errors == 0
+    assert report.accuracy == 0.5
+    assert report.replay["hits"] == 4
+
+
+def test_dataset_and_config_parsing(tmp_path):
+    path = tmp_path / "labeled.jsonl"
+    path.write_text(
+        json.dumps({"id": "a", "label": "AI", "type": "text", "content": "x"}) + "\n\n"
+        + json.dumps({"label": "Human", "type": "video", "content": "y", "metadata": {"platform": "tiktok"}}) + "\n"
+    )
+
+    items = load_dataset(str(path))
+    assert [(i.id, i.label, i.request.type) for i in items] == [("a", "AI", "text"), ("2", "Human", "video")]
+
+    config = parse_config("tiers:MODEL_TIERS=gpt-4o-mini:0.15:0.6,gpt-4o:2.5:10;PRECLASSIFIER_ENABLED=true")
+    assert config == Config("tiers", {
+        "MODEL_TIERS": "gpt-4o-mini:0.15:0.6,gpt-4o:2.5:10", "PRECLASSIFIER_ENABLED": "true",
+    })
@@ -0,0 +1,293 @@
+# tests/test_jobs.py
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app import jobs as jobs_module
+from app import main as main_module
+from app.jobs import InvalidWebhookError, JobQueue, JobStore
+from app.judge import JudgeAgent
+from app.models import JobRequest
+from app.resilience import OverloadedError
+
+
+def job(content="hello", **kwargs):
+    return JobRequest(type="text", content=content, **kwargs)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def test_lanes_drain_high_first_then_oldest(store):
+    low = store.enqueue(job(priority="low"), "a")
+    normal = store.enqueue(job(), "b")
+    high = store.enqueue(job(priority="high"), "c")
+    normal2 = store.enqueue(job(), "d")
+
+    claimed = [store.claim(10)["id"] for _ in range(4)]
+
+    assert claimed == [high, normal, normal2, low]
+    assert store.claim(10) is None
+
+
+def test_per_client_in_flight_limit(store):
+    first = store.enqueue(job(), "greedy")
+    store.enqueue(job(), "greedy")
+    other = store.enqueue(job(), "polite")
+
+    assert store.claim(1)["id"] == first
+    assert store.claim(1)["id"] == other  # greedy's second job waits, without blocking polite
+    assert store.claim(1) is None
+
+    store.finish(first, result="{}")
+    assert store.claim(1) is not None
+
+
+def test_queue_survives_reopen_and_recovers_orphans(tmp_path, monkeypatch):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = JobStore(path)
+    queued = store.enqueue(job(), "a")
+    running = store.enqueue(job(), "a")
+    store.claim(1)  # the first one
+    store.close()
+
+    # A restarted process (same pid, new incarnation) sees the old owner as dead.
+    monkeypatch.setattr(jobs_module, "_OWNER", "restarted")
+    reopened = JobStore(path)
+
+    assert reopened.get(queued).status == "running"
+    assert reopened.recover() == 1
+    assert reopened.get(queued).status == "queued"
+    assert reopened.get(running).status == "queued"
+
+
+def run_queue(queue, until, timeout=5.0):
+    async def main():
+        queue.start()
+        deadline = time.monotonic() + timeout
+        while not until() and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+    asyncio.run(main())
+
+
+def test_store_calls_do_not_block_the_event_loop(store, monkeypatch):
+    real_claim = store.claim
+
+    def locked_claim(max_in_flight_per_client):
+        time.sleep(0.5)  # waiting out another process's write lock
+        return real_claim(max_in_flight_per_client)
+
+    monkeypatch.setattr(store, "claim", locked_claim)
+    queue = JobQueue(store, JudgeAgent(), workers=2, poll_seconds=0.01)
+
+    async def main():
+        queue.start()
+        start = time.monotonic()
+        for _ in range(10):
+            await asyncio.sleep(0.01)
+        elapsed = time.monotonic() - start
+        await queue.stop()
+        return elapsed
+
+    assert asyncio.run(main()) < 0.3
+
+
+def test_worker_evaluates_and_calls_webhook(store):
+    delivered = []
+
+    def handler(request):
+        delivered.append(request)
+        return httpx.Response(204)
+
+    queue = JobQueue(
+        store, JudgeAgent(), workers=2, poll_seconds=0.05,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        webhook_allowed_hosts=["hooks.example"],
+    )
+    submitted = queue.submit(job(webhook_url="http://hooks.example/done"), "a")
+
+    run_queue(queue, until=lambda: delivered)
+
+    finished = store.get(submitted.job_id)
+    assert finished.status == "succeeded"
+    assert finished.result.meta_explanation
+    assert delivered[0].url == "http://hooks.example/done"
+    assert b'"status":"succeeded"' in delivered[0].content
+
+
+def test_webhooks_to_internal_addresses_are_refused(store, monkeypatch):
+    queue = JobQueue(store, JudgeAgent(), workers=0)
+    for url in ("http://169.254.169.254/latest/meta-data", "http://127.0.0.1:8000/x", "http://[::1]/x",
+                "http://10.0.0.7/hook"):
+        with pytest.raises(InvalidWebhookError):
+            queue.submit(job(webhook_url=url), "a")
+    with pytest.raises(InvalidWebhookError):
+        JobQueue(store, JudgeAgent(), workers=0, webhook_allowed_hosts=["hooks.example"]).submit(
+            job(webhook_url="https://elsewhere.example/hook"), "a"
+        )
+
+    # Names are resolved at delivery: one that points inside the network is never called.
+    async def resolve_to_loopback(host, port, **kwargs):
+        return [(None, None, None, "", ("127.0.0.1", port))]
+
+    delivered = []
+    queue._http_client = httpx.AsyncClient(transport=httpx.MockTransport(lambda r: delivered.append(r)))
+
+    async def deliver():
+        monkeypatch.setattr(asyncio.get_running_loop(), "getaddrinfo", resolve_to_loopback)
+        submitted = queue.submit(job(webhook_url="http://rebind.example/hook"), "a")
+        await queue._deliver("http://rebind.example/hook", submitted)
+
+    asyncio.run(deliver())
+    assert delivered == []
+
+
+def test_webhook_connects_to_the_address_it_checked(store, monkeypatch):
+    # A rebinding name: public for the check, loopback for any later lookup.
+    answers = iter(["93.184.216.34", "127.0.0.1", "127.0.0.1"])
+
+    async def rebinding(host, port, **kwargs):
+        return [(None, None, None, "", (next(answers), port))]
+
+    delivered = []
+
+    def handler(request):
+        delivered.append(request)
+        return httpx.Response(204)
+
+    queue = JobQueue(store, JudgeAgent(), workers=0,
+                     http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+    async def deliver():
+        monkeypatch.setattr(asyncio.get_running_loop(), "getaddrinfo", rebinding)
+        submitted = queue.submit(job(webhook_url="https://rebind.example:8443/hook"), "a")
+        await queue._deliver("https://rebind.example:8443/hook", submitted)
+
+    asyncio.run(deliver())
+    assert [str(r.url) for r in delivered] == ["https://93.184.216.34:8443/hook"]
+    assert delivered[0].headers["host"] == "rebind.example:8443"
+    assert delivered[0].extensions["sni_hostname"] == "rebind.example"
+
+
+def test_client_id_header_is_ignored_unless_trusted(store, monkeypatch):
+    queue = JobQueue(store, main_module.get_judge_agent(), workers=0)
+    monkeypatch.setattr(main_module, "_job_queue", queue)
+    client = TestClient(main_module.app)
+
+    for i in range(3):
+        client.post("/jobs", json={"type": "text", "content": f"job {i}"}, headers={"X-Client-Id": f"rotated-{i}"})
+    assert {row[0] for row in store._conn.execute("SELECT client FROM jobs")} == {"testclient"}
+
+    response = client.post("/jobs", json={"type": "text", "content": "x", "webhook_url": "http://127.0.0.1/hook"})
+    assert response.status_code == 422 and response.json()["error"] == "invalid_webhook_url"
+
+
+def test_overloaded_job_is_requeued_not_failed(store, monkeypatch):
+    agent = JudgeAgent()
+    calls = []
+
+    async def shed(request):
+        calls.append(request)
+        raise OverloadedError("circuit_open", retry_after=60)
+
+    monkeypatch.setattr(agent, "evaluate_request_async", shed)
+    queue = JobQueue(store, agent, workers=1, poll_seconds=0.05)
+    submitted = queue.submit(job(), "a")
+
+    run_queue(queue, until=lambda: calls)
+
+    assert store.get(submitted.job_id).status == "queued"
+    assert store.claim(10) is None  # waiting out Retry-After
+
+
+def test_requeues_are_capped(store, monkeypatch):
+    agent = JudgeAgent()
+
+    async def shed(request):
+        raise OverloadedError("circuit_open", retry_after=0.01)
+
+    monkeypatch.setattr(agent, "evaluate_request_async", shed)
+    queue = JobQueue(store, agent, workers=1, max_requeues=2, poll_seconds=0.01)
+    submitted = queue.submit(job(), "a")
+
+    run_queue(queue, until=lambda: store.get(submitted.job_id).status == "failed")
+
+    failed = store.get(submitted.job_id)
+    assert failed.status == "failed" and failed.error.error == "overloaded"
+    assert store._conn.execute("SELECT requeues FROM jobs").fetchone()[0] == 2
+
+
+def test_warns_when_every_job_shares_one_client_key(store, monkeypatch, caplog):
+    agent = JudgeAgent()
+
+    async def slow(request):
+        await asyncio.sleep(60)  # still running when the queue stops
+
+    monkeypatch.setattr(agent, "evaluate_request_async", slow)
+    queue = JobQueue(store, agent, workers=4, max_in_flight_per_client=1, poll_seconds=0.01)
+    for i in range(3):
+        queue.submit(job(f"job {i}"), "10.0.0.1")  # the proxy's address
+
+    with caplog.at_level("WARNING", logger="app.jobs"):
+        run_queue(queue, until=lambda: "jobs.single_client_key" in caplog.text, timeout=2.0)
+
+    assert caplog.text.count("jobs.single_client_key client=10.0.0.1") == 1
+
+
+def test_failed_job_stores_error(store, monkeypatch):
+    agent = JudgeAgent()
+
+    async def broken(request):
+        raise RuntimeError("invalid output")
+
+    monkeypatch.setattr(agent, "evaluate_request_async", broken)
+    queue = JobQueue(store, agent, workers=1, poll_seconds=0.05)
+    submitted = queue.submit(job(), "a")
+
+    run_queue(queue, until=lambda: store.get(submitted.job_id).status == "failed")
+
+    assert store.get(submitted.job_id).error.error == "evaluation_failed"
+
+
+def test_jobs_api_round_trip(store, monkeypatch):
+    queue = JobQueue(store, main_module.get_judge_agent(), workers=2, poll_seconds=0.05)
+    monkeypatch.setattr(main_module, "_job_queue", queue)
+
+    with TestClient(main_module.app) as client:
+        response = client.post("/jobs", json={"type": "text", "content": "hello", "priority": "high"},
+                               headers={"X-Client-Id": "tenant-1"})
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+        assert response.headers["location"] == f"/jobs/{job_id}"
+
+        deadline = time.monotonic() + 5
+        while client.get(f"/jobs/{job_id}").json()["status"] != "succeeded" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        body = client.get(f"/jobs/{job_id}").json()
+
+        assert body["status"] == "succeeded"
+        assert body["priority"] == "high"
+        assert body["result"]["generation_prediction"]["label"] in ("AI", "Human")
+        assert client.get("/jobs/nope").status_code == 404
+        assert 'judge_job_wait_seconds_count{lane="high"}' in client.get("/metrics").text
+
+
+def test_full_queue_sheds(store, monkeypatch):
+    queue = JobQueue(store, main_module.get_judge_agent(), workers=0, max_queued=1)
+    monkeypatch.setattr(main_module, "_job_queue", queue)
+    client = TestClient(main_module.app)
+
+    assert client.post("/jobs", json={"type": "text", "content": "one"}).status_code == 202
+    response = client.post("/jobs", json={"type": "text", "content": "two"})
+
+    assert response.status_code == 503
+    assert response.json()["error"] == "overloaded"
+    assert "retry-after" in response.headers
@@ -0,0 +1,64 @@
+# tests/test_judge_async.py
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+
+from app.judge import JudgeAgent
+from app.models import JudgeResponse
+
+
+VALID_OUTPUT = json.dumps({
+    "generation_prediction": {"label": "AI", "confidence": 0.8, "reasoning": "Uniform phrasing."},
+    "virality": {"score": 40, "confidence": 0.5, "reasoning": "Generic topic."},
+    "distribution_analysis": {
+        "likely_audiences": [{"community": "Tech Twitter", "why": "Topic relevance."}],
+        "reasoning": "Tech-oriented content."
+    },
+    "meta_explanation": "Async path."
+})
+
+
+class FakeAsyncCompletions:
+    def __init__(self, outputs):
+        self.outputs = list(outputs)
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        text = self.outputs.pop(0)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+def make_async_client(outputs):
+    completions = FakeAsyncCompletions(outputs)
+    return SimpleNamespace(chat=SimpleNamespace(completions=completions)), completions
+
+
+def test_async_retry_on_invalid_json(online):
+    client, completions = make_async_client(["INVALID JSON", VALID_OUTPUT])
+    agent = JudgeAgent(async_client=client)
+
+    result = asyncio.run(agent.evaluate_text_async("Test content"))
+    assert isinstance(result, JudgeResponse)
+    assert completions.calls == 2
+
+
+def test_async_evaluations_run_concurrently(online):
+    client, completions = make_async_client([VALID_OUTPUT] * 50)
+    agent = JudgeAgent(async_client=client)
+
+    async def run():
+        return await asyncio.gather(*(agent.evaluate_video_async(f"transcript {i}") for i in range(50)))
+
+    results = asyncio.run(run())
+    assert len(results) == 50
+    assert completions.calls == 50
+    assert completions.max_in_flight == 50
@@ -0,0 +1,51 @@
+# tests/test_load_harness.py
+
+import asyncio
+
+import httpx
+from fastapi.testclient import TestClient
+from openai import AsyncOpenAI
+
+from app.judge import JudgeAgent
+from benchmarks.fake_llm import StubProfile, create_app
+from benchmarks.load_test import percentile, scrape_counter
+
+
+def stub_client(profile):
+    transport = httpx.ASGITransport(app=create_app(profile))
+    return AsyncOpenAI(
+        api_key="stub",
+        base_url="http://stub/v1",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=transport),
+    )
+
+
+def test_agent_runs_real_client_path_against_stub(online):
+    agent = JudgeAgent(async_client=stub_client(StubProfile(latency_ms=1, latency_sigma=0)))
+    result = asyncio.run(agent.evaluate_text_async("A post about shipping a side project."))
+    assert result.generation_prediction.label == "Human"
+    assert agent.usage.prompt_tokens > 0
+
+
+def test_stub_injects_malformed_output_and_errors():
+    malformed = TestClient(create_app(StubProfile(latency_ms=1, malformed_rate=1.0)))
+    body = {"model": "m", "messages": [{"role": "user", "content": "hi"}]}
+    text = malformed.post("/v1/chat/completions", json=body).json()["choices"][0]["message"]["content"]
+    assert not text.startswith("{") or "58/100" in text or not text.endswith("}")
+
+    failing = TestClient(create_app(StubProfile(latency_ms=1, error_rate=1.0)))
+    assert failing.post("/v1/chat/completions", json=body).status_code == 500
+
+    limited = TestClient(create_app(StubProfile(rate_limit_rate=1.0, retry_after_seconds=3)))
+    response = limited.post("/v1/chat/completions", json=body)
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "3"
+
+
+def test_percentile_and_metric_scrape():
+    values = [i / 100 for i in range(1, 101)]
+    assert percentile(values, 50) == 0.5
+    assert percentile(values, 99) == 0.99
+    assert percentile([], 95) == 0.0
+    assert scrape_counter("# TYPE judge_retries_total counter\njudge_retries_total 4.0\n", "judge_retries_total") == 4.0
@@ -0,0 +1,55 @@
+# tests/test_metrics.py
+
+from fastapi.testclient import TestClient
+
+from app import metrics
+from app.judge import JudgeAgent
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_prometheus_text_format():
+    registry = metrics.Registry()
+    calls = registry.counter("calls_total", "Calls.", labelnames=("kind",))
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+
+    calls.inc(kind="a")
+    calls.inc(2, kind="a")
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5.0)
+
+    text = registry.render()
+    assert "# TYPE calls_total counter" in text
+    assert 'calls_total{kind="a"} 3.0' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_count 3" in text
+
+
+def test_retry_and_parse_failure_counters(monkeypatch):
+    agent = JudgeAgent()
+    outputs = iter(["not json at all", "{still not json}"])
+    monkeypatch.setattr(agent, "_call_llm", lambda *a, **kw: next(outputs))
+
+    retries = metrics.RETRIES.value()
+    parse_failures = metrics.PARSE_FAILURES.value()
+    try:
+        agent.evaluate_text("Counter test content")
+    except RuntimeError:
+        pass
+
+    assert metrics.RETRIES.value() == retries + 1
+    assert metrics.PARSE_FAILURES.value() == parse_failures + 2
+
+
+def test_metrics_endpoint_reports_stages():
+    client.post("/evaluate", json={"type": "text", "content": "Metrics endpoint content"})
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    for stage in ("prompt_build", "evaluate"):
+        assert f'judge_stage_seconds_count{{stage="{stage}"}}' in response.text
@@ -0,0 +1,78 @@
+# tests/test_multiworker.py
+
+import asyncio
+import multiprocessing
+
+import pytest
+
+from app import cache as cache_module
+from app import resilience as resilience_module
+from app.cache import build_response_cache
+from app.models import JudgeResponse
+from app.resilience import OverloadedError, SharedTokenBucket, build_token_bucket
+from fakes import VALID_PAYLOAD
+
+
+def drain(path, attempts, results):
+    # One "worker": take as many tokens as it can without waiting.
+    bucket = SharedTokenBucket(path, rate=0.001, burst=10)
+    granted = 0
+    for _ in range(attempts):
+        try:
+            asyncio.run(bucket.acquire(max_wait=0.0))
+            granted += 1
+        except OverloadedError:
+            pass
+    results.put(granted)
+
+
+def test_budget_is_shared_across_processes(tmp_path):
+    path = str(tmp_path / "rate_budget")
+    SharedTokenBucket(path, rate=0.001, burst=10).close()
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=drain, args=(path, 10, results)) for _ in range(4)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(timeout=30)
+
+    # Four processes each asked for the full burst; together they got it once.
+    assert sum(results.get(timeout=5) for _ in workers) == 10
+
+
+def test_pause_from_one_worker_applies_to_all(tmp_path):
+    path = str(tmp_path / "rate_budget")
+    first = SharedTokenBucket(path, rate=0, burst=1)
+    second = SharedTokenBucket(path, rate=0, burst=1)
+
+    first.pause(30)
+
+    assert 29 < second.paused_for() <= 30
+    with pytest.raises(OverloadedError) as exc:
+        asyncio.run(second.acquire(max_wait=1.0))
+    assert exc.value.reason == "rate_limited"
+
+
+def test_reservations_queue_waiters(tmp_path):
+    bucket = SharedTokenBucket(str(tmp_path / "rate_budget"), rate=10, burst=1)
+
+    waits = [bucket.reserve(max_wait=1.0) for _ in range(3)]
+
+    assert waits[0] == 0
+    assert waits[1] == pytest.approx(0.1, abs=0.02)
+    assert waits[2] == pytest.approx(0.2, abs=0.02)  # not woken for the same token
+
+
+def test_shared_state_dir_selects_shared_stores(tmp_path, monkeypatch):
+    settings = resilience_module.settings.__class__(shared_state_dir=str(tmp_path), rate_limit_rps=5)
+    monkeypatch.setattr(resilience_module, "settings", settings)
+    monkeypatch.setattr(cache_module, "settings", settings)
+
+    assert isinstance(build_token_bucket(), SharedTokenBucket)
+
+    # Two workers' caches: one's write is the other's hit (through the shared disk tier).
+    writer, reader = build_response_cache(), build_response_cache()
+    writer.set("key", JudgeResponse.model_validate(VALID_PAYLOAD))
+
+    assert reader.get("key") == JudgeResponse.model_validate(VALID_PAYLOAD)
+    assert (tmp_path / "response_cache.sqlite3").exists()
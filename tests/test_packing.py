@@ -0,0 +1,109 @@
+# tests/test_packing.py
+
+import asyncio
+import json
+
+import pytest
+
+from app.batch import evaluate_batch
+from app.bulk import run_bulk
+from app.judge import JudgeAgent
+from app.models import InputRequest, JudgeResponse
+from app import packing as packing_module
+from app.packing import Packer, packable, split_packed
+from app.parsing import JSONExtractionError
+from fakes import VALID_PAYLOAD, make_client
+
+
+def posts(*contents):
+    return [InputRequest(type="text", content=c) for c in contents]
+
+
+def test_split_packed_keeps_one_answer_per_valid_index():
+    raw = "```json\n" + json.dumps({"results": [
+        {"index": 1, "response": {"a": 1}},
+        {"index": 1, "response": {"a": 2}},  # duplicate: first wins
+        {"index": 7, "response": {}},        # out of range
+        "junk",
+    ]}) + "\n```"
+
+    assert split_packed(raw, 3) == {1: '{"a": 1}'}
+    assert split_packed('[{"index": 0, "response": {}}]', 1) == {0: "{}"}
+    with pytest.raises(JSONExtractionError):
+        split_packed("not json", 2)
+
+
+def test_only_short_items_are_packable():
+    assert packable(InputRequest(type="text", content="Short post"))
+    assert not packable(InputRequest(type="text", content="word " * 2000))
+
+
+@pytest.mark.parametrize("failure", ["cancelled", "short"])
+def test_packer_resolves_every_caller(monkeypatch, failure):
+    monkeypatch.setattr(packing_module, "settings", packing_module.settings.__class__(packing_max_items=2))
+
+    class Agent:
+        async def evaluate_packed_async(self, requests, preclassified=False):
+            if failure == "cancelled":
+                raise asyncio.CancelledError()
+            return [JudgeResponse.model_validate(VALID_PAYLOAD)]  # one outcome for two items
+
+    async def two_callers():
+        packer = Packer(Agent())
+        calls = [packer.evaluate(p) for p in posts("first", "second")]
+        return await asyncio.wait_for(asyncio.gather(*calls, return_exceptions=True), timeout=1)
+
+    outcomes = asyncio.run(two_callers())
+    assert all(isinstance(o, RuntimeError) for o in outcomes)
+
+
+def test_pack_rerequests_only_failed_items(online):
+    def respond(kwargs):
+        if kwargs["response_format"]["json_schema"]["name"] == "judge_response_packed":
+            broken = {**VALID_PAYLOAD, "meta_explanation": ""}
+            # item 1 invalid (and not locally repairable), item 2 missing
+            return json.dumps({"results": [{"index": 0, "response": VALID_PAYLOAD}, {"index": 1, "response": broken}]})
+        return json.dumps(VALID_PAYLOAD)
+
+    client, completions = make_client(respond)
+    agent = JudgeAgent(client=client)
+
+    outcomes = asyncio.run(agent.evaluate_packed_async(posts("first post", "second post", "third post")))
+
+    assert all(isinstance(o, JudgeResponse) for o in outcomes)
+    assert len(completions.calls) == 3  # one pack + the two failed items on their own
+    packed_prompt = completions.calls[0]["messages"][1]["content"]
+    assert "=== ITEM 2 ===" in packed_prompt and "third post" in packed_prompt
+    assert ["second post" in c["messages"][1]["content"] for c in completions.calls[1:]] == [True, False]
+    stats = agent.stats()["packing"]
+    assert stats["packs"] == 1 and stats["items"] == 3 and stats["rerequested"] == 2
+
+
+def test_batch_packs_short_items_and_caches_them_singly():
+    agent = JudgeAgent()
+    items = posts(*[f"Short post number {i}" for i in range(10)])
+
+    outcomes = asyncio.run(evaluate_batch(agent, items, concurrency=4))
+
+    assert all(isinstance(o, JudgeResponse) for o in outcomes)
+    stats = agent.stats()["packing"]
+    assert stats["packs"] == 2 and stats["items"] == 10 and stats["rerequested"] == 0
+    assert stats["prompt_tokens_saved_per_item"] > 0
+
+    asyncio.run(agent.evaluate_request_async(items[3]))
+    assert agent.stats()["cache"]["hits"] == 1
+
+
+def test_bulk_packs_streamed_rows(tmp_path):
+    src, out = tmp_path / "in.jsonl", tmp_path / "out.ndjson"
+    with open(src, "w", encoding="utf-8") as f:
+        for i in range(12):
+            f.write(json.dumps({"type": "text", "content": f"Row {i} of the bulk file"}) + "\n")
+
+    agent = JudgeAgent()
+    summary = asyncio.run(run_bulk(agent, str(src), str(out), concurrency=2))
+
+    rows = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [r["line"] for r in rows] == list(range(12)) and all("result" in r for r in rows)
+    assert summary.errors == 0
+    assert agent.stats()["packing"]["items"] == 12
@@ -0,0 +1,52 @@
+# tests/test_parsing.py
+
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from app.judge import JudgeAgent
+from app.models import JudgeResponse
+from app.parsing import iter_json_objects, validate_json_output
+from fakes import VALID_PAYLOAD
+
+VALID = json.dumps(VALID_PAYLOAD)
+
+
+def test_scanner_skips_fences_and_prose():
+    text = "Sure! Here it is:\n```json\n" + VALID + "\n```\nLet me know {if} you need more."
+    assert next(iter_json_objects(text)) == VALID
+
+
+def test_scanner_ignores_braces_inside_strings():
+    payload = {"a": "has } and { and \\\" quote", "b": {"c": "}"}}
+    text = "prefix " + json.dumps(payload) + " suffix }"
+    assert json.loads(next(iter_json_objects(text))) == payload
+
+
+def test_scanner_yields_nothing_for_truncated_output():
+    assert list(iter_json_objects(VALID[: len(VALID) // 2])) == []
+
+
+def test_parse_tries_later_candidates():
+    agent = JudgeAgent()
+    text = "Format: {label, confidence}. Answer: " + VALID + " (end)"
+    parsed = agent._parse_and_validate(text, request_id="t")
+    assert parsed is not None
+    assert parsed.generation_prediction.label == "Human"
+
+
+def test_parse_skips_a_stray_object_before_the_answer():
+    text = 'Using the format {"label": "AI"} as asked, here is my evaluation:\n' + VALID
+    assert validate_json_output(JudgeResponse, text).generation_prediction.label == "Human"
+
+    with pytest.raises(ValidationError):
+        validate_json_output(JudgeResponse, 'Only {"label": "AI"} and {"score": 3}')
+
+
+def test_parse_rejects_schema_violations_and_garbage():
+    agent = JudgeAgent()
+    bad = json.loads(VALID)
+    bad["meta_explanation"] = ""
+    assert agent._parse_and_validate(json.dumps(bad), request_id="t") is None
+    assert agent._parse_and_validate("no json here", request_id="t") is None
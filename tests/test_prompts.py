@@ -0,0 +1,18 @@
+# tests/test_prompts.py
+
+from app.prompts import OUTPUT_SCHEMA_REMINDER, build_system_prompt, build_user_prompt
+
+
+def test_system_prompt_is_static():
+    assert build_system_prompt() is build_system_prompt()
+    assert OUTPUT_SCHEMA_REMINDER.strip() in build_system_prompt()
+
+
+def test_user_prompt_layout():
+    a = build_user_prompt("first post", {"platform": "x", "duration_seconds": 10})
+    b = build_user_prompt("second post", {"duration_seconds": 10, "platform": "x"})
+
+    assert "Return ONLY valid JSON" not in a
+    assert a.endswith("first post")
+    # Same metadata in a different key order renders identically up to the content.
+    assert a.rsplit("\n", 1)[0] == b.rsplit("\n", 1)[0]
@@ -0,0 +1,70 @@
+# tests/test_repair.py
+
+import json
+
+
+from app.judge import JudgeAgent
+from app.repair import fix_locally, plan_repair
+from fakes import VALID_PAYLOAD, make_client
+
+
+def payload(**sections):
+    out = json.loads(json.dumps(VALID_PAYLOAD))
+    for section, fields in sections.items():
+        out[section].update(fields)
+    return out
+
+
+def test_fix_locally_handles_common_near_misses():
+    obj = payload(
+        generation_prediction={"label": "ai", "confidence": 85},
+        virality={"score": "72.6/100", "extra": True},
+        distribution_analysis={"likely_audiences": [{"community": f"C{i}", "why": "x"} for i in range(7)]},
+    )
+    fixes = fix_locally(obj)
+
+    assert obj["generation_prediction"]["label"] == "AI"
+    assert obj["generation_prediction"]["confidence"] == 0.85
+    assert obj["virality"] == {**VALID_PAYLOAD["virality"], "score": 73}
+    assert len(obj["distribution_analysis"]["likely_audiences"]) == 6
+    assert "virality.extra:dropped" in fixes
+
+
+def test_local_repair_avoids_the_retry(online):
+    client, completions = make_client(lambda kwargs: json.dumps(payload(virality={"score": 72.5})))
+    agent = JudgeAgent(client=client)
+    agent._structured_output = False
+
+    result = agent.evaluate_text("post")
+
+    assert result.virality.score == 72
+    assert len(completions.calls) == 1
+    assert agent.stats()["repair"]["retries_avoided"] == 1
+
+
+def test_llm_repair_sends_only_the_failing_section(online):
+    outputs = iter([
+        json.dumps(payload(virality={"score": 72.5, "reasoning": ""})),
+        json.dumps({"virality": {"score": 72, "confidence": 0.6, "reasoning": "Fixed."}}),
+    ])
+    client, completions = make_client(lambda kwargs: next(outputs))
+    agent = JudgeAgent(client=client)
+    agent._structured_output = True
+
+    result = agent.evaluate_text("post")
+
+    repair_prompt = completions.calls[1]["messages"][-1]["content"]
+    assert "virality.reasoning" in repair_prompt
+    assert "distribution_analysis" not in repair_prompt
+    schema = completions.calls[1]["response_format"]["json_schema"]["schema"]
+    assert list(schema["properties"]) == ["virality"]
+    assert result.virality.reasoning == "Fixed."
+    assert result.distribution_analysis == agent._parse_and_validate(json.dumps(VALID_PAYLOAD), "t").distribution_analysis
+    assert agent.stats()["repair"]["partial_llm"] == 1
+    assert agent.stats()["repair"]["prompt_tokens_saved"] > 0
+
+
+def test_unparseable_output_gets_a_full_repair():
+    plan = plan_repair("I can't help with that.", structured_output=True)
+    assert plan.kind == "full_llm"
+    assert plan.response_format is None
@@ -0,0 +1,244 @@
+# tests/test_resilience.py
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main as main_module
+from app.judge import JudgeAgent
+from app.resilience import (
+    AdaptiveLimiter,
+    CircuitBreaker,
+    OverloadedError,
+    SharedTokenBucket,
+    TokenBucket,
+    UpstreamGuard,
+    retry_after_seconds,
+)
+from fakes import FakeUpstream, RateLimitError, make_client
+
+
+def make_guard(initial=8, min_limit=1, max_limit=64, threshold=5, reset=30.0, max_wait=0.5):
+    return UpstreamGuard(
+        limiter=AdaptiveLimiter(initial, min_limit, max_limit),
+        breaker=CircuitBreaker(threshold, reset),
+        bucket=TokenBucket(rate=0, burst=1),
+        max_wait_seconds=max_wait,
+    )
+
+
+def make_agent(upstream, guard):
+    agent = JudgeAgent(async_client=upstream, guard=guard)
+    agent._cache = None
+    return agent
+
+
+def test_limiter_grows_additively_and_backs_off_on_latency():
+    limiter = AdaptiveLimiter(initial=10, min_limit=2, max_limit=12)
+    for _ in range(50):
+        assert limiter.try_acquire()
+        limiter.release(0.1, overloaded=False)
+    assert 12 >= limiter.limit > 10
+
+    before = limiter.limit
+    for _ in range(5):  # sustained 5x the baseline: upstream is queueing
+        limiter.try_acquire()
+        limiter.release(0.5, overloaded=False)
+    assert limiter.limit < before
+
+    for _ in range(100):
+        limiter.try_acquire()
+        limiter.release(0.1, overloaded=True)
+    assert limiter.limit == 2
+
+
+def test_limiter_rejects_over_limit():
+    limiter = AdaptiveLimiter(initial=2, min_limit=1, max_limit=4)
+    assert limiter.try_acquire() and limiter.try_acquire()
+    assert not limiter.try_acquire()
+
+
+def test_breaker_opens_probes_and_closes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.05)
+    for _ in range(2):
+        breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(OverloadedError) as exc:
+        breaker.allow()
+    assert exc.value.reason == "circuit_open"
+
+    time.sleep(0.06)
+    breaker.allow()  # the single half-open probe
+    with pytest.raises(OverloadedError):
+        breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_cancelled_probe_is_released():
+    guard = make_guard(threshold=1, reset=0.01, max_wait=5)
+    guard.breaker.record_failure()
+    time.sleep(0.02)
+    guard.bucket.pause(1.0)
+
+    async def cancel_while_paced():
+        task = asyncio.create_task(guard.acquire())  # claims the half-open probe, then sleeps in the bucket
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(cancel_while_paced())
+    guard.bucket.paused_until = 0.0
+    asyncio.run(guard.acquire())  # the probe is free again
+    assert guard.limiter.in_flight == 1
+
+
+def test_token_bucket_reserves_before_sleeping():
+    bucket = TokenBucket(rate=20, burst=1)
+
+    async def three_at_once():
+        start = time.monotonic()
+
+        async def take():
+            await bucket.acquire(max_wait=5)
+            return time.monotonic() - start
+
+        return await asyncio.gather(take(), take(), take())
+
+    granted = sorted(asyncio.run(three_at_once()))
+    assert granted[1] >= 0.045 and granted[2] >= 0.095  # one token per 50 ms, not two on the same refill
+
+
+def test_shed_calls_give_back_their_rate_token(tmp_path):
+    for bucket in (TokenBucket(rate=1, burst=2), SharedTokenBucket(str(tmp_path / "budget"), rate=1, burst=2)):
+        guard = make_guard(initial=1, max_limit=1)
+        guard.bucket = bucket
+        guard.acquire_sync()  # takes the only slot (and a token)
+
+        for _ in range(5):
+            with pytest.raises(OverloadedError, match="concurrency_limit"):
+                asyncio.run(guard.acquire())
+            with pytest.raises(OverloadedError, match="concurrency_limit"):
+                guard.acquire_sync()
+
+        assert bucket.reserve(max_wait=0) == 0  # the second token is still there
+        assert guard.shed == {"concurrency_limit": 10}
+
+
+def test_retry_after_parsing():
+    assert retry_after_seconds(RateLimitError(3)) == 3.0
+    assert retry_after_seconds(RuntimeError("no headers")) is None
+
+
+def test_429_pauses_and_sheds_without_calling_upstream(online):
+    upstream = FakeUpstream(rate_limit_at=0, retry_after=5)
+    agent = make_agent(upstream, make_guard())
+
+    with pytest.raises(OverloadedError) as first:
+        asyncio.run(agent.evaluate_text_async("post one"))
+    assert first.value.retry_after == 5.0
+
+    # Paused for longer than max_wait: shed immediately, upstream untouched.
+    with pytest.raises(OverloadedError) as second:
+        asyncio.run(agent.evaluate_text_async("post two"))
+    assert second.value.reason == "rate_limited"
+    assert upstream.calls == 1
+    assert agent.stats()["upstream"]["shed"] == {"rate_limited": 1}
+
+
+def test_breaker_sheds_after_consecutive_failures(online):
+    upstream = FakeUpstream(fail=True)
+    agent = make_agent(upstream, make_guard(threshold=3))
+
+    for i in range(3):
+        with pytest.raises(RuntimeError):
+            asyncio.run(agent.evaluate_text_async(f"post {i}"))
+    with pytest.raises(OverloadedError) as exc:
+        asyncio.run(agent.evaluate_text_async("post 3"))
+    assert exc.value.reason == "circuit_open"
+    assert upstream.calls == 3
+
+
+def test_sync_calls_go_through_the_guard(online):
+    def down(kwargs):
+        raise ConnectionError("upstream down")
+
+    client, completions = make_client(down)
+    guard = make_guard(threshold=2)
+    agent = JudgeAgent(client=client, guard=guard)
+    agent._cache = None
+
+    for i in range(2):
+        with pytest.raises(RuntimeError):
+            agent.evaluate_text(f"post {i}")
+    with pytest.raises(OverloadedError) as exc:
+        agent.evaluate_text("post 2")
+    assert exc.value.reason == "circuit_open"
+    assert len(completions.calls) == 2 and guard.limiter.in_flight == 0
+
+
+def test_load_over_limit_is_shed_fast(online):
+    upstream = FakeUpstream(latency=0.05)
+    agent = make_agent(upstream, make_guard(initial=4))
+
+    async def spike():
+        return await asyncio.gather(
+            *(agent.evaluate_text_async(f"post {i}") for i in range(40)), return_exceptions=True
+        )
+
+    outcomes = asyncio.run(spike())
+    shed = [o for o in outcomes if isinstance(o, OverloadedError)]
+    assert upstream.max_in_flight <= 4
+    assert len(shed) == 36
+    assert len(outcomes) - len(shed) == 4
+
+
+def test_malformed_response_releases_the_slot_once(online):
+    class EmptyChoices(FakeUpstream):
+        async def create(self, **kwargs):
+            self.calls += 1
+            return SimpleNamespace(choices=[], usage=None)  # what some local/filtered backends send
+
+    guard = make_guard(initial=4)
+    agent = make_agent(EmptyChoices(), guard)
+
+    for i in range(3):
+        with pytest.raises(RuntimeError):
+            asyncio.run(agent.evaluate_text_async(f"post {i}"))
+    assert guard.limiter.in_flight == 0
+
+
+def test_cancelled_calls_release_their_slots(online):
+    upstream = FakeUpstream(latency=10)
+    guard = make_guard(initial=4)
+    agent = make_agent(upstream, guard)
+
+    async def cancel_mid_flight():
+        tasks = [asyncio.create_task(agent.evaluate_text_async(f"post {i}")) for i in range(4)]
+        await asyncio.sleep(0.05)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(cancel_mid_flight())
+    assert guard.limiter.in_flight == 0
+    assert guard.breaker.state == "closed"
+
+    upstream.latency = 0.01
+    assert asyncio.run(agent.evaluate_text_async("after the cancellations")) is not None
+
+
+def test_api_returns_503_with_retry_after(monkeypatch):
+    async def overloaded(**kwargs):
+        raise OverloadedError("concurrency_limit", retry_after=2.5)
+
+    monkeypatch.setattr(main_module.get_judge_agent(), "evaluate_text_async", overloaded)
+    response = TestClient(main_module.app).post("/evaluate", json={"type": "text", "content": "hello"})
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "3"
+    assert response.json()["error"] == "overloaded"
@@ -0,0 +1,70 @@
+# tests/test_routing.py
+
+import json
+import logging
+
+import pytest
+
+from app.judge import JudgeAgent
+from app.routing import ModelRouter, ModelTier, parse_tiers
+from fakes import VALID_PAYLOAD, make_client
+
+
+def router(**overrides):
+    options = dict(
+        tiers=[ModelTier("cheap", 0.15, 0.6), ModelTier("strong", 2.5, 10.0)],
+        long_content_tokens=100,
+        long_video_seconds=600,
+        premium_platforms=["linkedin"],
+        confident_score=0.9,
+        escalation_confidence=0.55,
+    )
+    options.update(overrides)
+    return ModelRouter(**options)
+
+
+def test_parse_tiers():
+    assert parse_tiers("", "gpt-4o-mini") == [ModelTier("gpt-4o-mini")]
+    assert parse_tiers("a:0.1:0.2, b:1", "x") == [ModelTier("a", 0.1, 0.2), ModelTier("b", 1.0, 0.0)]
+
+
+def test_choose_starting_tier():
+    r = router()
+    assert r.choose(10, {}, cheap_confidence=0.6) == 0
+    assert r.choose(500, {}, cheap_confidence=0.6) == 1
+    assert r.choose(10, {"platform": "LinkedIn"}, cheap_confidence=0.6) == 1
+    assert r.choose(500, {}, cheap_confidence=0.97) == 0  # confident cheap score keeps it cheap
+    assert r.choose(500, {"duration_seconds": 3600, "platform": "linkedin"}, None) == 1  # capped
+
+
+def by_model(outputs):
+    return lambda kwargs: outputs[kwargs["model"]]
+
+
+def test_escalates_on_invalid_output_instead_of_repairing(online, caplog):
+    client, completions = make_client(by_model({"cheap": "not json", "strong": json.dumps(VALID_PAYLOAD)}))
+    agent = JudgeAgent(client=client, router=router())
+
+    with caplog.at_level(logging.INFO, logger="app.judge"):
+        result = agent.evaluate_text("short post")
+
+    assert any("start" in r.getMessage() and "model=cheap" in r.getMessage() for r in caplog.records)
+
+    assert result.meta_explanation == VALID_PAYLOAD["meta_explanation"]
+    assert [c["model"] for c in completions.calls] == ["cheap", "strong"]
+    tiers = agent.stats()["tiers"]
+    assert tiers["cheap"]["escalations"] == 1
+    # fakes report 100 prompt + 50 completion tokens per call
+    assert tiers["strong"]["cost_usd"] == pytest.approx((100 * 2.5 + 50 * 10.0) / 1_000_000)
+
+
+def test_escalates_on_low_confidence_and_keeps_cheap_result_if_strong_fails(online):
+    unsure = json.loads(json.dumps(VALID_PAYLOAD))
+    unsure["generation_prediction"]["confidence"] = 0.5
+    client, completions = make_client(by_model({"cheap": json.dumps(unsure), "strong": "broken"}))
+    agent = JudgeAgent(client=client, router=router())
+
+    result = agent.evaluate_text("short post")
+
+    assert result.generation_prediction.confidence == 0.5
+    assert [c["model"] for c in completions.calls] == ["cheap", "strong"]
@@ -0,0 +1,91 @@
+# tests/test_semantic_cache.py
+
+import pytest
+
+from app.cache import ResponseCache
+from app.judge import JudgeAgent, OFFLINE_RESPONSE
+from app.models import JudgeResponse
+from app.semantic_cache import SemanticCache, normalize, similarity, simhash
+
+RESPONSE = JudgeResponse.model_validate_json(OFFLINE_RESPONSE)
+
+POST = (
+    "Just shipped our new onboarding flow after three months of user interviews, "
+    "and the drop-off rate in week one fell by almost half compared to last quarter"
+)
+VARIANT = "🚀 JUST shipped our new onboarding flow after three months of user interviews, " \
+    "and the drop-off rate in week one fell by almost half compared to last quarter!! #startup #ux https://t.co/abc"
+OTHER = (
+    "Our team spent the weekend hiking in the mountains and the weather was perfect "
+    "for once, so we finally got the photos we wanted for the new office wall"
+)
+
+
+def test_normalize_drops_tags_links_emoji_and_case():
+    assert normalize(VARIANT) == normalize(POST)
+    assert normalize("Hello @bob, see www.x.com 😀 #tag  now") == ["hello", "see", "now"]
+
+
+def test_near_duplicates_are_close_and_different_posts_are_not():
+    base = simhash(normalize(POST))
+    edited = simhash(normalize(POST.replace("almost half", "nearly half")))
+
+    assert similarity(base, simhash(normalize(VARIANT))) == 1.0
+    assert similarity(base, edited) > similarity(base, simhash(normalize(OTHER)))
+    assert similarity(base, simhash(normalize(OTHER))) < 0.95
+
+
+def test_bands_find_every_match_within_the_threshold():
+    cache = SemanticCache(threshold=0.95, max_entries=100, ttl_seconds=60)
+    assert cache.max_distance == 3 and cache.bands == 4
+
+    base = 0x0123456789ABCDEF
+    cache.add("ns", base, RESPONSE)
+    # Three flipped bits, spread over three of the four bands: one band still matches.
+    assert cache.get("ns", base ^ (1 << 3) ^ (1 << 20) ^ (1 << 40)) == (RESPONSE, 1 - 3 / 64)
+    assert cache.get("ns", base ^ (1 << 3) ^ (1 << 20) ^ (1 << 40) ^ (1 << 60)) is None
+    assert cache.get("other-namespace", base) is None
+
+
+def test_thresholds_beyond_the_band_limit_are_rejected():
+    assert SemanticCache(threshold=1 - 15 / 64, max_entries=10, ttl_seconds=60).bands == 16
+    with pytest.raises(ValueError):
+        SemanticCache(threshold=0.7, max_entries=10, ttl_seconds=60)
+
+
+def test_lru_eviction_ttl_and_stats():
+    cache = SemanticCache(threshold=0.95, max_entries=2, ttl_seconds=60)
+    cache.add("ns", 1, RESPONSE)
+    cache.add("ns", 1 << 63, RESPONSE)
+    assert cache.get("ns", 1) is not None  # most recently used now
+    cache.add("ns", (1 << 63) | (1 << 62), RESPONSE)  # evicts 1 << 63
+    cache.get("ns", None)                             # too short to fingerprint
+
+    stats = cache.stats()
+    assert stats["size"] == 2 and stats["evictions"] == 1
+    assert stats["hits"] == 1 and stats["skipped_short"] == 1
+
+    expired = SemanticCache(threshold=0.95, max_entries=2, ttl_seconds=-1)
+    expired.add("ns", 1, RESPONSE)
+    assert expired.get("ns", 1) is None
+    assert expired.stats()["size"] == 0 and expired.stats()["expirations"] == 1
+
+
+def test_agent_reuses_response_for_reworded_resubmission(monkeypatch):
+    agent = JudgeAgent(
+        cache=ResponseCache(max_entries=10, ttl_seconds=60),
+        semantic_cache=SemanticCache(threshold=0.95, max_entries=10, ttl_seconds=60),
+    )
+    calls = []
+    monkeypatch.setattr(agent, "_call_llm", lambda *args, **kwargs: calls.append(1) or OFFLINE_RESPONSE)
+
+    first = agent.evaluate_text(POST, {"platform": "x"})
+    again = agent.evaluate_text(VARIANT, {"platform": "x"})
+    agent.evaluate_text(VARIANT, {"platform": "linkedin"})  # other metadata: not a duplicate
+    agent.evaluate_text(OTHER, {"platform": "x"})
+
+    assert again is first
+    assert len(calls) == 3
+    stats = agent.stats()["semantic_cache"]
+    assert stats["hits"] == 1 and stats["misses"] == 3 and stats["size"] == 3
+    assert stats["hit_rate"] == 0.25
@@ -0,0 +1,79 @@
+# tests/test_singleflight.py
+
+import asyncio
+import json
+
+from app.judge import JudgeAgent
+from app.singleflight import SingleFlight
+from fakes import VALID_PAYLOAD
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = {"count": 0}
+
+    async def work():
+        calls["count"] += 1
+        await asyncio.sleep(0.01)
+        return object()
+
+    async def run():
+        return await asyncio.gather(*(flight.do("k", work) for _ in range(20)))
+
+    results = asyncio.run(run())
+    assert calls["count"] == 1
+    assert all(r is results[0] for r in results)
+    assert flight.stats() == {"leaders": 1, "coalesced": 19, "in_flight": 0}
+
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream failed")
+
+    async def run():
+        return await asyncio.gather(*(flight.do("k", failing) for _ in range(5)), return_exceptions=True)
+
+    outcomes = asyncio.run(run())
+    assert all(isinstance(o, RuntimeError) for o in outcomes)
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def run():
+        leader = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(run()) == "done"
+
+
+def test_agent_coalesces_viral_spike(monkeypatch):
+    agent = JudgeAgent()
+    agent._cache = None  # isolate coalescing from the response cache
+    calls = {"count": 0}
+
+    async def slow_call(*args, **kwargs):
+        calls["count"] += 1
+        await asyncio.sleep(0.02)
+        return json.dumps(VALID_PAYLOAD)
+
+    monkeypatch.setattr(agent, "_call_llm_async", slow_call)
+
+    async def spike():
+        return await asyncio.gather(*(agent.evaluate_text_async("viral post", {"platform": "x"}) for _ in range(50)))
+
+    results = asyncio.run(spike())
+    assert len(results) == 50
+    assert calls["count"] == 1
+    assert agent.stats()["coalescing"]["coalesced"] == 49
@@ -0,0 +1,111 @@
+# tests/test_startup.py
+#
+# Cold-start benchmark: each measurement runs in a fresh interpreter so nothing
+# is already imported. Timings are printed (pytest -s) and held to loose budgets
+# that catch a heavy import creeping back into app.main, not machine noise.
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app import judge as judge_module
+from app import main as main_module
+
+ROOT = Path(__file__).resolve().parent.parent
+
+IMPORT_BUDGET_SECONDS = 3.0
+FIRST_RESPONSE_BUDGET_SECONDS = 5.0
+
+ONLINE_ENV = {
+    "OPENAI_OFFLINE_MODE": "false",
+    "OPENAI_API_KEY": "test-key",
+    "PRECLASSIFIER_ENABLED": "false",
+    "MODEL_TIERS": "",
+}
+
+
+def run_fresh(code, **env):
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        env={**os.environ, **ONLINE_ENV, **env},
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+print(json.dumps({
+    "import_seconds": time.perf_counter() - start,
+    "heavy": sorted(m for m in ("openai", "numpy", "dotenv") if m in sys.modules),
+}))
+"""
+
+FIRST_RESPONSE_PROBE = """
+import json, time
+start = time.perf_counter()
+from fastapi.testclient import TestClient
+import app.main
+with TestClient(app.main.create_app()) as client:
+    health = client.get("/health").status_code
+    first_response = time.perf_counter() - start
+    deadline = time.perf_counter() + 30
+    while client.get("/ready").status_code != 200 and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    ready = client.get("/ready").json()["status"]
+    ready_seconds = time.perf_counter() - start
+print(json.dumps({"health": health, "first_response_seconds": first_response,
+                  "ready": ready, "ready_seconds": ready_seconds}))
+"""
+
+
+def test_import_defers_sdk_numpy_and_dotenv():
+    probe = run_fresh(IMPORT_PROBE)
+    print(f"\nimport app.main: {probe['import_seconds'] * 1000:.0f} ms")
+
+    assert probe["heavy"] == []
+    assert probe["import_seconds"] < IMPORT_BUDGET_SECONDS
+
+
+def test_first_response_before_client_is_warm():
+    probe = run_fresh(FIRST_RESPONSE_PROBE)
+    print(
+        f"\ntime to first response: {probe['first_response_seconds'] * 1000:.0f} ms, "
+        f"time to ready: {probe['ready_seconds'] * 1000:.0f} ms"
+    )
+
+    assert probe["health"] == 200
+    assert probe["ready"] == "ready"
+    assert probe["first_response_seconds"] < FIRST_RESPONSE_BUDGET_SECONDS
+
+
+def test_ready_is_immediate_offline():
+    probe = run_fresh(FIRST_RESPONSE_PROBE, OPENAI_OFFLINE_MODE="true")
+
+    assert probe["ready"] == "ready"
+
+
+def test_ready_reports_starting_until_warm(monkeypatch):
+    monkeypatch.setattr(judge_module, "settings", judge_module.settings.__class__(offline_mode=False))
+    monkeypatch.setattr(judge_module, "require_api_key", lambda: None)
+    agent = judge_module.JudgeAgent()
+    monkeypatch.setattr(main_module, "_judge_agent", agent)
+    client = TestClient(main_module.app)  # no lifespan: nothing warms in the background
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json() == {"status": "starting"}
+
+    monkeypatch.setattr(agent.backend, "_build_clients", lambda: (object(), object()))
+    agent.warm()
+    assert client.get("/ready").status_code == 200
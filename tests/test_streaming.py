@@ -0,0 +1,82 @@
+# tests/test_streaming.py
+
+import asyncio
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+from openai import AsyncOpenAI
+
+from app.judge import JudgeAgent
+from app import main as main_module
+from app.main import app
+from app.streaming import SECTIONS, SectionStream, validate_section
+from benchmarks.fake_llm import StubProfile, create_app
+from fakes import VALID_PAYLOAD
+
+
+def parse_sse(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_sections_complete_before_the_stream_ends():
+    payload = dict(VALID_PAYLOAD, meta_explanation='Braces } { and "quotes" inside strings.')
+    text = "```json\n" + json.dumps(payload, indent=2) + "\n```"
+    stream = SectionStream()
+
+    seen = []
+    for i, char in enumerate(text):
+        seen.extend((i, name) for name, _ in stream.feed(char))
+
+    assert [name for _, name in seen] == list(SECTIONS)
+    assert seen[0][0] < len(text) // 3
+
+
+def test_validate_section_applies_field_constraints():
+    assert validate_section("virality", VALID_PAYLOAD["virality"]) == VALID_PAYLOAD["virality"]
+    assert validate_section("virality", dict(VALID_PAYLOAD["virality"], score=150)) is None
+    assert validate_section("meta_explanation", "") is None
+
+
+def test_agent_streams_sections_from_real_client(online):
+    transport = httpx.ASGITransport(app=create_app(StubProfile(latency_ms=20, latency_sigma=0)))
+    client = AsyncOpenAI(api_key="stub", base_url="http://stub/v1", http_client=httpx.AsyncClient(transport=transport))
+    agent = JudgeAgent(async_client=client)
+    agent._cache = None
+
+    async def collect():
+        return [event async for event in agent.stream_text_async("A post about shipping a side project.")]
+
+    events = asyncio.run(collect())
+
+    assert [e for e, _ in events] == ["section"] * 4 + ["result"]
+    assert [d["name"] for e, d in events if e == "section"] == list(SECTIONS)
+    assert events[-1][1]["generation_prediction"]["label"] == "Human"
+    assert agent.usage.completion_tokens > 0
+
+
+def test_stream_endpoint_offline():
+    response = TestClient(app).post("/evaluate/stream", json={"type": "text", "content": "Streaming post"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(response.text)
+    assert [e for e, _ in events] == ["section"] * 4 + ["result"]
+    assert "generation_prediction" in events[-1][1]
+
+
+def test_stream_endpoint_reports_mid_stream_failure(monkeypatch):
+    async def failing(content, metadata=None):
+        yield "section", {"name": "generation_prediction", "value": VALID_PAYLOAD["generation_prediction"]}
+        raise RuntimeError("upstream failed")
+
+    monkeypatch.setattr(main_module.get_judge_agent(), "stream_text_async", failing)
+    response = TestClient(app).post("/evaluate/stream", json={"type": "text", "content": "x"})
+
+    events = parse_sse(response.text)
+    assert [e for e, _ in events] == ["section", "error"]
+    assert events[-1][1]["error"] == "evaluation_failed"
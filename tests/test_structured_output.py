@@ -0,0 +1,60 @@
+# tests/test_structured_output.py
+
+import json
+
+
+from app import metrics
+from app.judge import JudgeAgent, RESPONSE_FORMAT
+from fakes import VALID_PAYLOAD, SloppyModel, make_client
+
+
+def retry_rate(structured, n=200):
+    client, completions = make_client(SloppyModel(invalid_rate=0.3))
+    agent = JudgeAgent(client=client)
+    agent._structured_output = structured
+
+    before = metrics.RETRIES.value()
+    for i in range(n):
+        try:
+            agent.evaluate_text(f"post {i}")
+        except RuntimeError:
+            pass  # repair attempt was also invalid
+    return (metrics.RETRIES.value() - before) / n, completions
+
+
+def test_structured_output_removes_repair_retries(online):
+    unconstrained_rate, _ = retry_rate(structured=False)
+    structured_rate, completions = retry_rate(structured=True)
+
+    assert unconstrained_rate > 0.2
+    assert structured_rate == 0.0
+    assert all(call["response_format"] == RESPONSE_FORMAT for call in completions.calls)
+
+
+def test_schema_is_strict():
+    schema = RESPONSE_FORMAT["json_schema"]["schema"]
+    distribution = schema["$defs"]["DistributionAnalysis"]
+    assert distribution["required"] == ["likely_audiences", "reasoning"]
+    assert distribution["additionalProperties"] is False
+    assert distribution["properties"]["likely_audiences"]["maxItems"] == 6
+    assert "title" not in json.dumps(schema)
+
+
+class SchemaRejected(Exception):
+    status_code = 400
+
+
+def test_falls_back_when_model_rejects_schema(online):
+    def respond(kwargs):
+        if "response_format" in kwargs:
+            raise SchemaRejected("Invalid parameter: 'response_format' of type 'json_schema' is not supported")
+        return json.dumps(VALID_PAYLOAD)
+
+    client, completions = make_client(respond)
+    agent = JudgeAgent(client=client)
+    agent._structured_output = True
+
+    agent.evaluate_text("first")
+    agent.evaluate_text("second")
+
+    assert ["response_format" in c for c in completions.calls] == [True, False, False]
@@ -0,0 +1,52 @@
+# tests/test_stylometry.py
+
+from app import judge as judge_module
+from app import stylometry
+from app.judge import JudgeAgent
+
+POLISHED = (
+    "In today's rapidly evolving landscape, organizations must leverage synergies to drive value. "
+    "Furthermore, it is important to note that holistic strategies unlock seamless growth. "
+    "In conclusion, innovation plays a crucial role."
+)
+ANECDOTE = (
+    "ok so yesterday my cat knocked my coffee onto the laptop mid-demo and honestly?? "
+    "the client LOVED it lol. I remember thinking my boss would kill me. He didn't!"
+)
+
+
+def test_features_are_batched():
+    features = stylometry.extract_features([POLISHED, ANECDOTE, "short"])
+    assert features.shape == (3, len(stylometry.FEATURE_NAMES))
+
+
+def test_obvious_cases_and_short_text():
+    polished, anecdote, short = stylometry.predict([POLISHED, ANECDOTE, "Nice post!"])
+    assert polished.label == "AI" and polished.confidence > 0.95
+    assert anecdote.label == "Human" and anecdote.confidence > 0.95
+    assert short.p_ai == 0.5  # too few words to say anything
+
+
+def test_agent_short_circuits_confident_items(monkeypatch):
+    monkeypatch.setattr(
+        judge_module, "settings",
+        judge_module.settings.__class__(offline_mode=True, preclassifier_enabled=True, preclassifier_threshold=0.95),
+    )
+    agent = JudgeAgent()
+    calls = {"count": 0}
+    real_call = agent._call_llm
+
+    def counting_call(*args, **kwargs):
+        calls["count"] += 1
+        return real_call(*args, **kwargs)
+
+    monkeypatch.setattr(agent, "_call_llm", counting_call)
+
+    local = agent.evaluate_text(POLISHED)
+    agent.evaluate_text("I built this startup after failing twice.")
+
+    assert local.generation_prediction.label == "AI"
+    assert "pre-classifier" in local.meta_explanation
+    assert calls["count"] == 1
+    stats = agent.stats()["preclassifier"]
+    assert stats["short_circuited"] == 1 and stats["short_circuit_share"] == 0.5
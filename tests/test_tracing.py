@@ -0,0 +1,115 @@
+# tests/test_tracing.py
+
+import asyncio
+import json
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main as main_module
+from app import tracing as tracing_module
+from app.judge import JudgeAgent
+
+
+@pytest.fixture
+def trace_file(tmp_path, monkeypatch):
+    path = tmp_path / "slow_traces.jsonl"
+    settings = tracing_module.settings.__class__(trace_slow_ms=0, trace_file=str(path))
+    monkeypatch.setattr(tracing_module, "settings", settings)
+    monkeypatch.setattr(tracing_module, "_exporter", None)
+    return path
+
+
+def exported_spans(path):
+    lines = path.read_text().splitlines()
+    assert len(lines) == 1
+    return json.loads(lines[0])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+
+
+def test_request_id_is_echoed_and_used_in_errors(monkeypatch):
+    async def broken(*args, **kwargs):
+        raise RuntimeError("invalid output")
+
+    monkeypatch.setattr(main_module.get_judge_agent(), "evaluate_text_async", broken)
+    response = TestClient(main_module.app).post(
+        "/evaluate", json={"type": "text", "content": "hello"}, headers={"X-Request-ID": "req-123"}
+    )
+
+    assert response.status_code == 500
+    assert response.headers["x-request-id"] == "req-123"
+    assert response.json()["request_id"] == "req-123"
+
+
+def test_one_id_from_api_to_agent_logs_and_spans(trace_file, caplog):
+    caplog.set_level(logging.INFO)
+    response = TestClient(main_module.app).post("/evaluate", json={"type": "video", "content": "a transcript"})
+    request_id = response.headers["x-request-id"]
+
+    spans = exported_spans(trace_file)
+    by_name = {s["name"]: s for s in spans}
+
+    assert {"POST /evaluate", "normalize_video", "evaluate", "prompt_build", "llm_call", "parse_validate"} <= set(by_name)
+    assert {s["traceId"] for s in spans} == {tracing_module.trace_id_for(request_id)}
+    root = by_name["POST /evaluate"]
+    assert "parentSpanId" not in root
+    assert by_name["evaluate"]["parentSpanId"] == root["spanId"]
+    assert by_name["prompt_build"]["parentSpanId"] == by_name["evaluate"]["spanId"]
+    assert {"key": "http.status_code", "value": {"intValue": "200"}} in root["attributes"]
+    assert f"judge.evaluate_text start request_id={request_id}" in caplog.text
+
+
+def test_traceparent_joins_the_callers_trace(trace_file):
+    trace_id, parent = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+    TestClient(main_module.app).post(
+        "/evaluate", json={"type": "text", "content": "hello"}, headers={"traceparent": f"00-{trace_id}-{parent}-01"}
+    )
+
+    spans = exported_spans(trace_file)
+    root = next(s for s in spans if s["name"] == "POST /evaluate")
+
+    assert {s["traceId"] for s in spans} == {trace_id}
+    assert root["parentSpanId"] == parent
+
+
+def test_fast_traces_are_not_written(trace_file, monkeypatch):
+    monkeypatch.setattr(tracing_module, "settings", tracing_module.settings.__class__(
+        trace_slow_ms=60_000, trace_file=str(trace_file)
+    ))
+    TestClient(main_module.app).post("/evaluate", json={"type": "text", "content": "hello"})
+
+    assert not trace_file.exists()
+
+
+def test_failures_mark_spans_as_errors(trace_file, monkeypatch):
+    agent = JudgeAgent()
+
+    def failing(*args, **kwargs):
+        raise RuntimeError("Upstream LLM call failed.")
+
+    monkeypatch.setattr(agent, "_call_llm", failing)
+    with pytest.raises(RuntimeError):
+        with tracing_module.trace("job", request_id="0" * 31 + "1"):
+            agent.evaluate_text("hello")
+
+    spans = exported_spans(trace_file)
+    assert [s["status"]["code"] for s in spans if s["name"] in ("evaluate", "job")] == [2, 2]
+
+
+def test_spans_follow_the_request_into_tasks_and_threads(trace_file):
+    agent = JudgeAgent()
+    long_text = "A sentence about shipping software. " * 4000  # over MAX_INPUT_TOKENS: chunked
+
+    async def run():
+        with tracing_module.trace("job", request_id="job-1"):
+            await agent.evaluate_text_async(long_text)
+
+    asyncio.run(run())
+    with tracing_module.trace("job", request_id="job-2"):
+        agent.evaluate_text(long_text)
+
+    lines = [json.loads(line) for line in trace_file.read_text().splitlines()]
+    for line in lines:
+        spans = line["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert len({s["traceId"] for s in spans}) == 1
+        assert sum(s["name"] == "evaluate" for s in spans) > 1  # one per chunk, same trace
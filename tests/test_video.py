@@ -0,0 +1,164 @@
+# tests/test_video.py
+
+import asyncio
+import subprocess
+import sys
+from types import ModuleType, SimpleNamespace
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from app import video as video_module
+from app.judge import JudgeAgent
+from app.video import ArtifactCache, StageResult, VideoPipeline, frame_timestamps, frames_job, normalize_video
+
+CALLS = []
+
+
+def fake_audio(path, stt_model):
+    CALLS.append("audio")
+    return StageResult(text="hello from the clip", timings={"decode_audio": 0.01, "stt": 0.02})
+
+
+def fake_frames(path, max_frames):
+    CALLS.append("frames")
+    return StageResult(text="SUBSCRIBE", timings={"keyframes": 0.01, "ocr": 0.03})
+
+
+def no_ocr(path, max_frames):
+    return StageResult(notes=["OCR skipped (pytesseract/Pillow not installed)"])
+
+
+@pytest.fixture
+def media_dir(tmp_path):
+    (tmp_path / "clip.mp4").write_bytes(b"\x00\x00\x00\x18ftypmp42 not really a video")
+    (tmp_path / "notes.txt").write_text("not a video")
+    return tmp_path
+
+
+def make_pipeline(media_dir, executor=None, frames=fake_frames, cache=None):
+    return VideoPipeline(
+        media_dir=str(media_dir),
+        cache=cache or ArtifactCache(),
+        executor=executor or ThreadPoolExecutor(max_workers=2),
+        audio=fake_audio,
+        frames=frames,
+    )
+
+
+def test_transcripts_are_unchanged_without_a_media_dir():
+    norm = normalize_video("  just a transcript  ")
+
+    assert norm.transcript == "just a transcript"
+    assert "Transcript-first" in norm.notes
+
+
+def test_only_video_files_inside_the_media_dir_resolve(media_dir):
+    pipeline = make_pipeline(media_dir)
+
+    assert pipeline.resolve("clip.mp4") == (media_dir / "clip.mp4").resolve()
+    assert pipeline.resolve(str(media_dir / "clip.mp4")) is not None
+    assert pipeline.resolve("notes.txt") is None
+    assert pipeline.resolve("missing.mp4") is None
+    assert pipeline.resolve("../clip.mp4") is None
+    assert pipeline.resolve("a transcript that mentions clip.mp4\nand more") is None
+
+
+def test_ingest_merges_speech_and_captions_with_stage_timings(media_dir):
+    norm = make_pipeline(media_dir).ingest(media_dir / "clip.mp4")
+
+    assert norm.transcript == "hello from the clip\n\nOn-screen text:\nSUBSCRIBE"
+    for stage in ("hash=", "decode_audio=", "stt=", "keyframes=", "ocr="):
+        assert stage in norm.notes
+
+
+def test_second_ingest_skips_media_processing(media_dir):
+    CALLS.clear()
+    pipeline = make_pipeline(media_dir)
+
+    first = pipeline.ingest(media_dir / "clip.mp4")
+    second = pipeline.ingest(media_dir / "clip.mp4")
+
+    assert CALLS == ["audio", "frames"]
+    assert second.transcript == first.transcript
+    assert "cache hit" in second.notes and "stt=" not in second.notes
+
+
+def test_disk_cache_survives_a_new_pipeline(media_dir, tmp_path_factory):
+    cache_dir = str(tmp_path_factory.mktemp("artifacts"))
+    make_pipeline(media_dir, cache=ArtifactCache(cache_dir)).ingest(media_dir / "clip.mp4")
+
+    CALLS.clear()
+    norm = make_pipeline(media_dir, cache=ArtifactCache(cache_dir)).ingest(media_dir / "clip.mp4")
+
+    assert CALLS == []
+    assert "cache hit" in norm.notes
+
+
+def test_skipped_stage_is_noted_and_not_cached(media_dir):
+    pipeline = make_pipeline(media_dir, frames=no_ocr)
+
+    norm = pipeline.ingest(media_dir / "clip.mp4")
+
+    assert norm.transcript == "hello from the clip"
+    assert "OCR skipped" in norm.notes
+    assert "cache hit" not in pipeline.ingest(media_dir / "clip.mp4").notes
+
+
+def test_jobs_run_in_a_process_pool(media_dir):
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        norm = make_pipeline(media_dir, executor=pool).ingest(media_dir / "clip.mp4")
+
+    assert "SUBSCRIBE" in norm.transcript
+
+
+def test_evaluate_video_ingests_media_paths(media_dir, monkeypatch):
+    monkeypatch.setattr(video_module, "_pipeline", make_pipeline(media_dir))
+    agent = JudgeAgent()
+    seen = {}
+
+    async def capture(content, metadata=None, preclassified=False):
+        seen["content"], seen["metadata"] = content, metadata
+
+    monkeypatch.setattr(agent, "evaluate_text_async", capture)
+    asyncio.run(agent.evaluate_video_async("clip.mp4", {"platform": "tiktok"}))
+
+    assert seen["content"].startswith("hello from the clip")
+    assert "decode_audio=" in seen["metadata"]["video_normalization_notes"]
+    assert seen["metadata"]["platform"] == "tiktok"
+
+
+def test_frames_are_extracted_only_at_sampled_timestamps(monkeypatch):
+    runs = []
+
+    def fake_ffmpeg(args):
+        runs.append(args)
+        open(args[-1], "wb").close()  # the one frame this run writes
+
+    pil = ModuleType("PIL")
+    pil.Image = SimpleNamespace(open=lambda path: open(path, "rb"))
+    monkeypatch.setitem(sys.modules, "PIL", pil)
+    monkeypatch.setitem(sys.modules, "pytesseract", SimpleNamespace(image_to_string=lambda image: "SUBSCRIBE"))
+    monkeypatch.setattr(video_module.shutil, "which", lambda tool: f"/usr/bin/{tool}")
+    monkeypatch.setattr(video_module, "_probe_duration", lambda path: 3600.0)  # an hour-long video
+    monkeypatch.setattr(video_module, "_ffmpeg", fake_ffmpeg)
+
+    result = frames_job("long.mp4", max_frames=4)
+
+    assert frame_timestamps(3600.0, 4) == [450.0, 1350.0, 2250.0, 3150.0]
+    assert [args[:2] for args in runs] == [["-ss", "450.000"], ["-ss", "1350.000"], ["-ss", "2250.000"],
+                                           ["-ss", "3150.000"]]
+    assert all(args[args.index("-frames:v") + 1] == "1" for args in runs)
+    assert result.text == "SUBSCRIBE" and "frames" in result.timings
+
+
+def test_hung_ffmpeg_times_out_as_a_failed_stage(monkeypatch):
+    def hang(cmd, **kwargs):
+        raise subprocess.TimeoutExpired(cmd, kwargs["timeout"])
+
+    monkeypatch.setattr(video_module, "settings", video_module.settings.__class__(video_ffmpeg_timeout_seconds=5.0))
+    monkeypatch.setattr(video_module.subprocess, "run", hang)
+
+    with pytest.raises(subprocess.CalledProcessError) as failed:
+        video_module._ffmpeg(["-i", "broken.mp4", "out.wav"])
+    assert failed.value.stderr == b"timed out after 5.0s"